@@ -1,7 +1,18 @@
 import streamlit as st
-import pandas as pd
-from db_operations import load_users, save_users, load_inventory
-from werkzeug.security import generate_password_hash
+import functools
+import io
+import os
+import time
+import zipfile
+from db_operations import load_users_view, get_user, get_user_by_username, query_users, update_user, delete_user
+from pdf_jobs import rebuild_stale_pdfs
+from asset_gc import GRACE_SECONDS, collect_garbage
+from bulk_import import detect_format, import_items
+from inventory_aggregates import get_inventory_aggregates
+from inventory_export import EXPORT_FORMATS, EXPORT_MIME_TYPES, MAX_DOWNLOAD_BYTES, export_ids, export_to_path, new_export_path, parquet_available, read_export
+from utils import ITEM_CATEGORIES
+from passwords import HashingBusyError, hash_password
+from perf import PERF_ENABLED, collecting_since, export_spans, reset, snapshot
 
 def admin_dashboard_page():
     """Renders the administrative dashboard."""
@@ -10,8 +21,8 @@ def admin_dashboard_page():
         return
 
     st.subheader("Admin Dashboard")
-    users = load_users()
-    inventory = load_inventory()
+    users = load_users_view()
+    inventory_summary = get_inventory_aggregates().summary() # Maintained totals; no items are read
 
     st.write(f"Welcome to the admin panel, **{st.session_state.username}**!")
 
@@ -24,14 +35,55 @@ def admin_dashboard_page():
 
     st.markdown("---")
     st.markdown("#### Inventory Overview")
-    st.write(f"Total Inventory Items: **{len(inventory)}**")
+    st.write(f"Total Inventory Items: **{inventory_summary['unique_items']}**")
     if st.button("Add New Inventory Item", key="btn_add_inventory_item"):
         st.session_state.current_page = 'add_item'
         st.rerun()
+    if st.button("Bulk Import Items", key="btn_bulk_import"):
+        st.session_state.current_page = 'bulk_import'
+        st.rerun()
+    if st.button("Export Inventory", key="btn_export_inventory"):
+        st.session_state.current_page = 'export_inventory'
+        st.rerun()
+    # Only items whose PDF fingerprint no longer matches are re-rendered, in the background.
+    if st.button("Rebuild Stale PDFs", key="btn_rebuild_stale_pdfs"):
+        queued = rebuild_stale_pdfs()
+        if queued:
+            st.success(f"Regenerating {queued} item PDFs in the background.")
+        else:
+            st.info("All item PDFs are up to date.")
+
+    st.markdown("---")
+    st.markdown("#### Storage Cleanup")
+    st.write(f"Finds images, PDFs, thumbnails and catalogs no item refers to. Files changed in the last {GRACE_SECONDS // 60} minutes are kept.")
+    cleanup_dry_run = st.checkbox("Dry run (only list the files)", value=True, key="cleanup_dry_run")
+    if st.button("Clean Up Unused Files", key="btn_collect_garbage"):
+        with st.spinner("Scanning the asset directories..."):
+            report = collect_garbage(dry_run=cleanup_dry_run)
+        if report.dry_run:
+            st.info(f"Scanned {report.scanned} files: {report.orphan_count} unused ({report.orphan_bytes / 1e6:,.1f} MB) would be deleted.")
+        else:
+            st.success(f"Scanned {report.scanned} files: deleted {report.deleted} unused files ({report.deleted_bytes / 1e6:,.1f} MB).")
+        if report.recent:
+            st.caption(f"{report.recent} unused files are newer than the grace period and were kept.")
+        if report.orphans:
+            st.dataframe([{'Directory': directory, 'File': filename, 'Bytes': size} for directory, filename, size in report.orphans],
+                         hide_index=True, use_container_width=True)
+            if report.orphan_count > len(report.orphans):
+                st.caption(f"Only the first {len(report.orphans)} files are listed.")
+        if report.missing_count:
+            st.warning(f"{report.missing_count} files referenced by items are missing: "
+                       + ", ".join(f"{directory}/{filename}" for directory, filename in report.missing[:20])
+                       + (" ..." if report.missing_count > 20 else ""))
+        for error in report.errors:
+            st.error(f"Could not delete {error}")
 
     st.markdown("---")
     st.markdown("#### System Information")
     st.write(f"Total Registered Users: **{len(users)}**")
+    if st.button("Performance", key="btn_performance"):
+        st.session_state.current_page = 'performance'
+        st.rerun()
 
 def manage_users_page():
     """Renders the page for managing user accounts."""
@@ -40,9 +92,10 @@ def manage_users_page():
         return
 
     st.subheader("Manage Users")
-    users = load_users()
+    users = load_users_view()
 
     if users:
+        import pandas as pd # Imported on first use, so other pages never load pandas
         users_df = pd.DataFrame(users)
         users_df['id_display'] = users_df['id'].apply(lambda x: x[:8] + '...') 
         users_df['role_display'] = users_df['role'].apply(lambda x: x.capitalize())
@@ -87,22 +140,19 @@ def manage_users_page():
 
 def delete_user_from_db(user_id):
     """Deletes a user from the users database."""
-    users = load_users()
-    
     if user_id == st.session_state.user_id_obj:
         st.error("Cannot delete your own account while logged in.")
         return
 
-    user_to_delete = next((u for u in users if u['id'] == user_id), None)
+    user_to_delete = get_user(user_id)
     if user_to_delete:
         if user_to_delete['role'] == 'admin':
-            admin_count_after_deletion = sum(1 for u in users if u['role'] == 'admin' and u['id'] != user_id)
+            admin_count_after_deletion = sum(1 for u in query_users(role='admin') if u['id'] != user_id)
             if admin_count_after_deletion == 0:
                 st.error("Cannot delete the last administrator account.")
                 return
 
-        users = [u for u in users if u['id'] != user_id]
-        save_users(users)
+        delete_user(user_id)
     else:
         st.error('User not found.')
 
@@ -120,8 +170,7 @@ def edit_user_page():
             st.rerun()
         return
 
-    users = load_users()
-    user_to_edit = next((u for u in users if u['id'] == user_id), None)
+    user_to_edit = get_user(user_id)
 
     if not user_to_edit:
         st.error("User not found.")
@@ -146,25 +195,182 @@ def edit_user_page():
             else:
                 if user_id == st.session_state.user_id_obj:
                     if new_role != 'admin':
-                        admin_count = sum(1 for u in users if u['role'] == 'admin')
+                        admin_count = len(query_users(role='admin'))
                         if admin_count == 1:
                             st.error("You cannot demote the only administrator account.")
                             st.stop()
                 
                 if new_username.lower() != user_to_edit['username'].lower():
-                    if any(u['username'].lower() == new_username.lower() for u in users if u['id'] != user_id):
+                    existing_user = get_user_by_username(new_username)
+                    if existing_user and existing_user['id'] != user_id:
                         st.error('Username already exists. Please choose a different one.')
                         st.stop()
                 
-                user_to_edit['username'] = new_username
-                user_to_edit['role'] = new_role
+                changes = {'username': new_username, 'role': new_role}
                 if new_password:
                     if len(new_password) < 6:
                         st.error('New password must be at least 6 characters long.')
                         st.stop()
-                    user_to_edit['password'] = generate_password_hash(new_password)
+                    try:
+                        changes['password'] = hash_password(new_password)
+                    except HashingBusyError as e:
+                        st.error(str(e))
+                        st.stop()
                 
-                save_users(users)
+                user_to_edit = update_user(user_id, changes)
                 st.success(f'User "{user_to_edit["username"]}" updated successfully!')
                 st.session_state.current_page = 'manage_users'
                 st.rerun()
+
+def bulk_import_page():
+    """Renders the page for importing many inventory items at once from a CSV or JSONL file."""
+    if st.session_state.role != 'admin':
+        st.error("You do not have permission to access this page.")
+        return
+
+    st.subheader("Bulk Import Items")
+    st.write("Upload a CSV file (with a header row) or a JSONL file (one JSON object per line) with the "
+             "fields `name`, `category`, `quantity` and `price`, and optionally `image` and `id`. "
+             "Images named in the `image` field are taken from an optional zip archive.")
+
+    with st.form("bulk_import_form"):
+        items_file = st.file_uploader("Items file", type=['csv', 'jsonl', 'ndjson'])
+        images_file = st.file_uploader("Image archive (Optional)", type=['zip'])
+        queue_pdfs = st.checkbox("Generate item PDFs in the background", value=True)
+        submitted = st.form_submit_button("Import")
+
+    if submitted:
+        if not items_file:
+            st.error("Please choose a file to import.")
+            return
+        try:
+            file_format = detect_format(items_file.name)
+        except ValueError as e:
+            st.error(str(e))
+            return
+
+        progress_bar = st.progress(0.0, text="Importing...")
+
+        def _show_progress(fraction, report):
+            progress_bar.progress(fraction or 0.0, text=f"{report.imported} items imported, {report.error_count} rows rejected")
+
+        try:
+            report = import_items(items_file, file_format, image_zip=images_file, queue_pdfs=queue_pdfs, progress=_show_progress)
+        except zipfile.BadZipFile:
+            st.error("The image archive is not a valid zip file.")
+            return
+        if report.imported:
+            st.success(f"Imported {report.imported} of {report.rows} rows." + (" Their PDFs are being generated." if queue_pdfs else ""))
+        if report.error_count:
+            st.warning(f"{report.error_count} rows were rejected.")
+            import pandas as pd
+            errors_df = pd.DataFrame(report.errors, columns=['Row', 'Error'])
+            st.dataframe(errors_df, hide_index=True, use_container_width=True)
+            if report.error_count > len(report.errors):
+                st.caption(f"Only the first {len(report.errors)} errors are listed.")
+        elif not report.imported:
+            st.info("The file contained no rows to import.")
+
+def export_inventory_page():
+    """Renders the page for exporting the inventory (or a filtered part of it) as CSV, JSONL or Parquet."""
+    if st.session_state.role != 'admin':
+        st.error("You do not have permission to access this page.")
+        return
+
+    st.subheader("Export Inventory")
+    st.write("Exports the items matching the filter below. The filter starts out as the one last used on the inventory page.")
+
+    # Default to the inventory page's current search and category filter
+    search_term = st.text_input("Search by name or ID:", value=st.session_state.get('inventory_search', ''), key="export_search")
+    category_options = ["All"] + ITEM_CATEGORIES
+    current_category = st.session_state.get('category_filter', "All")
+    selected_category = st.selectbox("Filter by category:", category_options,
+                                     index=category_options.index(current_category) if current_category in category_options else 0,
+                                     key="export_category")
+    formats = EXPORT_FORMATS if parquet_available() else [f for f in EXPORT_FORMATS if f != 'parquet']
+    file_format = st.selectbox("Format:", formats, format_func=str.upper, key="export_format")
+    if not parquet_available():
+        st.caption("Parquet export is available once the pyarrow package is installed.")
+
+    if st.button("Prepare Export", key="btn_prepare_export"):
+        ids = export_ids(search_term.strip(), None if selected_category == "All" else selected_category)
+        # The export is streamed to a temporary file in chunks instead of being built in memory
+        export_path = new_export_path(file_format)
+        with st.spinner(f"Exporting {len(ids)} items..."):
+            export_to_path(export_path, file_format, ids)
+        previous = st.session_state.get('inventory_export')
+        if previous and os.path.exists(previous[0]):
+            os.remove(previous[0])
+        st.session_state.inventory_export = (export_path, file_format, len(ids))
+
+    export = st.session_state.get('inventory_export')
+    if export and os.path.exists(export[0]):
+        export_path, export_format, count = export
+        size = os.path.getsize(export_path)
+        if size > MAX_DOWNLOAD_BYTES:
+            # A download is served from memory; files this large are better written on the server
+            st.warning(f"The export of {count} items is {size / (1024 * 1024):,.0f} MB, more than the "
+                       f"{MAX_DOWNLOAD_BYTES // (1024 * 1024)} MB that can be downloaded here. Narrow the filter, or run "
+                       f"`python inventory_export.py {export_format} OUTPUT` on the server.")
+        else:
+            st.success(f"Export of {count} items is ready.")
+            st.download_button(
+                label=f"Download {export_format.upper()}",
+                data=functools.partial(read_export, export_path),
+                file_name=f"inventory_export.{export_format}",
+                mime=EXPORT_MIME_TYPES[export_format],
+                key="download_inventory_export",
+                on_click="ignore"
+            )
+
+def performance_page():
+    """Renders the timings of the instrumented hot paths collected by this server process."""
+    if st.session_state.role != 'admin':
+        st.error("You do not have permission to access this page.")
+        return
+
+    st.subheader("Performance")
+    if not PERF_ENABLED:
+        st.info("Timing is turned off (INVENTORY_PERF=0).")
+        return
+    started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(collecting_since()))
+    st.caption(f"Timings of this server process since {started}. Percentiles cover the most recent calls of each span; job spans include the time spent queued.")
+
+    rows = snapshot()
+    if rows:
+        st.dataframe(
+            rows,
+            column_config={
+                'span': st.column_config.TextColumn("Span"),
+                'count': st.column_config.NumberColumn("Calls"),
+                'total_ms': st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+                'p50_ms': st.column_config.NumberColumn("p50 (ms)", format="%.2f"),
+                'p95_ms': st.column_config.NumberColumn("p95 (ms)", format="%.2f"),
+                'max_ms': st.column_config.NumberColumn("Max (ms)", format="%.2f"),
+                'bytes': st.column_config.NumberColumn("Bytes"),
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+    else:
+        st.info("No timings have been recorded yet.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Reset Timings", key="btn_reset_timings"):
+            reset()
+            st.rerun()
+    with col2:
+        st.download_button(
+            label="Download Recent Spans (JSONL)",
+            data=_export_spans_text,
+            file_name="inventory_spans.jsonl",
+            mime="application/x-ndjson",
+            key="download_spans",
+            on_click="ignore"
+        )
+
+def _export_spans_text():
+    out = io.StringIO()
+    export_spans(out)
+    return out.getvalue()
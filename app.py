@@ -1,6 +1,6 @@
 import streamlit as st
+import importlib
 import os
-import uuid
 import sys
 
 # --- Configuration (MUST BE THE FIRST STREAMLIT COMMAND) ---
@@ -15,16 +15,15 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 if BASE_DIR not in sys.path:
     sys.path.append(BASE_DIR)
 
-# Import functions from other modules
-from db_operations import load_users, save_users, load_inventory
-from auth import login_page, register_page
-from inventory_pages import show_inventory_page, add_item_page, edit_item_page
-from admin_pages import admin_dashboard_page, manage_users_page, edit_user_page
-from dashboard_pages import show_dashboard_page # NEW: Import dashboard page
-from utils import ensure_dirs, get_image_dir # Import utility functions
+from bootstrap import INITIAL_ADMIN_USERNAME, INITIAL_ADMIN_PASSWORD, bootstrap
+from db_operations import get_user_by_username
+from perf import span
 
-# Ensure necessary directories exist at startup
-ensure_dirs()
+# --- One-Time Setup ---
+# Directories, the initial admin account and write tracking are set up once per process
+# (see bootstrap.py), not on every rerun.
+if bootstrap():
+    st.success(f"Initial admin user created: Username '{INITIAL_ADMIN_USERNAME}' with password '{INITIAL_ADMIN_PASSWORD}'. Please change it after logging in!")
 
 # --- Session State Initialization ---
 if 'logged_in' not in st.session_state:
@@ -36,27 +35,9 @@ if 'role' not in st.session_state:
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'inventory' # Default page when app starts
 
-# Create a default admin user if no users exist in users.json
-users_data = load_users()
-if not users_data:
-    from werkzeug.security import generate_password_hash
-    initial_admin_username = "admin"
-    initial_admin_password = "password" # IMPORTANT: CHANGE THIS PASSWORD IMMEDIATELY AFTER FIRST LOGIN!
-    
-    admin_user = {
-        'id': str(uuid.uuid4()),
-        'username': initial_admin_username,
-        'password': generate_password_hash(initial_admin_password),
-        'role': 'admin'
-    }
-    users_data.append(admin_user)
-    save_users(users_data)
-    st.success(f"Initial admin user created: Username '{initial_admin_username}' with password '{initial_admin_password}'. Please change it after logging in!")
-
 # Store the current_user's full ID in session state once logged in for checks
 if st.session_state.logged_in and 'user_id_obj' not in st.session_state:
-    users = load_users()
-    current_user_data = next((u for u in users if u['username'] == st.session_state.username), None)
+    current_user_data = get_user_by_username(st.session_state.username)
     if current_user_data:
         st.session_state.user_id_obj = current_user_data['id']
 
@@ -102,30 +83,37 @@ with st.sidebar:
             st.rerun()
 
 # --- Main Content Area ---
+# Page modules are imported the first time their page is shown, so the login page does not
+# load pandas, ReportLab or Pillow; later reruns find the modules already imported.
+PAGES = {
+    'inventory': ('inventory_pages', 'show_inventory_page'),
+    'dashboard': ('dashboard_pages', 'show_dashboard_page'),
+    'add_item': ('inventory_pages', 'add_item_page'),
+    'edit_item': ('inventory_pages', 'edit_item_page'),
+    'admin_dashboard': ('admin_pages', 'admin_dashboard_page'),
+    'manage_users': ('admin_pages', 'manage_users_page'),
+    'edit_user': ('admin_pages', 'edit_user_page'),
+    'bulk_import': ('admin_pages', 'bulk_import_page'),
+    'export_inventory': ('admin_pages', 'export_inventory_page'),
+    'performance': ('admin_pages', 'performance_page'),
+}
+
+def _show_page(module_name, function_name):
+    # Times the page body; a rerun interrupted by st.rerun() is still recorded up to that point
+    with span(f"page.{function_name}"):
+        getattr(importlib.import_module(module_name), function_name)()
+
 if not st.session_state.logged_in:
     if st.session_state.current_page == 'register':
-        register_page()
+        _show_page('auth', 'register_page')
     else:
-        login_page()
+        _show_page('auth', 'login_page')
+elif st.session_state.current_page in PAGES:
+    _show_page(*PAGES[st.session_state.current_page])
 else:
-    if st.session_state.current_page == 'inventory':
-        show_inventory_page()
-    elif st.session_state.current_page == 'dashboard': # NEW: Dashboard routing
-        show_dashboard_page()
-    elif st.session_state.current_page == 'add_item':
-        add_item_page()
-    elif st.session_state.current_page == 'edit_item':
-        edit_item_page()
-    elif st.session_state.current_page == 'admin_dashboard':
-        admin_dashboard_page()
-    elif st.session_state.current_page == 'manage_users':
-        manage_users_page()
-    elif st.session_state.current_page == 'edit_user':
-        edit_user_page()
-    else:
-        st.write("Page not found. Please use the navigation.")
-        st.session_state.current_page = 'inventory'
-        st.rerun()
+    st.write("Page not found. Please use the navigation.")
+    st.session_state.current_page = 'inventory'
+    st.rerun()
 
 # --- Custom CSS for minor aesthetic tweaks ---
 st.markdown("""
@@ -0,0 +1,194 @@
+import os
+import sys
+import time
+from db_operations import data_version, load_inventory_view
+from file_manifest import image_content_hash, image_files, pdf_files, thumbnail_files
+from pdf_generator import pdf_filename_for
+from utils import CATALOG_RETENTION_SECONDS, get_catalog_dir, get_image_dir, get_pdf_dir, get_thumbnail_dir, is_content_addressed
+
+# --- Orphaned Asset Collection ---
+# Files in the static directories that no item refers to any more pile up over time: PDFs of
+# failed or superseded jobs, uploads whose item was never saved (a crash between the two
+# writes), thumbnails of deleted images, old catalogs and temporary files of interrupted
+# writes. collect_garbage() computes the set of files the inventory refers to, walks each
+# directory with os.scandir in batches of GC_BATCH_SIZE (so a directory of a million files is
+# never listed into memory at once) and deletes the unreferenced files, or only reports them
+# in a dry run. It also reports referenced files that are missing.
+# Files modified within the grace period are never deleted: an upload is written a moment
+# before the item referring to it is saved, and a finished PDF job is stored shortly after its
+# file is written. If the inventory changes while the collector runs, the referenced set is
+# recomputed before the next batch is deleted.
+# `python asset_gc.py [--dry-run] [--grace SECONDS]` runs it from the command line.
+
+GC_BATCH_SIZE = 1000
+GRACE_SECONDS = int(os.environ.get('INVENTORY_GC_GRACE_SECONDS', 3600))
+MAX_REPORTED_FILES = 1000 # Further orphaned or missing files are counted but not listed
+PLACEHOLDER_FILENAME = 'placeholder.png'
+
+
+class GCReport:
+    """Outcome of a collection: counts plus (directory, filename, size) rows for orphaned files."""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.scanned = 0
+        self.orphan_count = 0
+        self.orphan_bytes = 0
+        self.deleted = 0
+        self.deleted_bytes = 0
+        self.recent = 0 # Unreferenced, but still within the grace period
+        self.orphans = []
+        self.missing_count = 0
+        self.missing = [] # (directory, filename) of referenced files that do not exist
+        self.errors = []
+
+    def add_orphan(self, directory, filename, size):
+        self.orphan_count += 1
+        self.orphan_bytes += size
+        if len(self.orphans) < MAX_REPORTED_FILES:
+            self.orphans.append((directory, filename, size))
+
+    def add_missing(self, directory, filename):
+        self.missing_count += 1
+        if len(self.missing) < MAX_REPORTED_FILES:
+            self.missing.append((directory, filename))
+
+
+class _References:
+    """The image, PDF and thumbnail names the inventory refers to at one data version."""
+
+    def __init__(self):
+        self.version = data_version('inventory')
+        self.images = set()
+        self.pdfs = set() # Stored PDFs plus the names pending jobs will write
+        self.ready_pdfs = set() # PDFs items say exist
+        self.thumbnail_prefixes = set()
+        for item in load_inventory_view():
+            image_filename = item.get('image_filename')
+            if image_filename:
+                self.images.add(image_filename)
+                content_hash = os.path.splitext(image_filename)[0] if is_content_addressed(image_filename) else image_content_hash(image_filename)
+                if content_hash:
+                    self.thumbnail_prefixes.add(content_hash[:32])
+            pdf_filename = item.get('pdf_filename')
+            if pdf_filename:
+                self.pdfs.add(pdf_filename)
+                if item.get('pdf_status') in (None, 'ready'):
+                    self.ready_pdfs.add(pdf_filename)
+            self.pdfs.add(pdf_filename_for(item))
+
+    def current(self):
+        """Returns these references, or freshly computed ones if the inventory changed since."""
+        return self if data_version('inventory') == self.version else _References()
+
+
+def _collect_directory(directory, label, is_referenced, references, report, manifest, grace_seconds, now, expected=None):
+    """
+    Walks one directory in batches, deleting (or in a dry run only reporting) the files for
+    which is_referenced(references, filename) is false, and temporary files. Names found are
+    removed from expected, which is left holding the missing ones. Returns the references,
+    recomputed if the inventory changed meanwhile.
+    """
+    batch = []
+
+    def flush():
+        nonlocal references
+        references = references.current()
+        for entry in batch:
+            if not entry.name.endswith('.tmp') and is_referenced(references, entry.name):
+                continue
+            try:
+                stat_result = entry.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat_result.st_mtime < grace_seconds:
+                report.recent += 1
+                continue
+            report.add_orphan(label, entry.name, stat_result.st_size)
+            if report.dry_run:
+                continue
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                report.errors.append(f"{label}/{entry.name}: {e}")
+                continue
+            if manifest is not None:
+                manifest.removed(entry.name)
+            report.deleted += 1
+            report.deleted_bytes += stat_result.st_size
+        batch.clear()
+
+    try:
+        listing = os.scandir(directory)
+    except FileNotFoundError:
+        return references
+    with listing:
+        for entry in listing:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            report.scanned += 1
+            if expected is not None:
+                expected.discard(entry.name)
+            batch.append(entry)
+            if len(batch) >= GC_BATCH_SIZE:
+                flush()
+    flush()
+    return references
+
+def _image_referenced(references, filename):
+    return filename in references.images or filename == PLACEHOLDER_FILENAME
+
+def _pdf_referenced(references, filename):
+    return filename in references.pdfs
+
+def _thumbnail_referenced(references, filename):
+    return filename.split('_', 1)[0] in references.thumbnail_prefixes
+
+
+def collect_garbage(dry_run=False, grace_seconds=GRACE_SECONDS):
+    """
+    Removes unreferenced files from static/images, static/pdfs and static/thumbs, and catalog
+    PDFs older than CATALOG_RETENTION_SECONDS. With dry_run nothing is deleted. Returns a GCReport.
+    """
+    report = GCReport(dry_run)
+    now = time.time()
+    references = _References()
+    expected_images, expected_pdfs = set(references.images), set(references.ready_pdfs)
+
+    references = _collect_directory(get_image_dir(), 'images', _image_referenced, references, report, image_files(), grace_seconds, now, expected_images)
+    references = _collect_directory(get_pdf_dir(), 'pdfs', _pdf_referenced, references, report, pdf_files(), grace_seconds, now, expected_pdfs)
+    for filename in sorted(expected_images):
+        report.add_missing('images', filename)
+    for filename in sorted(expected_pdfs):
+        report.add_missing('pdfs', filename)
+    _collect_directory(get_thumbnail_dir(), 'thumbs', _thumbnail_referenced, references, report, thumbnail_files(), grace_seconds, now)
+    # Catalogs are only downloaded from the session that asked for them; old ones are never referenced
+    _collect_directory(get_catalog_dir(), 'catalogs', lambda references, filename: False, references, report, None,
+                       max(grace_seconds, CATALOG_RETENTION_SECONDS), now)
+    return report
+
+
+if __name__ == '__main__':
+    # Usage: python asset_gc.py [--dry-run] [--grace SECONDS]
+    args = sys.argv[1:]
+    dry_run = '--dry-run' in args
+    args = [arg for arg in args if arg != '--dry-run']
+    grace_seconds = GRACE_SECONDS
+    if args[:1] == ['--grace'] and len(args) == 2 and args[1].isdigit():
+        grace_seconds = int(args[1])
+        args = []
+    if args:
+        print("Usage: python asset_gc.py [--dry-run] [--grace SECONDS]")
+        sys.exit(2)
+    result = collect_garbage(dry_run=dry_run, grace_seconds=grace_seconds)
+    for directory, filename, size in result.orphans:
+        print(f"{'Orphaned' if dry_run else 'Deleted'}: {directory}/{filename} ({size} bytes)")
+    for directory, filename in result.missing:
+        print(f"Missing: {directory}/{filename}")
+    for error in result.errors:
+        print(f"Error: {error}")
+    print(f"Scanned {result.scanned} files: {result.orphan_count} orphaned ({result.orphan_bytes} bytes), "
+          f"{result.deleted} deleted, {result.recent} within the grace period, {result.missing_count} referenced files missing.")
+    sys.exit(1 if result.errors else 0)
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from db_operations import DerivedIndex
+from file_manifest import image_files
+from utils import get_image_dir
+
+# --- Content-Addressed Image Store ---
+# Uploaded images are stored under the sha256 of their bytes (<hash>.<ext>), so the same photo
+# uploaded for many items is written to disk once and every item's 'image_filename' points at
+# the same file. How many items use a file is not stored separately: it is counted from the
+# item records themselves by a shared index kept current by record-level writes, so it can
+# never drift from the data. A file is only unlinked once no item refers to it any more.
+# Files written in the last RELEASE_GRACE_SECONDS are never unlinked, because an upload is
+# stored a moment before the item referring to it is saved.
+
+RELEASE_GRACE_SECONDS = 60
+
+
+def image_filename_for(data, original_filename):
+    """Returns the content-addressed filename store_image() stores the bytes under."""
+    return f"{hashlib.sha256(data).hexdigest()}{os.path.splitext(original_filename)[1].lower()}"
+
+def store_image(data, original_filename):
+    """
+    Stores uploaded image bytes under their content hash and returns the filename.
+    If an identical image is already stored, nothing is written.
+    """
+    image_filename = image_filename_for(data, original_filename)
+    images_dir = get_image_dir()
+    os.makedirs(images_dir, exist_ok=True)
+    image_path = os.path.join(images_dir, image_filename)
+    if os.path.exists(image_path):
+        os.utime(image_path) # Restarts the grace period, so a concurrent release keeps the file
+        image_files().added(image_filename)
+        return image_filename
+    tmp_path = f"{image_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, image_path)
+    image_files().added(image_filename)
+    return image_filename
+
+
+class ImageReferences(DerivedIndex):
+    """Number of inventory items referring to each image file."""
+
+    def __init__(self):
+        super().__init__()
+        self._counts = Counter()
+
+    def rebuild(self, records):
+        self._counts = Counter(item.get('image_filename') for item in records if item.get('image_filename'))
+
+    def apply_change(self, before, after):
+        if before is not None and before.get('image_filename'):
+            self._counts[before['image_filename']] -= 1
+            if self._counts[before['image_filename']] <= 0:
+                del self._counts[before['image_filename']]
+        if after is not None and after.get('image_filename'):
+            self._counts[after['image_filename']] += 1
+
+    def count(self, image_filename):
+        self.ensure_current()
+        with self._lock:
+            return self._counts.get(image_filename, 0)
+
+
+_references = None
+_references_lock = threading.Lock()
+
+def get_image_references():
+    """Returns the process-wide image reference counts."""
+    global _references
+    with _references_lock:
+        if _references is None:
+            _references = ImageReferences()
+        return _references
+
+def release_image(image_filename, grace_seconds=RELEASE_GRACE_SECONDS):
+    """
+    Deletes an image file if no item refers to it any more. Call after the record that dropped
+    the reference has been saved. Returns True if the file was deleted.
+    grace_seconds=0 discards an upload this request wrote itself and then failed to save.
+    """
+    if not image_filename or get_image_references().count(image_filename) > 0:
+        return False
+    image_path = os.path.join(get_image_dir(), image_filename)
+    try:
+        if time.time() - os.path.getmtime(image_path) < grace_seconds:
+            return False
+        os.remove(image_path)
+    except FileNotFoundError:
+        image_files().removed(image_filename)
+        return False
+    image_files().removed(image_filename)
+    print(f"Deleted image: {image_path}")
+    return True
@@ -1,7 +1,9 @@
 import streamlit as st
+import math
 import uuid
-from werkzeug.security import generate_password_hash, check_password_hash
-from db_operations import load_users, save_users
+from db_operations import get_user_by_username, insert_user, update_user, RecordNotFoundError, VersionConflictError
+from perf import span
+from passwords import HashingBusyError, clear_failed_logins, hash_password, login_retry_after, needs_rehash, record_failed_login, verify_password
 
 def login_page():
     """Renders the login form and handles user authentication."""
@@ -13,21 +15,51 @@ def login_page():
         submitted = st.form_submit_button("Login")
 
         if submitted:
-            users = load_users()
-            user_data = next((u for u in users if u['username'].lower() == username.lower()), None)
+            client = _client_address()
+            retry_after = login_retry_after(username, client)
+            if retry_after:
+                # Refused before any hashing, so repeated guesses cost next to nothing
+                st.error(f"Too many failed login attempts. Please try again in {math.ceil(retry_after)} seconds.")
+                st.stop()
+            with span('auth.lookup_user'):
+                user_data = get_user_by_username(username)
+            try:
+                valid = bool(user_data) and verify_password(user_data['password'], password)
+            except HashingBusyError as e:
+                st.error(str(e))
+                st.stop()
 
-            if user_data and check_password_hash(user_data['password'], password):
+            if valid:
+                clear_failed_logins(username)
+                if needs_rehash(user_data['password']):
+                    _rehash_password(user_data, password)
                 st.session_state.logged_in = True
                 st.session_state.username = user_data['username']
                 st.session_state.role = user_data['role']
+                st.session_state.user_id_obj = user_data['id'] # Saves app.py looking the user up again
                 st.session_state.current_page = 'inventory'
                 st.success(f"Logged in successfully as {st.session_state.username} ({st.session_state.role.capitalize()})!")
                 st.rerun()
             else:
+                record_failed_login(username, client)
                 st.error("Invalid username or password.")
     
     st.markdown("Don't have an account? Navigate to **Register** in the sidebar.")
 
+def _client_address():
+    """Returns the client's IP address as seen by Streamlit, or None if it is not known."""
+    try:
+        return st.context.ip_address
+    except Exception:
+        return None
+
+def _rehash_password(user_data, password):
+    """Stores a hash made with the current cost profile. Skipped if the user changed meanwhile."""
+    try:
+        update_user(user_data['id'], {'password': hash_password(password)}, expected_version=user_data.get('version', 0))
+    except (HashingBusyError, RecordNotFoundError, VersionConflictError):
+        pass # The next login tries again
+
 def register_page():
     """Renders the registration form and handles new user creation."""
     st.subheader("Register")
@@ -46,19 +78,21 @@ def register_page():
             elif len(password) < 6:
                 st.error('Password must be at least 6 characters long.')
             else:
-                users = load_users()
-                if any(user['username'].lower() == username.lower() for user in users):
+                if get_user_by_username(username):
                     st.error('Username already exists. Please choose a different one.')
                 else:
-                    hashed_password = generate_password_hash(password) 
+                    try:
+                        hashed_password = hash_password(password)
+                    except HashingBusyError as e:
+                        st.error(str(e))
+                        st.stop()
                     new_user = {
                         'id': str(uuid.uuid4()),
                         'username': username,
                         'password': hashed_password,
                         'role': role
                     }
-                    users.append(new_user)
-                    save_users(users)
+                    insert_user(new_user)
                     st.success('Registration successful! You can now log in.')
                     st.session_state.current_page = 'login'
                     st.rerun()
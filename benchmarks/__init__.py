@@ -0,0 +1,12 @@
+"""
+Benchmarks for the inventory app on seeded synthetic data.
+
+    python -m benchmarks run [--items N] [--users N] [--images N] [--seed N] [--backend json|journal|sqlite]
+                             [--only GROUP,...] [--repeat N] [--out RESULTS.json]
+    python -m benchmarks compare BASELINE.json RESULTS.json [--tolerance FRACTION]
+
+`run` generates an inventory, a user set and sample images in a scratch directory (the app's
+own data is never touched), times the storage, search, dashboard, PDF and password hashing
+paths, and writes the results as JSON. `compare` reports the benchmarks that got slower than a
+baseline run by more than the tolerance and exits with status 1 if there are any.
+"""
@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+USAGE = """Usage: python -m benchmarks run [--items N] [--users N] [--images N] [--seed N] [--backend json|journal|sqlite]
+                               [--only GROUP,...] [--repeat N] [--out RESULTS.json] [--keep]
+       python -m benchmarks compare BASELINE.json RESULTS.json [--tolerance FRACTION]"""
+
+RUN_DEFAULTS = {'--items': '10000', '--users': '100', '--images': '20', '--seed': '0', '--backend': 'json',
+                '--only': None, '--repeat': '5', '--out': None}
+
+
+def _parse_options(args, defaults, flags=()):
+    """Parses '--name value' pairs (and bare flags) into a dict; exits with the usage on anything else."""
+    options = dict(defaults)
+    options.update({flag: False for flag in flags})
+    position = 0
+    while position < len(args):
+        name = args[position]
+        if name in flags:
+            options[name] = True
+            position += 1
+        elif name in defaults and position + 1 < len(args):
+            options[name] = args[position + 1]
+            position += 2
+        else:
+            print(USAGE)
+            sys.exit(2)
+    return options
+
+def _run(args):
+    options = _parse_options(args, RUN_DEFAULTS, flags=('--keep',))
+    # The app modules read these when first imported, so set them before anything imports them
+    data_dir = tempfile.mkdtemp(prefix='inventory_bench_')
+    os.environ['INVENTORY_DATA_DIR'] = data_dir
+    os.environ['INVENTORY_STORAGE_BACKEND'] = options['--backend']
+    os.environ.pop('INVENTORY_SQLITE_FILE', None)
+    os.environ.pop('INVENTORY_AGGREGATES_FILE', None)
+    os.environ['INVENTORY_PERF'] = '0' # Time the code paths themselves, without the span bookkeeping
+    from benchmarks.suite import BENCHMARK_GROUPS, run_benchmarks
+
+    groups = BENCHMARK_GROUPS if options['--only'] is None else [group.strip() for group in options['--only'].split(',')]
+    unknown = [group for group in groups if group not in BENCHMARK_GROUPS]
+    if unknown:
+        print(f"Error: unknown benchmark group(s) {', '.join(unknown)}. Expected: {', '.join(BENCHMARK_GROUPS)}.")
+        sys.exit(2)
+    try:
+        document = run_benchmarks(int(options['--items']), int(options['--users']), int(options['--images']),
+                                  int(options['--seed']), groups, int(options['--repeat']))
+    finally:
+        if options['--keep']:
+            print(f"Benchmark data kept in {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    text = json.dumps(document, indent=2)
+    if options['--out']:
+        with open(options['--out'], 'w') as f:
+            f.write(text + '\n')
+        print(f"Wrote {len(document['results'])} results to {options['--out']}.")
+    else:
+        print(text)
+
+def _compare(args):
+    if len(args) < 2:
+        print(USAGE)
+        sys.exit(2)
+    options = _parse_options(args[2:], {'--tolerance': '0.25'})
+    from benchmarks.suite import compare_results
+    with open(args[0]) as f:
+        baseline = json.load(f)
+    with open(args[1]) as f:
+        current = json.load(f)
+    if baseline['meta'].get('items') != current['meta'].get('items') or baseline['meta'].get('backend') != current['meta'].get('backend'):
+        print("Warning: the runs used different data sizes or backends; the timings are not directly comparable.")
+    regressions = compare_results(baseline, current, float(options['--tolerance']))
+    for name, before, after in regressions:
+        print(f"{name}: {before:.3f} ms -> {after:.3f} ms ({after / before - 1:+.0%})")
+    if regressions:
+        print(f"{len(regressions)} benchmarks regressed by more than {float(options['--tolerance']):.0%}.")
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == '__main__':
+    # Usage: see USAGE above
+    if len(sys.argv) < 2 or sys.argv[1] not in ('run', 'compare'):
+        print(USAGE)
+        sys.exit(2)
+    if sys.argv[1] == 'run':
+        _run(sys.argv[2:])
+    else:
+        _compare(sys.argv[2:])
@@ -0,0 +1,224 @@
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+
+# --- Benchmark Suite ---
+# Each benchmark times one code path the pages run, on the data generated by populate(). The
+# app modules are imported inside the functions, after __main__.py has pointed
+# INVENTORY_DATA_DIR at the scratch directory, so nothing here can touch the real data files.
+# Every benchmark runs once untimed (filling caches and loading modules) and then `repeat`
+# timed rounds; a setup function, when given, runs before each round outside the timing.
+
+BENCHMARK_GROUPS = ('storage', 'search', 'dashboard', 'pdf', 'auth')
+LOGIN_BURST = 16 # Simultaneous logins in the auth.login_burst benchmark
+MIN_REGRESSION_MS = 0.05 # Smaller slowdowns are timer noise on the microsecond-scale benchmarks
+
+
+def _measure(results, name, function, repeat, setup=None, **info):
+    """Times function() and appends a result row with min/median/p95/max/mean in milliseconds."""
+    if setup is not None:
+        setup()
+    function() # Warm-up round
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    row = {
+        'name': name,
+        'group': name.split('.', 1)[0],
+        'repeat': repeat,
+        'min_ms': durations[0] * 1000,
+        'median_ms': statistics.median(durations) * 1000,
+        'p95_ms': durations[min(len(durations) - 1, int(0.95 * len(durations)))] * 1000,
+        'max_ms': durations[-1] * 1000,
+        'mean_ms': statistics.fmean(durations) * 1000,
+    }
+    row.update(info)
+    results.append(row)
+    print(f"  {name:<36} median {row['median_ms']:10.3f} ms   p95 {row['p95_ms']:10.3f} ms")
+    return row
+
+
+# --- Data Set ---
+def populate(item_count, user_count, image_count, seed):
+    """Writes the synthetic images, users and items into the (scratch) data directory. Returns the items."""
+    from asset_store import store_image
+    from db_operations import save_inventory, save_users
+    from passwords import hash_password
+    from benchmarks.synthetic import generate_items, generate_users, sample_image_bytes
+    from utils import ensure_dirs
+
+    ensure_dirs()
+    image_filenames = [store_image(sample_image_bytes(seed * 1000 + index), f"sample_{index}.jpg") for index in range(image_count)]
+    items = generate_items(item_count, seed, image_filenames)
+    save_users(generate_users(user_count, hash_password("benchmark"), seed))
+    save_inventory(items)
+    return items
+
+
+# --- Benchmarks ---
+def bench_storage(results, items, repeat, seed):
+    """
+    load_data/save_data on a JSON file of the items (whatever the backend), plus single-record
+    reads and writes through the configured backend.
+    """
+    from db_operations import BASE_DIR, DB_FILE, STORAGE_BACKEND, get_item, invalidate_cache, load_data, load_data_view, save_data, update_item
+    from inventory_aggregates import get_inventory_aggregates
+    from search_index import get_search_index
+
+    rng = random.Random(seed)
+    json_file = os.path.join(BASE_DIR, 'benchmark_items.json')
+    save_data(json_file, items)
+    _measure(results, 'storage.load_data_view_cold', lambda: load_data_view(json_file), repeat, setup=lambda: invalidate_cache(json_file),
+             bytes=os.path.getsize(json_file))
+    _measure(results, 'storage.load_data_cached', lambda: load_data(json_file), repeat)
+    _measure(results, 'storage.save_data', lambda: save_data(json_file, items), repeat)
+    invalidate_cache(json_file)
+    os.remove(json_file)
+
+    # Writes update every registered index, as they do in the app after a few page views
+    get_inventory_aggregates().ensure_current()
+    get_search_index().ensure_current()
+    _measure(results, 'storage.get_item', lambda: get_item(rng.choice(items)['id']), repeat)
+    if STORAGE_BACKEND == 'json':
+        # A process that has not parsed db.json yet reads the one record through the offset index
+        _measure(results, 'storage.get_item_unparsed', lambda: get_item(rng.choice(items)['id']), repeat, setup=lambda: invalidate_cache(DB_FILE))
+    _measure(results, 'storage.update_item', lambda: update_item(rng.choice(items)['id'], {'quantity': rng.randint(0, 500)}), repeat)
+
+def bench_search(results, items, repeat, seed):
+    """The lookups behind the inventory page's search box, category filter, range filters and sorting."""
+    from db_operations import load_inventory_view
+    from search_index import get_search_index
+
+    index = get_search_index()
+    records = load_inventory_view()
+    _measure(results, 'search.index_rebuild', lambda: index.rebuild(records), repeat)
+    index.ensure_current()
+    all_ids = index.search()
+    sample_name = items[len(items) // 2]['name']
+    word = sample_name.split()[1].lower()
+    typo = word[:2] + word[3:] if len(word) > 4 else word + 'x'
+    _measure(results, 'search.all_items', lambda: index.search(), repeat, matches=len(all_ids))
+    _measure(results, 'search.category', lambda: index.search('', 'Books'), repeat)
+    _measure(results, 'search.substring', lambda: index.search(word), repeat, query=word, matches=len(index.search(word)))
+    _measure(results, 'search.substring_in_category', lambda: index.search(word, items[len(items) // 2]['category']), repeat)
+    _measure(results, 'search.fuzzy', lambda: index.search(typo, fuzzy=True), repeat, query=typo)
+    _measure(results, 'search.id_prefix', lambda: index.search(items[-1]['id'][:8]), repeat)
+    _measure(results, 'search.sort_all_by_name', lambda: index.sort_by_name(all_ids), repeat)
+    _measure(results, 'search.sort_by_price_desc', lambda: index.query(sort='price', descending=True), repeat)
+    price_range = {'price': (10.0, 50.0)}
+    _measure(results, 'search.price_range_sorted', lambda: index.query(ranges=price_range, sort='price'), repeat,
+             matches=len(index.query(ranges=price_range)))
+    low_stock = {'quantity': (None, 9)}
+    _measure(results, 'search.low_stock_in_category_by_name', lambda: index.query('', 'Books', ranges=low_stock, sort='name'), repeat)
+
+def bench_dashboard(results, items, repeat, seed):
+    """The dashboard's totals, the per-category item table and the structures behind them."""
+    from db_operations import load_inventory_view
+    from inventory_aggregates import count_categories, get_inventory_aggregates
+    from inventory_columns import get_inventory_columns
+
+    aggregates = get_inventory_aggregates()
+    columns = get_inventory_columns()
+    records = load_inventory_view()
+    _measure(results, 'dashboard.summary', aggregates.summary, repeat)
+    _measure(results, 'dashboard.aggregates_recount', lambda: count_categories(records), repeat)
+
+    def rebuild_columns():
+        columns.rebuild(records)
+        columns.frame()
+    _measure(results, 'dashboard.columns_rebuild', rebuild_columns, repeat)
+
+    def category_items():
+        df = columns.frame()
+        category_items = df[df['category'] == 'Electronics'][['name', 'quantity', 'price', 'id']].copy()
+        category_items['price'] = category_items['price'].map('${:,.2f}'.format)
+    _measure(results, 'dashboard.category_items', category_items, repeat)
+
+def bench_pdf(results, items, repeat, seed):
+    """Rendering one item PDF, with and without an embedded photo."""
+    from pdf_generator import generate_item_pdf
+
+    with_image = next((item for item in items if item['image_filename']), None)
+    without_image = next((item for item in items if not item['image_filename']), items[0])
+    if with_image is not None:
+        _measure(results, 'pdf.generate_with_image', lambda: generate_item_pdf(with_image, with_image['image_filename']), repeat)
+    _measure(results, 'pdf.generate_without_image', lambda: generate_item_pdf(without_image), repeat)
+
+def bench_auth(results, items, repeat, seed):
+    """Password hashing at the configured cost profile, alone and for a burst of simultaneous logins."""
+    from db_operations import get_user_by_username
+    from passwords import HASH_PROFILE, HASH_WORKERS, hash_password, verify_password
+
+    stored_hash = get_user_by_username('admin')['password']
+    _measure(results, 'auth.hash_password', lambda: hash_password("benchmark"), repeat, profile=HASH_PROFILE)
+    _measure(results, 'auth.verify_password', lambda: verify_password(stored_hash, "benchmark"), repeat, profile=HASH_PROFILE)
+
+    def login_burst():
+        threads = [threading.Thread(target=verify_password, args=(stored_hash, "benchmark")) for _ in range(LOGIN_BURST)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    row = _measure(results, 'auth.login_burst', login_burst, repeat, profile=HASH_PROFILE, logins=LOGIN_BURST, workers=HASH_WORKERS)
+    row['logins_per_s'] = LOGIN_BURST / (row['median_ms'] / 1000)
+
+BENCHMARKS = {
+    'storage': bench_storage,
+    'search': bench_search,
+    'dashboard': bench_dashboard,
+    'pdf': bench_pdf,
+    'auth': bench_auth,
+}
+
+
+def run_benchmarks(item_count, user_count, image_count, seed, groups=BENCHMARK_GROUPS, repeat=5):
+    """Populates the data directory and runs the benchmark groups. Returns the results document."""
+    from db_operations import STORAGE_BACKEND
+
+    print(f"Generating {item_count} items, {user_count} users and {image_count} images (seed {seed})...")
+    started = time.perf_counter()
+    items = populate(item_count, user_count, image_count, seed)
+    setup_seconds = time.perf_counter() - started
+    results = []
+    for group in groups:
+        print(f"{group}:")
+        BENCHMARKS[group](results, items, repeat, seed)
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'items': item_count,
+            'users': user_count,
+            'images': image_count,
+            'seed': seed,
+            'repeat': repeat,
+            'backend': STORAGE_BACKEND,
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'setup_seconds': setup_seconds,
+        },
+        'results': results,
+    }
+
+def compare_results(baseline, current, tolerance):
+    """
+    Returns (name, baseline median, current median) for every benchmark present in both runs
+    whose median grew by more than tolerance (a fraction, 0.25 = 25%) and by at least
+    MIN_REGRESSION_MS.
+    """
+    baseline_medians = {row['name']: row['median_ms'] for row in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        before = baseline_medians.get(row['name'])
+        if before is not None and row['median_ms'] > before * (1 + tolerance) and row['median_ms'] - before >= MIN_REGRESSION_MS:
+            regressions.append((row['name'], before, row['median_ms']))
+    return regressions
@@ -0,0 +1,93 @@
+import io
+import random
+import uuid
+
+# --- Synthetic Inventory Data ---
+# Deterministic for a given seed, so two benchmark runs work on identical data. The shapes
+# follow what a real inventory looks like: a few categories hold most of the items, quantities
+# are mostly small with a long tail, prices are log-normal around a per-category typical price,
+# and many items share a handful of photos (or have none).
+
+# category -> (share of the items, typical price)
+CATEGORY_PROFILE = {
+    "Electronics": (0.22, 120.0),
+    "Books": (0.18, 15.0),
+    "Clothing": (0.17, 35.0),
+    "Home Goods": (0.15, 45.0),
+    "Food": (0.12, 6.0),
+    "Office Supplies": (0.11, 9.0),
+    "Other": (0.05, 25.0),
+}
+
+ADJECTIVES = ["Compact", "Deluxe", "Classic", "Portable", "Wireless", "Organic", "Premium", "Basic", "Heavy-Duty",
+              "Vintage", "Ergonomic", "Recycled", "Smart", "Mini", "Large", "Waterproof", "Handmade", "Budget"]
+NOUNS = {
+    "Electronics": ["Headphones", "Charger", "Speaker", "Monitor", "Keyboard", "Mouse", "Router", "Webcam", "Cable"],
+    "Books": ["Novel", "Cookbook", "Atlas", "Dictionary", "Biography", "Textbook", "Anthology", "Guide"],
+    "Clothing": ["Jacket", "T-Shirt", "Scarf", "Sneakers", "Jeans", "Hoodie", "Socks", "Gloves"],
+    "Home Goods": ["Lamp", "Blanket", "Vase", "Mug", "Cushion", "Frying Pan", "Towel Set", "Clock"],
+    "Food": ["Coffee Beans", "Olive Oil", "Granola", "Green Tea", "Pasta", "Honey", "Dark Chocolate"],
+    "Office Supplies": ["Stapler", "Notebook", "Pen Set", "Binder", "Desk Organizer", "Sticky Notes", "Paper Ream"],
+    "Other": ["Gift Card", "Umbrella", "Water Bottle", "Backpack", "Yoga Mat", "Plant Pot"],
+}
+IMAGE_SHARE = 0.7 # Share of the items that have a photo
+
+
+def _weighted_categories():
+    categories = list(CATEGORY_PROFILE)
+    return categories, [CATEGORY_PROFILE[category][0] for category in categories]
+
+def generate_items(count, seed=0, image_filenames=()):
+    """
+    Returns count item records (id, name, category, quantity, price, image_filename and the
+    pdf_filename field the app expects). image_filenames are shared among the items with a photo.
+    """
+    rng = random.Random(seed)
+    categories, weights = _weighted_categories()
+    image_filenames = list(image_filenames)
+    items = []
+    for category in rng.choices(categories, weights, k=count):
+        typical_price = CATEGORY_PROFILE[category][1]
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS[category])} {rng.choice('ABCDEFGHJKLMNPRSTX')}{rng.randint(10, 9999)}"
+        items.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'name': name,
+            'category': category,
+            'quantity': min(int(rng.paretovariate(1.2)) - 1, 100000),
+            'price': round(typical_price * rng.lognormvariate(0, 0.6), 2),
+            'pdf_filename': None,
+            'image_filename': rng.choice(image_filenames) if image_filenames and rng.random() < IMAGE_SHARE else None,
+        })
+    return items
+
+def generate_users(count, password_hash, seed=0):
+    """
+    Returns count user records: one admin and the rest with the 'user' role. All of them share
+    password_hash, since hashing a password per user would make generating large sets very slow.
+    """
+    rng = random.Random(seed)
+    users = []
+    for index in range(count):
+        users.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'username': 'admin' if index == 0 else f"user{index:07d}",
+            'password': password_hash,
+            'role': 'admin' if index == 0 else 'user',
+        })
+    return users
+
+def sample_image_bytes(seed, size=(1200, 900)):
+    """Returns a JPEG photo-sized test image (a gradient with shapes, so it compresses like a photo would)."""
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    base = tuple(rng.randrange(256) for _ in range(3))
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    image = Image.blend(image, Image.new('RGB', size, base), 0.6)
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        radius = rng.randint(30, 200)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=tuple(rng.randrange(256) for _ in range(3)))
+    out = io.BytesIO()
+    image.save(out, format='JPEG', quality=85)
+    return out.getvalue()
@@ -0,0 +1,54 @@
+import threading
+import uuid
+from db_operations import load_users_view, insert_user
+from inventory_aggregates import get_inventory_aggregates
+from passwords import HashingBusyError, hash_password
+from utils import ensure_dirs
+
+# --- One-Time Process Setup ---
+# Streamlit executes app.py from the top on every interaction of every session, so anything
+# that only has to happen once per server process is done here, on the first rerun, instead of
+# on each one: creating the static directories, registering the dashboard aggregates for
+# writes, and seeding the initial admin account when there are no users yet.
+
+INITIAL_ADMIN_USERNAME = "admin"
+INITIAL_ADMIN_PASSWORD = "password" # IMPORTANT: CHANGE THIS PASSWORD IMMEDIATELY AFTER FIRST LOGIN!
+
+_done = False
+_lock = threading.Lock()
+
+
+def bootstrap():
+    """
+    Runs the one-time setup if this process has not done so yet. Returns True only for the call
+    that created the initial admin user, so the app can show its credentials once.
+    """
+    global _done
+    if _done:
+        return False
+    with _lock:
+        if _done:
+            return False
+        ensure_dirs()
+        # Track every inventory write in this process, so the saved dashboard totals stay current
+        get_inventory_aggregates()
+        try:
+            created_admin = _seed_initial_admin()
+        except HashingBusyError as e:
+            # Leave _done unset so the next rerun seeds the admin user instead
+            print(f"Warning: Could not create the initial admin user yet: {e}")
+            return False
+        _done = True
+    return created_admin
+
+def _seed_initial_admin():
+    """Creates the default admin user if no users exist. Returns True if it was created."""
+    if load_users_view():
+        return False
+    insert_user({
+        'id': str(uuid.uuid4()),
+        'username': INITIAL_ADMIN_USERNAME,
+        'password': hash_password(INITIAL_ADMIN_PASSWORD),
+        'role': 'admin'
+    })
+    return True
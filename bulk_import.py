@@ -0,0 +1,251 @@
+import csv
+import io
+import json
+import math
+import os
+import sys
+import zipfile
+from asset_store import store_image
+from db_operations import apply_item_batch, get_items
+from inventory_aggregates import get_inventory_aggregates
+from pdf_jobs import enqueue_pdf, pending_changes, wait_for_jobs
+from utils import ITEM_CATEGORIES, allowed_file
+
+# --- Bulk Item Import ---
+# Reads items from a CSV file (with a header row) or a JSONL file (one object per line) and
+# inserts them in batches, each batch being a single apply_item_batch() write. The file is
+# parsed as a stream, so its size does not matter. Recognised fields:
+#   name      required
+#   category  required, one of ITEM_CATEGORIES (case-insensitive)
+#   quantity  required, whole number >= 1
+#   price     required, number >= 0.01
+#   image     optional, file name of an image inside the accompanying zip archive
+#   id        optional, must not exist yet (a new id is generated otherwise)
+# Invalid rows are skipped and reported with their row number; valid rows are imported.
+# PDFs are queued to the background workers after each batch is committed.
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000 # Further errors are counted but not listed
+
+
+class ImportReport:
+    """Outcome of an import: counts plus (row number, message) pairs for rejected rows."""
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+
+def detect_format(filename):
+    """Returns 'csv' or 'jsonl' for an import file name, or raises ValueError."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"Unsupported import file type '{extension}'. Use .csv or .jsonl.")
+
+def iter_rows(fileobj, file_format):
+    """
+    Yields (row number, row) pairs from a binary CSV or JSONL stream, reading it incrementally.
+    CSV rows are dicts keyed by the header; JSONL rows are the undecoded lines.
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        if file_format == 'csv':
+            for row_number, row in enumerate(csv.DictReader(text), start=2): # Row 1 is the header
+                yield row_number, row
+        else:
+            for row_number, line in enumerate(text, start=1):
+                if line.strip():
+                    yield row_number, line
+    finally:
+        text.detach() # Leave the caller's file open
+
+
+class _ZipImages:
+    """Looks up images in an uploaded zip archive by file name and stores each one only once."""
+
+    def __init__(self, zip_file):
+        self._zip = zipfile.ZipFile(zip_file)
+        self._members = {}
+        for info in self._zip.infolist():
+            if not info.is_dir():
+                self._members.setdefault(os.path.basename(info.filename), info)
+        self._stored = {} # name in the archive -> stored image filename
+
+    def store(self, name):
+        name = os.path.basename(name)
+        if name in self._stored:
+            return self._stored[name]
+        if not allowed_file(name):
+            raise ValueError(f"image '{name}' is not a png, jpg, jpeg or gif file")
+        info = self._members.get(name)
+        if info is None:
+            raise ValueError(f"image '{name}' is not in the image archive")
+        image_filename = store_image(self._zip.read(info), name)
+        self._stored[name] = image_filename
+        return image_filename
+
+
+def _number(row, field, convert):
+    value = row.get(field)
+    if value is None or str(value).strip() == '':
+        raise ValueError(f"{field} is required")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} '{value}' is not a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{field} '{value}' is not a number")
+    if convert is int:
+        if not number.is_integer():
+            raise ValueError(f"{field} '{value}' is not a whole number")
+        return int(number)
+    return number
+
+def build_item(row, images=None):
+    """Validates one import row and returns the item to insert, or raises ValueError."""
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(row, dict):
+        raise ValueError("row is not an object")
+
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise ValueError("name is required")
+    categories = {category.lower(): category for category in ITEM_CATEGORIES}
+    category = categories.get(str(row.get('category') or '').strip().lower())
+    if category is None:
+        raise ValueError(f"category '{row.get('category') or ''}' is not one of: {', '.join(ITEM_CATEGORIES)}")
+    quantity = _number(row, 'quantity', int)
+    if quantity < 1:
+        raise ValueError("quantity must be at least 1")
+    price = _number(row, 'price', float)
+    if price < 0.01:
+        raise ValueError("price must be at least 0.01")
+
+    image_filename = None
+    image_name = str(row.get('image') or '').strip()
+    if image_name:
+        if images is None:
+            raise ValueError(f"image '{image_name}' given but no image archive was provided")
+        image_filename = images.store(image_name)
+
+    item = {'name': name, 'category': category, 'quantity': quantity, 'price': price,
+            'pdf_filename': None, 'image_filename': image_filename}
+    item_id = str(row.get('id') or '').strip()
+    if item_id:
+        item['id'] = item_id
+    return item
+
+def _commit_batch(batch, report, queue_pdfs):
+    """Inserts a batch of (row number, item) pairs with a single write and queues their PDFs."""
+    given_ids = [item['id'] for _, item in batch if 'id' in item]
+    existing = {item['id'] for item in get_items(given_ids)} if given_ids else set()
+    operations = []
+    for row_number, item in batch:
+        if item.get('id') in existing:
+            report.add_error(row_number, f"an item with id '{item['id']}' already exists")
+            continue
+        if queue_pdfs:
+            item.update(pending_changes())
+        operations.append({'op': 'insert', 'record': item})
+    if not operations:
+        return
+    inserted = apply_item_batch(operations)
+    report.imported += len(inserted)
+    if queue_pdfs:
+        for item in inserted:
+            enqueue_pdf(item)
+
+def import_items(fileobj, file_format, image_zip=None, queue_pdfs=True, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Imports items from a binary CSV/JSONL stream (see the field list above) and returns an
+    ImportReport. image_zip is an optional zip archive (path or binary file) holding the images
+    named in the 'image' field. progress(fraction, report) is called after every batch, with
+    fraction None when the stream's size is unknown.
+    """
+    report = ImportReport()
+    images = _ZipImages(image_zip) if image_zip is not None else None
+    total_size = None
+    if fileobj.seekable():
+        start = fileobj.tell()
+        total_size = fileobj.seek(0, io.SEEK_END) - start
+        fileobj.seek(start)
+
+    seen_ids = set()
+    batch = []
+    for row_number, row in iter_rows(fileobj, file_format):
+        report.rows += 1
+        try:
+            item = build_item(row, images)
+        except ValueError as e:
+            report.add_error(row_number, str(e))
+            continue
+        if 'id' in item:
+            if item['id'] in seen_ids:
+                report.add_error(row_number, f"id '{item['id']}' appears more than once in the file")
+                continue
+            seen_ids.add(item['id'])
+        batch.append((row_number, item))
+        if len(batch) >= batch_size:
+            _commit_batch(batch, report, queue_pdfs)
+            batch = []
+            if progress is not None:
+                progress(min(1.0, fileobj.tell() / total_size) if total_size else None, report)
+    if batch:
+        _commit_batch(batch, report, queue_pdfs)
+    if progress is not None:
+        progress(1.0, report)
+    return report
+
+
+if __name__ == '__main__':
+    # Usage: python bulk_import.py ITEMS.csv|ITEMS.jsonl [--images IMAGES.zip] [--no-pdfs]
+    args = sys.argv[1:]
+    queue_pdfs = '--no-pdfs' not in args
+    args = [arg for arg in args if arg != '--no-pdfs']
+    image_zip = None
+    if '--images' in args:
+        position = args.index('--images')
+        if position + 1 >= len(args):
+            args = []
+        else:
+            image_zip = args[position + 1]
+            del args[position:position + 2]
+    if len(args) != 1:
+        print("Usage: python bulk_import.py ITEMS.csv|ITEMS.jsonl [--images IMAGES.zip] [--no-pdfs]")
+        sys.exit(2)
+    try:
+        file_format = detect_format(args[0])
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+
+    def _print_progress(fraction, report):
+        done = f"{fraction:.0%}" if fraction is not None else f"{report.rows} rows"
+        print(f"  {done}: {report.imported} imported, {report.error_count} rejected")
+
+    get_inventory_aggregates() # Keeps the saved dashboard totals current through the import
+    with open(args[0], 'rb') as f:
+        result = import_items(f, file_format, image_zip=image_zip, queue_pdfs=queue_pdfs, progress=_print_progress)
+    for row_number, message in result.errors:
+        print(f"Row {row_number}: {message}")
+    if result.error_count > len(result.errors):
+        print(f"... and {result.error_count - len(result.errors)} more errors")
+    print(f"Imported {result.imported} of {result.rows} rows.")
+    if queue_pdfs and result.imported:
+        print("Waiting for item PDFs to be generated...")
+        wait_for_jobs()
+    sys.exit(1 if result.error_count else 0)
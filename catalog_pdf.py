@@ -0,0 +1,225 @@
+import os
+import uuid
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import BaseDocTemplate, Flowable, Frame, KeepInFrame, PageBreak, PageTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus.tableofcontents import TableOfContents
+from thumbnails import GRID_WIDTH, PREVIEW_WIDTH, thumbnail_path
+from utils import CATALOG_LAYOUTS, get_catalog_dir
+
+# --- Catalog PDF Rendering ---
+# Builds one PDF for many items: a title page with a table of contents, then the items grouped
+# by category, either one page per item or as a compact table. Like pdf_generator.py this module
+# does not import Streamlit, so catalogs are rendered by the background workers (pdf_jobs.py).
+# ReportLab wants the whole story up front, so the story holds small _Lazy stand-ins: each one
+# builds its paragraphs, tables and images only when it is laid out and drops them again once
+# drawn. Memory therefore stays flat however many items the catalog has, and images come from
+# the (small) thumbnail variants rather than the original uploads.
+# The worker is handed item ids, not items, and reads the records itself CATALOG_FETCH_SIZE at
+# a time, keeping only the CATALOG_FIELDS it renders; the server never holds the catalog's
+# items nor sends them to the worker in one piece.
+# Paragraph text is ReportLab markup, so names, categories and the title are escaped: one item
+# named "A & <b>" would otherwise fail the whole catalog.
+
+CATALOG_FETCH_SIZE = 5000 # Items read per get_items() call when collecting a catalog
+CATALOG_FIELDS = ['id', 'name', 'category', 'quantity', 'price', 'image_filename']
+TABLE_ROWS_PER_CHUNK = 25 # Rows built together; a chunk may still split across pages
+TABLE_IMAGE_SIZE = 0.6 * inch
+PAGE_IMAGE_SIZE = 4 * inch
+
+
+class _Lazy(Flowable):
+    """Stands in for a flowable that is built when it is laid out and released once drawn."""
+
+    def __init__(self, factory, toc_entry=None):
+        super().__init__()
+        self._factory = factory
+        self._flowable = None
+        self.toc_entry = toc_entry # (level, text) for the table of contents, or None
+
+    def _get(self):
+        if self._flowable is None:
+            self._flowable = self._factory()
+        return self._flowable
+
+    # Frames set self.canv and then call wrap()/split() directly, so both entry points pass the
+    # canvas on to the real flowable.
+    def wrapOn(self, canvas, availWidth, availHeight):
+        return self._get().wrapOn(canvas, availWidth, availHeight)
+
+    def wrap(self, availWidth, availHeight):
+        return self.wrapOn(self.canv, availWidth, availHeight)
+
+    def splitOn(self, canvas, availWidth, availHeight):
+        parts = self._get().splitOn(canvas, availWidth, availHeight)
+        self._flowable = None
+        return parts
+
+    def split(self, availWidth, availHeight):
+        return self.splitOn(self.canv, availWidth, availHeight)
+
+    def getSpaceBefore(self):
+        return self._get().getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self._get().getSpaceAfter()
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        self._get().drawOn(canvas, x, y, _sW)
+        self._flowable = None
+
+
+class _ImageFile(Flowable):
+    """
+    Draws an image by file path. Unlike platypus.Image it never holds decoded pixels, and the
+    canvas embeds each file once however often it is drawn (images are shared between items).
+    """
+
+    def __init__(self, path, width, height):
+        super().__init__()
+        self.path = path
+        self.width = width
+        self.height = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.path, 0, 0, self.width, self.height, mask='auto')
+
+
+class _CatalogDocTemplate(BaseDocTemplate):
+    """Document template that feeds headings into the table of contents and the PDF outline."""
+
+    def __init__(self, filename, title, **kwargs):
+        super().__init__(filename, pagesize=letter, title=title, **kwargs)
+        self.catalog_title = title
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([PageTemplate(id='catalog', frames=[frame], onPage=self._draw_footer)])
+
+    def _draw_footer(self, canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.drawString(self.leftMargin, 0.5 * inch, self.catalog_title)
+        canvas.drawRightString(self.leftMargin + self.width, 0.5 * inch, f"Page {doc.page}")
+        canvas.restoreState()
+
+    def afterFlowable(self, flowable):
+        toc_entry = getattr(flowable, 'toc_entry', None)
+        if toc_entry:
+            level, text = toc_entry
+            key = f"toc-{id(flowable)}" # Must stay the same across the build passes
+            self.canv.bookmarkPage(key)
+            self.canv.addOutlineEntry(text, key, level=level, closed=level > 0)
+            self.notify('TOCEntry', (level, escape(text), self.page, key)) # The contents are Paragraphs too
+
+
+def _scaled_image(image_filename, width, max_size):
+    """Returns an Image flowable of an item's thumbnail fitted into max_size x max_size, or None."""
+    if not image_filename:
+        return None
+    image_path = thumbnail_path(image_filename, width)
+    if image_path is None:
+        return None
+    try:
+        image_width, image_height = ImageReader(image_path).getSize()
+    except Exception as e:
+        print(f"Warning: Could not read image '{image_filename}' for the catalog: {e}")
+        return None
+    scale = min(max_size / image_width, max_size / image_height)
+    return _ImageFile(image_path, image_width * scale, image_height * scale)
+
+def _item_page(item, styles, frame_width, frame_height):
+    """Returns the flowable for one item in the page-per-item layout."""
+    content = [Paragraph(escape(item['name']), styles['h2']), Spacer(1, 0.15 * inch)]
+    image = _scaled_image(item.get('image_filename'), GRID_WIDTH, PAGE_IMAGE_SIZE)
+    content.append(image if image is not None else Paragraph("<i>(No image)</i>", styles['Normal']))
+    content.append(Spacer(1, 0.2 * inch))
+    for label, value in (("Item ID", item['id']), ("Category", item.get('category', 'N/A')),
+                         ("Quantity", item['quantity']), ("Price", f"${item['price']:.2f}")):
+        content.append(Paragraph(f"<b>{label}:</b> {escape(str(value))}", styles['Normal']))
+    return KeepInFrame(frame_width, frame_height, content, mode='shrink')
+
+def _item_table(items, styles, frame_width):
+    """Returns a table of items (one chunk of a category) for the compact layout."""
+    cell_style = styles['BodyText']
+    rows = [["", "Name", "Quantity", "Price", "Item ID"]]
+    for item in items:
+        image = _scaled_image(item.get('image_filename'), PREVIEW_WIDTH, TABLE_IMAGE_SIZE)
+        rows.append([image or "", Paragraph(escape(item['name']), cell_style), str(item['quantity']), f"${item['price']:.2f}", item['id'][:8]])
+    name_width = frame_width - TABLE_IMAGE_SIZE - 0.2 * inch - 3.2 * inch
+    table = Table(rows, colWidths=[TABLE_IMAGE_SIZE + 0.2 * inch, name_width, 0.9 * inch, 1.1 * inch, 1.2 * inch], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (2, 0), (3, -1), 'RIGHT'),
+        ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.grey),
+    ]))
+    return table
+
+def _fetch_items(item_ids):
+    """Returns the CATALOG_FIELDS of the items with the given ids, read CATALOG_FETCH_SIZE at a time."""
+    from db_operations import get_items # Loads Streamlit; item PDF workers never need it
+    items = []
+    for start in range(0, len(item_ids), CATALOG_FETCH_SIZE):
+        items.extend({field: item.get(field) for field in CATALOG_FIELDS} for item in get_items(item_ids[start:start + CATALOG_FETCH_SIZE]))
+    return items
+
+def generate_catalog_pdf(item_ids, output_filename, layout='table', title="Inventory Catalog"):
+    """
+    Renders a catalog of the items with the given ids into static/catalogs/output_filename.
+    Items are grouped by category and sorted by name; ids of deleted items are skipped.
+    Returns output_filename.
+    """
+    if layout not in CATALOG_LAYOUTS:
+        raise ValueError(f"Unknown catalog layout '{layout}'.")
+    items = _fetch_items(item_ids)
+    catalog_dir = get_catalog_dir()
+    os.makedirs(catalog_dir, exist_ok=True)
+    output_path = os.path.join(catalog_dir, output_filename)
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+
+    styles = getSampleStyleSheet()
+    doc = _CatalogDocTemplate(tmp_path, title)
+    toc = TableOfContents()
+    toc.levelStyles = [
+        ParagraphStyle('TOCCategory', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=11, leading=15),
+        ParagraphStyle('TOCItem', parent=styles['Normal'], fontSize=9, leading=11, leftIndent=18),
+    ]
+    story = [Paragraph(escape(title), styles['h1']), Paragraph(f"{len(items)} items", styles['Normal']),
+             Spacer(1, 0.2 * inch), Paragraph("Contents", styles['h2']), toc, PageBreak()]
+
+    items = sorted(items, key=lambda item: (item.get('category') or '', item['name'].lower()))
+    start = 0
+    while start < len(items):
+        category = items[start].get('category') or ''
+        end = start
+        while end < len(items) and (items[end].get('category') or '') == category:
+            end += 1
+        category_items = items[start:end]
+        if start:
+            story.append(PageBreak())
+        story.append(_Lazy(lambda text=category or 'Uncategorized': Paragraph(escape(text), styles['h1']), toc_entry=(0, category or 'Uncategorized')))
+        if layout == 'page':
+            for position, item in enumerate(category_items):
+                if position:
+                    story.append(PageBreak())
+                story.append(_Lazy(lambda item=item: _item_page(item, styles, doc.width, doc.height - inch), toc_entry=(1, item['name'])))
+        else:
+            for chunk_start in range(0, len(category_items), TABLE_ROWS_PER_CHUNK):
+                chunk = category_items[chunk_start:chunk_start + TABLE_ROWS_PER_CHUNK]
+                story.append(_Lazy(lambda chunk=chunk: _item_table(chunk, styles, doc.width)))
+        start = end
+
+    try:
+        doc.multiBuild(story)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_filename
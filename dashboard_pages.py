@@ -1,6 +1,7 @@
 import streamlit as st
-import pandas as pd
-from db_operations import load_inventory # Import function to load inventory data
+from perf import span
+from inventory_aggregates import get_inventory_aggregates # Totals maintained on every write
+from inventory_columns import get_inventory_columns # Shared columnar model of the inventory
 
 def show_dashboard_page():
     """
@@ -9,69 +10,52 @@ def show_dashboard_page():
     """
     st.subheader("Inventory Dashboard")
 
-    inventory = load_inventory()
+    # Totals and per-category aggregates are maintained on every write, so opening the dashboard
+    # reads a handful of numbers per category and does not touch the items at all.
+    with span('dashboard.summary'):
+        summary = get_inventory_aggregates().summary()
 
-    if not inventory:
+    if not summary['unique_items']:
         st.info("No items in inventory to display dashboard statistics. Add some items first!")
         return
 
-    # Convert inventory list to a Pandas DataFrame for easy aggregation
-    df = pd.DataFrame(inventory)
-
     # --- Overall Statistics ---
-    total_items = df['quantity'].sum()
-    total_value = (df['quantity'] * df['price']).sum()
-
     st.markdown("### Overall Inventory Summary")
     col1, col2 = st.columns(2)
     with col1:
-        st.metric(label="Total Unique Items", value=len(df))
+        st.metric(label="Total Unique Items", value=summary['unique_items'])
     with col2:
-        st.metric(label="Total Quantity of All Items", value=total_items)
-    st.metric(label="Total Inventory Value", value=f"${total_value:,.2f}")
+        st.metric(label="Total Quantity of All Items", value=summary['total_quantity'])
+    st.metric(label="Total Inventory Value", value=f"${summary['total_value']:,.2f}")
 
     st.markdown("---")
 
     # --- Breakdown by Category ---
     st.markdown("### Inventory Breakdown by Category")
 
-    if 'category' in df.columns:
-        # Fill NaN categories with 'Uncategorized' for grouping
-        df['category'] = df['category'].fillna('Uncategorized')
-        
-        category_summary = df.groupby('category').agg(
-            unique_items=('id', 'nunique'),
-            total_quantity=('quantity', 'sum'),
-            total_value=('price', lambda x: (x * df.loc[x.index, 'quantity']).sum())
-        ).reset_index()
-
-        category_summary.columns = ['Category', 'Unique Items', 'Total Quantity', 'Total Value']
-        category_summary['Total Value'] = category_summary['Total Value'].map('${:,.2f}'.format)
-        
-        st.dataframe(category_summary, hide_index=True, use_container_width=True)
+    category_summary = [{**row, 'Total Value': f"${row['Total Value']:,.2f}"} for row in summary['by_category']]
+    st.dataframe(category_summary, hide_index=True, use_container_width=True)
 
-        st.markdown("---")
-        st.markdown("### Item Details by Category")
-        
-        # Expanders to show items within each category
-        for category in sorted(df['category'].unique()):
-            with st.expander(f"Items in {category} (Click to expand)"):
-                category_items = df[df['category'] == category][['name', 'quantity', 'price', 'id']].copy()
-                category_items['price'] = category_items['price'].map('${:,.2f}'.format)
-                category_items['id_short'] = category_items['id'].apply(lambda x: x[:8] + '...')
-                st.dataframe(category_items[['name', 'quantity', 'price', 'id_short']], hide_index=True, use_container_width=True)
-
-    else:
-        st.info("No 'category' field found in inventory items. Add categories to your items to see this breakdown.")
+    st.markdown("---")
+    st.markdown("### Item Details by Category")
+
+    # Only the selected category's items are rendered, instead of one expander per category
+    # that would ship every item to the browser on each visit.
+    selected_category = st.selectbox("Show items in category:", ["-- Select a category --"] + [row['Category'] for row in summary['by_category']], key="dashboard_category_details")
+    # The item-level views below build the columnar model, only when they are asked for.
+    columns = get_inventory_columns()
+    if selected_category != "-- Select a category --":
+        with span('dashboard.category_items'):
+            df = columns.frame()
+            category_items = df[df['category'] == selected_category][['name', 'quantity', 'price', 'id']].copy()
+            category_items['price'] = category_items['price'].map('${:,.2f}'.format)
+            category_items['id_short'] = category_items['id'].str[:8] + '...'
+        st.dataframe(category_items[['name', 'quantity', 'price', 'id_short']], hide_index=True, use_container_width=True)
 
     st.markdown("---")
     st.markdown("### Raw Inventory Data")
-    
-    # Dynamically build the list of columns to display,
-    # ensuring 'category' is only included if it exists.
-    raw_data_columns = ['name']
-    if 'category' in df.columns:
-        raw_data_columns.append('category')
-    raw_data_columns.extend(['quantity', 'price', 'id', 'pdf_filename', 'image_filename'])
 
-    st.dataframe(df[raw_data_columns], use_container_width=True)
+    if st.checkbox("Show raw inventory data", key="dashboard_show_raw"):
+        with span('dashboard.raw_frame'):
+            frame = columns.frame()
+        st.dataframe(frame, use_container_width=True)
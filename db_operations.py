@@ -1,51 +1,662 @@
+import copy
 import json
 import os
+import threading
+import uuid
+from contextlib import contextmanager
+from types import MappingProxyType
 import streamlit as st # Used for st.warning to display messages
+from journal_store import JournalStore, DEFAULT_COMPACT_THRESHOLD
+from offset_index import StaleIndexError, read_record, rebuild_index, write_index, write_records
+from perf import span, timed
+from sqlite_store import SQLiteStore
+try:
+    import fcntl
+except ImportError: # Windows: no advisory locks, so only one process may write the data files
+    fcntl = None
 
 # --- File Paths (Relative to the module's location) ---
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# INVENTORY_DATA_DIR moves the data files (and the static directory, see utils.py) elsewhere,
+# e.g. to a scratch directory for the benchmarks; by default they live next to the code.
+BASE_DIR = os.environ.get('INVENTORY_DATA_DIR') or os.path.dirname(os.path.abspath(__file__))
 DB_FILE = os.path.join(BASE_DIR, 'db.json')
 USERS_FILE = os.path.join(BASE_DIR, 'users.json')
 
+# --- Storage Backend Selection ---
+# 'json' rewrites the whole JSON file on every save. 'journal' appends only the changed records
+# to a JSONL journal next to each file (see journal_store.py) and periodically compacts it back
+# into the JSON file, so single-record edits no longer cost a full rewrite. 'sqlite' keeps both
+# tables in an indexed SQLite database (see sqlite_store.py; migrate with
+# `python sqlite_store.py migrate`).
+STORAGE_BACKEND = os.environ.get('INVENTORY_STORAGE_BACKEND', 'json').strip().lower()
+JOURNAL_COMPACT_THRESHOLD = int(os.environ.get('INVENTORY_JOURNAL_COMPACT_THRESHOLD', DEFAULT_COMPACT_THRESHOLD))
+SQLITE_FILE = os.environ.get('INVENTORY_SQLITE_FILE', os.path.join(BASE_DIR, 'inventory.sqlite3'))
+
+# --- Shared In-Process Cache ---
+# Streamlit reruns the whole script for every widget interaction in every session, so parsed
+# JSON files are kept here once per process and shared by all sessions. Each entry is validated
+# against the file's (mtime, size, inode) signature, which makes writes done by save_data and
+# by anything outside the app visible on the next load without an explicit invalidation.
+_cache_lock = threading.RLock()
+_data_cache = {} # filepath -> (signature, tuple of read-only records)
+
+def _file_signature(filepath):
+    """Returns the (mtime_ns, size, inode) triple used to validate cached file contents."""
+    stat_result = os.stat(filepath)
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+def _freeze(data):
+    """Returns a read-only snapshot of a list of records (a tuple of mapping proxies)."""
+    return tuple(MappingProxyType(dict(record)) if isinstance(record, dict) else record for record in data)
+
+def _copy_record(record):
+    """Returns a private, mutable copy of a cached record."""
+    if not isinstance(record, MappingProxyType):
+        return copy.deepcopy(record)
+    return {key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value for key, value in record.items()}
+
+def invalidate_cache(filepath=None):
+    """Drops the cached copy of one file, or of every file when no path is given."""
+    with _cache_lock:
+        if filepath is None:
+            _data_cache.clear()
+        else:
+            _data_cache.pop(filepath, None)
+
 # --- Helper Functions for JSON DBs ---
-def load_data(filepath):
+def load_data_view(filepath):
     """
-    Loads data from a JSON file.
+    Returns the contents of a JSON file as a read-only tuple of records.
+    The result is shared with every other session, so it is only re-parsed when the file changed
+    on disk. Callers that need to modify records should use load_data instead.
     If the file does not exist, it creates an empty JSON array file.
     Handles JSONDecodeError for empty or malformed files.
     """
-    if not os.path.exists(filepath):
-        with open(filepath, 'w') as f:
-            json.dump([], f)
+    with _cache_lock:
+        if not os.path.exists(filepath):
+            with open(filepath, 'w') as f:
+                json.dump([], f)
+        signature = _file_signature(filepath)
+        cached = _data_cache.get(filepath)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with open(filepath, 'r') as f, span('db.json_load', signature[1]):
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                st.warning(f"Warning: {filepath} is empty or contains invalid JSON. Initializing as empty list.")
+                return ()
+        if not isinstance(data, list):
+            st.warning(f"Warning: {filepath} contains non-list data or is malformed. Initializing as empty list.")
+            return ()
+
+        view = _freeze(data)
+        _data_cache[filepath] = (signature, view)
+        return view
+
+def load_data(filepath):
+    """
+    Loads data from a JSON file as a list of dicts that the caller is free to modify.
+    The records are copied out of the shared cache, so changes only reach other sessions
+    once they are written back with save_data.
+    """
+    return [_copy_record(record) for record in load_data_view(filepath)]
+
+def save_data(filepath, data):
+    """
+    Saves data (a Python list of dicts) to a JSON file, one record per line, together with its
+    offset index (see offset_index.py).
+    The file is written to a temporary sibling and then swapped in, so concurrent readers never
+    see a half-written file, and the shared cache is refreshed with the saved records. The
+    temporary name is unique, so processes saving the same file at once never share it.
+    """
+    tmp_path = f"{filepath}.{uuid.uuid4().hex}.tmp"
+    with _cache_lock, span('db.json_save') as timer:
+        try:
+            with open(tmp_path, 'wb') as f:
+                entries = write_records(f, data)
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        signature = _file_signature(filepath)
+        timer.add_bytes(signature[1])
+        _data_cache[filepath] = (signature, _freeze(data))
+        write_index(filepath, signature, entries)
+
+def _is_cached(filepath):
+    """True if the current contents of a file are already parsed in the shared cache."""
+    with _cache_lock:
+        cached = _data_cache.get(filepath)
+        try:
+            return cached is not None and cached[0] == _file_signature(filepath)
+        except FileNotFoundError:
+            return False
+
+_unindexable = {} # filepath -> signature of a file version found not to be one record per line
+
+def read_indexed_record(filepath, record_id):
+    """
+    Returns a copy of one record of a JSON file through its offset index, without parsing the
+    rest of the file (the index is rebuilt first if the file changed). Raises StaleIndexError
+    if the file cannot be indexed; the caller then has to load it whole.
+    """
+    try:
+        return read_record(filepath, record_id)
+    except StaleIndexError:
+        pass
+    with _cache_lock:
+        signature = _file_signature(filepath)
+        if _unindexable.get(filepath) == signature or not rebuild_index(filepath):
+            _unindexable[filepath] = signature
+            raise StaleIndexError(filepath)
+    return read_record(filepath, record_id)
+
+@contextmanager
+def _exclusive_file_lock(filepath):
+    """Holds an flock on <file>.lock for the block, so writers in other processes wait their turn."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{filepath}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def _revision_conflicts(records, expected):
+    """
+    Returns the ids in expected (id -> 'revision' a record was read at, None if it was not
+    stored) whose record in records (id -> record) is no longer at that revision.
+    """
+    conflicts = []
+    for record_id, revision in expected.items():
+        record = records.get(record_id)
+        if (record.get('revision', 0) if record is not None else None) != revision:
+            conflicts.append(record_id)
+    return conflicts
+
+# --- Storage Backends ---
+# Each backend exposes the same small interface over the two logical tables, 'inventory' and
+# 'users': load_view / save for whole lists, apply for record-level writes (checked against the
+# revisions the caller read, atomically with the write), data_version for a
+# cheap "has anything changed" token, plus get / get_user_by_username / query_items /
+# query_users for single-record and filtered reads. Pages only talk to the module-level
+# functions below, so the backend can be switched with INVENTORY_STORAGE_BACKEND alone.
+_TABLE_FILES = {'inventory': DB_FILE, 'users': USERS_FILE}
+INDEXED_READ_LIMIT = 1000 # get_many() loads the whole table instead beyond this many ids
+
+class _ListBackend:
+    """
+    Shared lookups for backends that hold each table as one in-memory list (JSON and journal).
+    The id and username indexes are built once per view, i.e. once per change to the data.
+    """
+
+    def __init__(self):
+        self._indexes = {} # (table, kind) -> (view the index was built from, dict)
+
+    def _index(self, table, kind, key_func):
+        view = self.load_view(table)
+        cached = self._indexes.get((table, kind))
+        if cached is not None and cached[0] is view:
+            return cached[1]
+        index = {}
+        for record in view:
+            index.setdefault(key_func(record), record)
+        self._indexes[(table, kind)] = (view, index)
+        return index
+
+    def ids(self, table):
+        return [record['id'] for record in self.load_view(table)]
+
+    def get(self, table, record_id):
+        record = self._index(table, 'id', lambda r: r.get('id')).get(record_id)
+        return _copy_record(record) if record is not None else None
+
+    def get_many(self, table, record_ids):
+        index = self._index(table, 'id', lambda r: r.get('id'))
+        return [_copy_record(index[record_id]) for record_id in record_ids if record_id in index]
+
+    def get_user_by_username(self, username):
+        record = self._index('users', 'username', lambda r: r.get('username', '').lower()).get(username.lower())
+        return _copy_record(record) if record is not None else None
+
+    def query_items(self, search_term='', category=None):
+        search_term = search_term.lower()
+        return [
+            _copy_record(item) for item in self.load_view('inventory')
+            if search_term in item['name'].lower() and (category is None or item.get('category') == category)
+        ]
+
+    def query_users(self, role=None):
+        return [_copy_record(user) for user in self.load_view('users') if role is None or user.get('role') == role]
+
+
+class JsonBackend(_ListBackend):
+    """The original storage: each table is a JSON array file rewritten on every save."""
+
+    def load_view(self, table):
+        return load_data_view(_TABLE_FILES[table])
+
+    def get(self, table, record_id):
+        # Unless the table is parsed already, read just the one record through the offset index
+        filepath = _TABLE_FILES[table]
+        if not _is_cached(filepath):
+            try:
+                return read_indexed_record(filepath, record_id)
+            except (StaleIndexError, FileNotFoundError):
+                pass
+        return super().get(table, record_id)
+
+    def get_many(self, table, record_ids):
+        filepath = _TABLE_FILES[table]
+        if len(record_ids) <= INDEXED_READ_LIMIT and not _is_cached(filepath):
+            try:
+                records = (read_indexed_record(filepath, record_id) for record_id in record_ids)
+                return [record for record in records if record is not None]
+            except (StaleIndexError, FileNotFoundError):
+                pass
+        return super().get_many(table, record_ids)
+
+    def data_version(self, table):
+        try:
+            return _file_signature(_TABLE_FILES[table])
+        except FileNotFoundError:
+            return None
+
+    def save(self, table, records):
+        with _exclusive_file_lock(_TABLE_FILES[table]):
+            save_data(_TABLE_FILES[table], records)
+
+    def apply(self, table, puts, deletes, expected=None):
+        # A JSON array can only be rewritten as a whole; the other backends touch just these records.
+        # The file lock makes the revision check and the rewrite one step for every process.
+        with _exclusive_file_lock(_TABLE_FILES[table]):
+            view = self.load_view(table)
+            if expected:
+                conflicts = _revision_conflicts(self._index(table, 'id', lambda r: r.get('id')), expected)
+                if conflicts:
+                    return conflicts
+            replacements = {record['id']: record for record in puts}
+            deleted_ids = set(deletes)
+            records = []
+            for record in view:
+                if record['id'] in deleted_ids:
+                    continue
+                records.append(replacements.pop(record['id'], None) or dict(record))
+            records.extend(replacements.values())
+            save_data(_TABLE_FILES[table], records)
         return []
-    with open(filepath, 'r') as f:
+
+
+class JournalBackend(_ListBackend):
+    """JSON snapshot files plus append-only journals of the changes (see journal_store.py)."""
+
+    def __init__(self):
+        super().__init__()
+        self.stores = {
+            table: JournalStore(filepath, compact_threshold=JOURNAL_COMPACT_THRESHOLD)
+            for table, filepath in _TABLE_FILES.items()
+        }
+
+    def load_view(self, table):
+        return self.stores[table].view()
+
+    def get(self, table, record_id):
+        # Straight from the store's id map, so writes do not force a new view for every lookup.
+        record = self.stores[table].get(record_id)
+        return _copy_record(record) if record is not None else None
+
+    def data_version(self, table):
+        return self.stores[table].version()
+
+    def save(self, table, records):
+        self.stores[table].save(records)
+
+    def apply(self, table, puts, deletes, expected=None):
+        return self.stores[table].apply(puts, deletes, expected)
+
+    def compact(self):
+        for store in self.stores.values():
+            store.compact()
+
+
+class SQLiteBackend:
+    """Indexed storage in a SQLite database (see sqlite_store.py)."""
+
+    def __init__(self):
+        self.store = SQLiteStore(SQLITE_FILE)
+
+    def load_view(self, table):
+        return self.store.load_view(table)
+
+    def data_version(self, table):
+        return self.store.generation(table)
+
+    def save(self, table, records):
+        self.store.save(table, records)
+
+    def apply(self, table, puts, deletes, expected=None):
+        return self.store.apply(table, puts, deletes, expected)
+
+    def ids(self, table):
+        return self.store.ids(table)
+
+    def get(self, table, record_id):
+        return self.store.get(table, record_id)
+
+    def get_many(self, table, record_ids):
+        return self.store.get_many(table, record_ids)
+
+    def get_user_by_username(self, username):
+        return self.store.get_user_by_username(username)
+
+    def query_items(self, search_term='', category=None):
+        return self.store.query_items(search_term, category)
+
+    def query_users(self, role=None):
+        return self.store.query_users(role)
+
+
+_BACKENDS = {'json': JsonBackend, 'journal': JournalBackend, 'sqlite': SQLiteBackend}
+_backend = None
+
+def get_backend():
+    """Returns the process-wide storage backend selected by INVENTORY_STORAGE_BACKEND."""
+    global _backend
+    with _cache_lock:
+        if _backend is None:
+            if STORAGE_BACKEND not in _BACKENDS:
+                raise ValueError(f"Unknown INVENTORY_STORAGE_BACKEND '{STORAGE_BACKEND}'. Expected one of: {', '.join(_BACKENDS)}.")
+            _backend = _BACKENDS[STORAGE_BACKEND]()
+        return _backend
+
+def compact_journals():
+    """Folds the journals back into their JSON files (a no-op outside journal mode)."""
+    backend = get_backend()
+    if isinstance(backend, JournalBackend):
+        backend.compact()
+
+# --- Change Notifications ---
+# In-memory structures derived from a table (dashboard columns, search indexes, ...) register
+# here to hear about writes. Record-level writes report (before, after) pairs so listeners can
+# update incrementally; whole-list saves report changes=None, meaning "rebuild from scratch".
+# Both versions are data_version() tokens, so a listener can tell whether it was current
+# before the write and otherwise fall back to a rebuild.
+_change_listeners = []
+
+def register_change_listener(callback):
+    """Registers callback(table, changes, previous_version, new_version), called after every write."""
+    _change_listeners.append(callback)
+
+def data_version(table):
+    """Returns a cheap token that changes whenever the table's contents change."""
+    return get_backend().data_version(table)
+
+def _notify_change(table, changes, previous_version):
+    new_version = get_backend().data_version(table)
+    for callback in list(_change_listeners):
         try:
-            data = json.load(f)
-            if not isinstance(data, list):
-                st.warning(f"Warning: {filepath} contains non-list data or is malformed. Initializing as empty list.")
-                return []
-            return data
-        except json.JSONDecodeError:
-            st.warning(f"Warning: {filepath} is empty or contains invalid JSON. Initializing as empty list.")
-            return []
+            callback(table, changes, previous_version, new_version)
+        except Exception as e:
+            print(f"Warning: change listener {callback!r} failed: {e}")
 
-def save_data(filepath, data):
-    """Saves data (a Python list of dicts) to a JSON file with pretty-printing."""
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=4)
+
+class DerivedIndex:
+    """
+    Base class for in-memory structures computed from one table and shared by all sessions.
+    Subclasses implement rebuild(records) and apply_change(before, after); callers invoke
+    ensure_current() before reading. Record-level writes are applied incrementally while the
+    structure is current; anything else (whole-list saves, external edits) triggers a rebuild
+    on the next ensure_current().
+    """
+    table = 'inventory'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._built = False
+        register_change_listener(self._on_change)
+
+    def rebuild(self, records):
+        raise NotImplementedError
+
+    def apply_change(self, before, after):
+        """Applies one write: before is None for inserts, after is None for deletes."""
+        raise NotImplementedError
+
+    def ensure_current(self):
+        """Rebuilds the structure if the table changed in a way it has not seen."""
+        version = data_version(self.table) # Read before the records, so a racing write only causes another rebuild
+        with self._lock:
+            if not self._built or version != self._version:
+                with span(f'index.rebuild.{type(self).__name__}'):
+                    self.rebuild(get_backend().load_view(self.table))
+                self._version = version
+                self._built = True
+
+    def _on_change(self, table, changes, previous_version, new_version):
+        if table != self.table:
+            return
+        with self._lock:
+            if changes is None or not self._built or self._version != previous_version:
+                self._built = False
+                return
+            for before, after in changes:
+                self.apply_change(before, after)
+            self._version = new_version
+
+
+# --- Record-Level Mutations ---
+# Writes that touch single records go through apply_batch, which checks each operation against
+# the current stored record (not against a list loaded earlier in the rerun) and then hands only
+# the affected records to the backend. Every stored record carries two counters:
+#   'version'  -- bumped when an update changes what users edit, so a form can pass the version
+#                 it was rendered from and get a VersionConflictError instead of silently
+#                 overwriting someone else's edit. Bookkeeping updates (e.g. a background PDF
+#                 job storing its result) pass 'bump_version': False and leave it alone, and
+#                 can make themselves conditional on the fields they own with 'expected_fields'.
+#   'revision' -- bumped by every write; it is what the backends compare.
+# _write_lock only orders the writers of this process. Other processes (the command-line
+# tools, other server instances) are kept out by the backend: it re-checks the revisions the
+# batch was computed from atomically with the write (in the SQLite transaction, or under a
+# file lock), and if another process got there first the batch is recomputed from the
+# current records, up to WRITE_ATTEMPTS times.
+_write_lock = threading.RLock()
+WRITE_ATTEMPTS = 5
+
+class RecordNotFoundError(LookupError):
+    """Raised when an update or delete targets an id that is not stored."""
+
+class VersionConflictError(Exception):
+    """Raised when a record changed since the version the caller based its edit on."""
+
+    def __init__(self, record_id, expected_version, current_version):
+        super().__init__(f"Record {record_id} is at version {current_version}, expected {expected_version}.")
+        self.record_id = record_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+def _check_version(record_id, current, expected_version):
+    if expected_version is not None and current.get('version', 0) != expected_version:
+        raise VersionConflictError(record_id, expected_version, current.get('version', 0))
+
+@timed('db.apply_batch')
+def apply_batch(table, operations):
+    """
+    Applies a list of operations to one table ('inventory' or 'users') as a single write:
+      {'op': 'insert', 'record': {...}}
+      {'op': 'update', 'id': ..., 'changes': {...}, 'expected_version': n (optional),
+       'expected_fields': {field: value} (optional), 'bump_version': False (optional)}
+      {'op': 'delete', 'id': ..., 'expected_version': n (optional)}
+    Either every operation is applied or, if one fails its checks, none is.
+    Returns the resulting records (the removed record for deletes), in operation order.
+    """
+    backend = get_backend()
+    with _write_lock:
+        for _ in range(WRITE_ATTEMPTS):
+            pending, originals, results = _plan_batch(backend, table, operations)
+            puts = [record for record in pending.values() if record is not None]
+            deletes = [record_id for record_id, record in pending.items() if record is None]
+            expected = {record_id: None if originals.get(record_id) is None else originals[record_id].get('revision', 0) for record_id in pending}
+            previous_version = backend.data_version(table)
+            conflicts = backend.apply(table, puts, deletes, expected)
+            if not conflicts:
+                break
+        else:
+            current = backend.get(table, conflicts[0])
+            raise VersionConflictError(conflicts[0], None, current.get('version', 0) if current is not None else None)
+        changes = [(originals.get(record_id), record) for record_id, record in pending.items()]
+        _notify_change(table, [(before, after) for before, after in changes if before is not None or after is not None], previous_version)
+    return results
+
+def _plan_batch(backend, table, operations):
+    """
+    Checks the operations of a batch against the currently stored records and computes the
+    result. Returns (pending, originals, results): id -> new record (None when deleted),
+    id -> stored record before the batch (None if absent), and the per-operation results.
+    """
+    pending = {}
+    originals = {}
+    results = []
+
+    def current_record(record_id):
+        if record_id in pending:
+            return pending[record_id]
+        if record_id not in originals:
+            originals[record_id] = backend.get(table, record_id)
+        return originals[record_id]
+
+    for operation in operations:
+        kind = operation['op']
+        if kind == 'insert':
+            record = copy.deepcopy(dict(operation['record']))
+            record.setdefault('id', str(uuid.uuid4()))
+            if current_record(record['id']) is not None:
+                raise ValueError(f"Record {record['id']} already exists.")
+            record['version'] = 1
+            record['revision'] = 1
+            pending[record['id']] = record
+            results.append(record)
+        elif kind in ('update', 'delete'):
+            record_id = operation['id']
+            current = current_record(record_id)
+            if current is None:
+                raise RecordNotFoundError(record_id)
+            _check_version(record_id, current, operation.get('expected_version'))
+            for field, value in operation.get('expected_fields', {}).items():
+                if current.get(field) != value:
+                    raise VersionConflictError(record_id, operation.get('expected_version'), current.get('version', 0))
+            if kind == 'update':
+                record = {**current, **copy.deepcopy(operation['changes']), 'id': record_id}
+                record['version'] = current.get('version', 0) + (1 if operation.get('bump_version', True) else 0)
+                record['revision'] = current.get('revision', 0) + 1
+                pending[record_id] = record
+                results.append(record)
+            else:
+                pending[record_id] = None
+                results.append(current)
+        else:
+            raise ValueError(f"Unknown operation '{kind}'.")
+    return pending, originals, results
+
+def insert_item(item):
+    """Stores a new inventory item (an id is generated if missing) and returns the stored copy."""
+    return apply_batch('inventory', [{'op': 'insert', 'record': item}])[0]
+
+def update_item(item_id, changes, expected_version=None, bump_version=True):
+    """
+    Applies a partial update to one item and returns the updated copy.
+    bump_version=False is for bookkeeping that should not invalidate open edit forms.
+    """
+    return apply_batch('inventory', [{'op': 'update', 'id': item_id, 'changes': changes, 'expected_version': expected_version,
+                                      'bump_version': bump_version}])[0]
+
+def delete_item(item_id, expected_version=None):
+    """Removes one item and returns the record that was removed, or None if it did not exist."""
+    try:
+        return apply_batch('inventory', [{'op': 'delete', 'id': item_id, 'expected_version': expected_version}])[0]
+    except RecordNotFoundError:
+        return None
+
+def apply_item_batch(operations):
+    """Applies several inventory operations (see apply_batch) with a single write."""
+    return apply_batch('inventory', operations)
+
+def insert_user(user):
+    """Stores a new user (an id is generated if missing) and returns the stored copy."""
+    return apply_batch('users', [{'op': 'insert', 'record': user}])[0]
+
+def update_user(user_id, changes, expected_version=None):
+    """Applies a partial update to one user and returns the updated copy."""
+    return apply_batch('users', [{'op': 'update', 'id': user_id, 'changes': changes, 'expected_version': expected_version}])[0]
+
+def delete_user(user_id):
+    """Removes one user and returns the record that was removed, or None if it did not exist."""
+    try:
+        return apply_batch('users', [{'op': 'delete', 'id': user_id}])[0]
+    except RecordNotFoundError:
+        return None
 
 def load_users():
     """Loads user data from users.json."""
-    return load_data(USERS_FILE)
+    return [_copy_record(record) for record in get_backend().load_view('users')]
+
+def load_users_view():
+    """Returns a read-only, shared view of users.json for code that only reads users."""
+    return get_backend().load_view('users')
 
 def save_users(users):
     """Saves user data to users.json."""
-    save_data(USERS_FILE, users)
+    with _write_lock:
+        previous_version = data_version('users')
+        get_backend().save('users', users)
+        _notify_change('users', None, previous_version)
+
+def get_user(user_id):
+    """Returns a copy of the user with the given id, or None."""
+    return get_backend().get('users', user_id)
+
+def get_user_by_username(username):
+    """Returns a copy of the user whose username matches case-insensitively, or None."""
+    return get_backend().get_user_by_username(username)
+
+def query_users(role=None):
+    """Returns copies of all users, or only those with the given role."""
+    return get_backend().query_users(role)
 
 def load_inventory():
     """Loads inventory data from db.json."""
-    return load_data(DB_FILE)
+    return [_copy_record(record) for record in get_backend().load_view('inventory')]
+
+@timed('db.load_inventory_view')
+def load_inventory_view():
+    """Returns a read-only, shared view of db.json for code that only reads the inventory."""
+    return get_backend().load_view('inventory')
 
 def save_inventory(inventory):
     """Saves inventory data to db.json."""
-    save_data(DB_FILE, inventory)
+    with _write_lock:
+        previous_version = data_version('inventory')
+        get_backend().save('inventory', inventory)
+        _notify_change('inventory', None, previous_version)
+
+@timed('db.get_item')
+def get_item(item_id):
+    """Returns a copy of the inventory item with the given id, or None."""
+    return get_backend().get('inventory', item_id)
+
+def get_item_ids():
+    """Returns the ids of all items in storage order (cheaper than loading the items themselves)."""
+    return get_backend().ids('inventory')
+
+@timed('db.get_items')
+def get_items(item_ids):
+    """Returns copies of the items with the given ids, in the same order, skipping unknown ids."""
+    return get_backend().get_many('inventory', item_ids)
+
+def query_items(search_term='', category=None):
+    """Returns copies of the items whose name contains search_term (case-insensitive), optionally in one category."""
+    return get_backend().query_items(search_term, category)
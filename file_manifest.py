@@ -0,0 +1,166 @@
+import hashlib
+import os
+import threading
+import time
+from utils import get_image_dir, get_pdf_dir, get_thumbnail_dir, is_content_addressed
+
+# --- Static File Manifests ---
+# Rendering a page of item cards used to stat every card's image, thumbnail and PDF, which
+# adds up to hundreds of system calls per rerun, each a network round trip on mounted storage.
+# Instead each static directory (images, thumbnails, PDFs) is listed once into an in-memory
+# manifest of name -> inode, size, mtime and (lazily) sha256, and lookups are dictionary reads.
+# The manifest is kept current two ways:
+#   - the code that writes or deletes files (uploads, thumbnails, PDF jobs, deletes) reports
+#     the change with added()/removed(), so this process sees its own writes immediately;
+#   - at most every POLL_SECONDS a lookup stats the directory itself, and when its mtime moved
+#     (files written by another process, or by hand) the listing is re-read. Entries whose
+#     inode did not change are kept, so only new or replaced files are stat'ed again.
+# Creating, renaming or deleting a file changes the directory's mtime, which is all the poll
+# relies on. A file rewritten in place keeps its inode and does not change the directory, so
+# content_hash() stats the file itself and re-reads it when its (mtime, size) moved; this only
+# happens for older, not content-addressed images, whose digest is not their name.
+# image_content_hash is defined here because it answers from the manifest of static/images.
+
+POLL_SECONDS = float(os.environ.get('INVENTORY_MANIFEST_POLL_SECONDS', 2))
+RACY_SECONDS = 1.0 # A listing taken this soon after the directory changed may miss a same-tick change
+
+
+class _Entry:
+    __slots__ = ('inode', 'size', 'mtime_ns', 'sha256')
+
+    def __init__(self, stat_result):
+        self.inode = stat_result.st_ino
+        self.size = stat_result.st_size
+        self.mtime_ns = stat_result.st_mtime_ns
+        self.sha256 = None
+
+
+class DirectoryManifest:
+    """In-memory listing of the files in one directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._entries = {} # name -> _Entry
+        self._directory_mtime = None # mtime_ns of the directory when it was last listed
+        self._next_poll = 0.0
+
+    def _poll(self):
+        """Re-lists the directory if it changed since the last listing (checked at most every POLL_SECONDS)."""
+        now = time.monotonic()
+        if now < self._next_poll:
+            return
+        self._next_poll = now + POLL_SECONDS
+        try:
+            directory_mtime = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            self._entries, self._directory_mtime = {}, None
+            return
+        if directory_mtime == self._directory_mtime:
+            return
+        entries = {}
+        with os.scandir(self.directory) as listing:
+            for dir_entry in listing:
+                if dir_entry.name.endswith('.tmp'):
+                    continue
+                known = self._entries.get(dir_entry.name)
+                if known is not None and known.inode == dir_entry.inode():
+                    entries[dir_entry.name] = known
+                    continue
+                try:
+                    if dir_entry.is_file():
+                        entries[dir_entry.name] = _Entry(dir_entry.stat())
+                except FileNotFoundError:
+                    pass # Removed while listing
+        self._entries = entries
+        # If the directory changed within the timestamp granularity, list it again next time
+        self._directory_mtime = directory_mtime if time.time() - directory_mtime / 1e9 > RACY_SECONDS else None
+
+    # --- Lookups ---
+    def get(self, name):
+        """Returns the entry (inode, size, mtime_ns, sha256) of a file, or None if it does not exist."""
+        with self._lock:
+            self._poll()
+            return self._entries.get(name)
+
+    def exists(self, name):
+        return bool(name) and self.get(name) is not None
+
+    def names(self):
+        with self._lock:
+            self._poll()
+            return list(self._entries)
+
+    def content_hash(self, name):
+        """Returns the sha256 hex digest of a file (read once per file version), or None if it does not exist."""
+        entry = self.get(name)
+        if entry is None:
+            return None
+        file_path = os.path.join(self.directory, name)
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            return None
+        if entry.sha256 is None or (entry.mtime_ns, entry.size) != (stat_result.st_mtime_ns, stat_result.st_size):
+            digest = hashlib.sha256()
+            try:
+                with open(file_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+            except OSError:
+                return None
+            entry.size, entry.mtime_ns, entry.sha256 = stat_result.st_size, stat_result.st_mtime_ns, digest.hexdigest()
+        return entry.sha256
+
+    # --- Updates from the writers ---
+    def added(self, name):
+        """Records a file this process has just written (or replaced)."""
+        try:
+            stat_result = os.stat(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            self.removed(name)
+            return
+        with self._lock:
+            self._entries[name] = _Entry(stat_result)
+
+    def removed(self, name):
+        """Records a file this process has just deleted."""
+        with self._lock:
+            self._entries.pop(name, None)
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+def get_manifest(directory):
+    """Returns the process-wide manifest of a directory."""
+    with _manifests_lock:
+        manifest = _manifests.get(directory)
+        if manifest is None:
+            manifest = _manifests[directory] = DirectoryManifest(directory)
+        return manifest
+
+def image_files():
+    """Manifest of static/images."""
+    return get_manifest(get_image_dir())
+
+def pdf_files():
+    """Manifest of static/pdfs."""
+    return get_manifest(get_pdf_dir())
+
+def thumbnail_files():
+    """Manifest of static/thumbs."""
+    return get_manifest(get_thumbnail_dir())
+
+
+def image_content_hash(image_filename):
+    """
+    Returns the sha256 hex digest of an uploaded image, or None if the file does not exist.
+    Content-addressed files are named after their digest; other files are hashed once per version.
+    """
+    manifest = image_files()
+    if not manifest.exists(image_filename):
+        return None
+    if is_content_addressed(image_filename):
+        return os.path.splitext(image_filename)[0]
+    return manifest.content_hash(image_filename)
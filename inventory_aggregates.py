@@ -0,0 +1,195 @@
+import json
+import os
+import sys
+import threading
+import uuid
+from db_operations import BASE_DIR, DerivedIndex, data_version, get_backend
+
+# --- Materialized Inventory Aggregates ---
+# The dashboards only show totals: item count, total quantity, total value, and the same three
+# per category. These are kept as running sums that record-level writes adjust by the
+# difference between the old and new record, so reading them costs O(categories) however large
+# the inventory is. Values are summed in whole cents, so adding and subtracting never drifts.
+# The sums are also saved to a small sidecar file tagged with the table's data_version(); a new
+# process whose inventory has not changed since then loads that file instead of reading every
+# item. When the tag does not match (whole-list saves, edits by a process that did not track
+# the sums, a crash between the two writes) the sums are rebuilt from the records and saved.
+# `python inventory_aggregates.py check` compares the stored sums with a full recount.
+
+AGGREGATES_FILE = os.environ.get('INVENTORY_AGGREGATES_FILE', os.path.join(BASE_DIR, 'inventory_aggregates.json'))
+UNCATEGORIZED = 'Uncategorized'
+
+
+def _version_key(version):
+    """Normalises a data_version() token (tuples become lists) so it compares equal after a JSON round trip."""
+    return json.loads(json.dumps(version))
+
+def _add_item(categories, item, sign=1):
+    """Adds (sign 1) or subtracts (sign -1) one item's totals to a category -> totals dict."""
+    quantity = int(item.get('quantity') or 0)
+    price = float(item.get('price') or 0.0)
+    category = item.get('category') or UNCATEGORIZED
+    totals = categories.setdefault(category, [0, 0, 0])
+    totals[0] += sign
+    totals[1] += sign * quantity
+    totals[2] += sign * round(quantity * price * 100)
+    if totals[0] <= 0:
+        del categories[category]
+
+def count_categories(records):
+    """Computes the per-category totals of a list of items from scratch."""
+    categories = {}
+    for item in records:
+        _add_item(categories, item)
+    return categories
+
+
+class InventoryAggregates(DerivedIndex):
+    """Item count, total quantity and total value of the inventory, overall and per category."""
+
+    def __init__(self, path=AGGREGATES_FILE):
+        super().__init__()
+        self.path = path
+        self._categories = {} # category -> [unique items, total quantity, total value in cents]
+
+    # --- Maintenance ---
+    def rebuild(self, records):
+        self._categories = count_categories(records)
+
+    def apply_change(self, before, after):
+        if before is not None:
+            _add_item(self._categories, before, -1)
+        if after is not None:
+            _add_item(self._categories, after)
+
+    def ensure_current(self):
+        version = data_version(self.table)
+        with self._lock:
+            if self._built and version == self._version:
+                return
+            if not self._load(version):
+                self.rebuild(get_backend().load_view(self.table))
+                self._save(version)
+            self._version = version
+            self._built = True
+
+    def _on_change(self, table, changes, previous_version, new_version):
+        if table != self.table:
+            return
+        with self._lock:
+            if changes is not None and not self._built and self._load(previous_version):
+                self._version = previous_version
+                self._built = True
+            super()._on_change(table, changes, previous_version, new_version)
+            if self._built and self._version == new_version:
+                self._save(new_version)
+
+    # --- Persistence ---
+    def _load(self, version):
+        """Loads the saved sums if they were saved at the given data version. Returns True on success."""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            if saved.get('version') != _version_key(version):
+                return False
+            self._categories = {category: [int(value) for value in totals] for category, totals in saved['categories'].items()}
+            return True
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Warning: ignoring unreadable aggregates file '{self.path}': {e}")
+            return False
+
+    def _save(self, version):
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': _version_key(version), 'categories': self._categories}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not save the inventory aggregates: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # --- Reading ---
+    def summary(self):
+        """
+        Returns a dict with the overall totals ('unique_items', 'total_quantity', 'total_value')
+        and 'by_category', a list of per-category rows sorted by category name.
+        """
+        self.ensure_current()
+        with self._lock:
+            by_category = [
+                {'Category': category, 'Unique Items': totals[0], 'Total Quantity': totals[1], 'Total Value': totals[2] / 100}
+                for category, totals in sorted(self._categories.items())
+            ]
+            return {
+                'unique_items': sum(totals[0] for totals in self._categories.values()),
+                'total_quantity': sum(totals[1] for totals in self._categories.values()),
+                'total_value': sum(totals[2] for totals in self._categories.values()) / 100,
+                'by_category': by_category,
+            }
+
+    def check(self):
+        """
+        Compares the aggregates readers would be given (the in-memory sums, or else the saved file)
+        with a full recount of the records. Returns a list of differences, empty when consistent.
+        Nothing is rebuilt or saved.
+        """
+        version = data_version(self.table)
+        with self._lock:
+            if not (self._built and version == self._version) and not self._load(version):
+                self._built = False
+                return ["The saved aggregates are missing or out of date; they are rebuilt on the next read."]
+            self._version = version
+            self._built = True
+            maintained = {category: list(totals) for category, totals in self._categories.items()}
+        recount = count_categories(get_backend().load_view(self.table))
+        differences = []
+        for category in sorted(set(maintained) | set(recount)):
+            expected = recount.get(category, [0, 0, 0])
+            actual = maintained.get(category, [0, 0, 0])
+            for label, expected_value, actual_value in zip(("items", "quantity", "value (cents)"), expected, actual):
+                if expected_value != actual_value:
+                    differences.append(f"{category}: {label} is {actual_value}, recount gives {expected_value}")
+        return differences
+
+    def reset(self):
+        """Rebuilds the aggregates from the records and saves them."""
+        version = data_version(self.table)
+        with self._lock:
+            self.rebuild(get_backend().load_view(self.table))
+            self._save(version)
+            self._version = version
+            self._built = True
+
+
+_aggregates = None
+_aggregates_lock = threading.Lock()
+
+def get_inventory_aggregates():
+    """Returns the process-wide inventory aggregates."""
+    global _aggregates
+    with _aggregates_lock:
+        if _aggregates is None:
+            _aggregates = InventoryAggregates()
+        return _aggregates
+
+
+if __name__ == '__main__':
+    # Usage: python inventory_aggregates.py check|rebuild
+    if len(sys.argv) != 2 or sys.argv[1] not in ('check', 'rebuild'):
+        print("Usage: python inventory_aggregates.py check|rebuild")
+        sys.exit(2)
+    aggregates = get_inventory_aggregates()
+    if sys.argv[1] == 'rebuild':
+        aggregates.reset()
+        print(f"Rebuilt the inventory aggregates ({aggregates.summary()['unique_items']} items).")
+        sys.exit(0)
+    differences = aggregates.check()
+    for difference in differences:
+        print(difference)
+    if differences:
+        print("The inventory aggregates are inconsistent. Run `python inventory_aggregates.py rebuild` to fix them.")
+        sys.exit(1)
+    print("The inventory aggregates are consistent.")
@@ -0,0 +1,119 @@
+import threading
+from array import array
+import numpy as np
+import pandas as pd
+from db_operations import DerivedIndex
+
+# --- Columnar Inventory Model ---
+# The dashboard only needs a handful of fields per item, so instead of building a DataFrame
+# from the list of item dicts on every rerun we keep those fields as typed columns
+# (array.array buffers, viewed as NumPy arrays without copying) shared by all sessions.
+# Categories are stored as small integer codes. Record-level writes update the columns in O(1);
+# the DataFrame view is built once per data version and then served from cache. The dashboard
+# totals do not come from here but from inventory_aggregates.py, which never needs the columns.
+
+UNCATEGORIZED = 'Uncategorized'
+
+
+class InventoryColumns(DerivedIndex):
+    """Typed, per-field columns of the inventory with vectorised aggregates."""
+
+    def __init__(self):
+        super().__init__()
+        self._clear()
+
+    def _clear(self):
+        self.ids = []
+        self.names = []
+        self.pdf_filenames = []
+        self.image_filenames = []
+        self.category_codes = array('i')
+        self.quantities = array('q')
+        self.prices = array('d')
+        self.categories = [] # code -> category name
+        self._category_codes = {} # category name -> code
+        self._rows = {} # item id -> row number
+        self._frame = None
+
+    # --- Maintenance ---
+    def _category_code(self, category):
+        category = category or UNCATEGORIZED
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self._category_codes[category] = code
+        return code
+
+    def _set_row(self, row, item):
+        self.names[row] = item.get('name', '')
+        self.pdf_filenames[row] = item.get('pdf_filename')
+        self.image_filenames[row] = item.get('image_filename')
+        self.category_codes[row] = self._category_code(item.get('category'))
+        self.quantities[row] = int(item.get('quantity') or 0)
+        self.prices[row] = float(item.get('price') or 0.0)
+
+    def _append_row(self, item):
+        self._rows[item['id']] = len(self.ids)
+        self.ids.append(item['id'])
+        self.names.append(None)
+        self.pdf_filenames.append(None)
+        self.image_filenames.append(None)
+        self.category_codes.append(0)
+        self.quantities.append(0)
+        self.prices.append(0.0)
+        self._set_row(len(self.ids) - 1, item)
+
+    def _remove_row(self, item_id):
+        """Removes a row by moving the last row into its slot, so deletes stay O(1)."""
+        row = self._rows.pop(item_id)
+        last = len(self.ids) - 1
+        for column in (self.ids, self.names, self.pdf_filenames, self.image_filenames,
+                       self.category_codes, self.quantities, self.prices):
+            column[row] = column[last]
+            column.pop()
+        if row != last:
+            self._rows[self.ids[row]] = row
+
+    def rebuild(self, records):
+        self._clear()
+        for item in records:
+            self._append_row(item)
+
+    def apply_change(self, before, after):
+        if after is None:
+            self._remove_row(before['id'])
+        elif before is None or after['id'] not in self._rows:
+            self._append_row(after)
+        else:
+            self._set_row(self._rows[after['id']], after)
+        self._frame = None
+
+    # --- Views ---
+    def frame(self):
+        """Returns the inventory as a DataFrame built from the columns (cached per data version)."""
+        self.ensure_current()
+        with self._lock:
+            if self._frame is None:
+                self._frame = pd.DataFrame({
+                    'name': self.names,
+                    'category': pd.Categorical.from_codes(np.array(self.category_codes, dtype=np.int32), categories=self.categories),
+                    'quantity': np.array(self.quantities, dtype=np.int64),
+                    'price': np.array(self.prices, dtype=np.float64),
+                    'id': self.ids,
+                    'pdf_filename': self.pdf_filenames,
+                    'image_filename': self.image_filenames,
+                })
+            return self._frame
+
+
+_columns = None
+_columns_lock = threading.Lock()
+
+def get_inventory_columns():
+    """Returns the process-wide columnar inventory model."""
+    global _columns
+    with _columns_lock:
+        if _columns is None:
+            _columns = InventoryColumns()
+        return _columns
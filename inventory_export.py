@@ -0,0 +1,179 @@
+import csv
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from db_operations import get_item_ids, get_items
+from search_index import get_search_index
+
+# --- Inventory Export ---
+# Writes the inventory (or the items matching a search/category filter) as CSV, JSONL or
+# Parquet. Items are fetched and written EXPORT_CHUNK_SIZE at a time, so memory use does not
+# grow with the size of the inventory: CSV and JSONL rows are streamed to the output file and
+# Parquet is written as one columnar record batch per chunk. The CSV/JSONL columns are the
+# ones bulk_import.py reads, so an export can be imported into another instance.
+# pyarrow is optional and only imported when a Parquet export is written.
+# The admin page prepares exports under EXPORT_DIR. A Streamlit download hands the whole file
+# to the browser from memory, so only files up to MAX_DOWNLOAD_BYTES are offered that way;
+# larger exports are left for the command line. Sessions that end never delete their export,
+# so preparing a new one removes those older than EXPORT_RETENTION_SECONDS.
+
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_FORMATS = ['csv', 'jsonl', 'parquet']
+EXPORT_FIELDS = ['id', 'name', 'category', 'quantity', 'price', 'image_filename', 'pdf_filename']
+EXPORT_MIME_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'inventory_exports')
+EXPORT_RETENTION_SECONDS = int(os.environ.get('INVENTORY_EXPORT_RETENTION_HOURS', 6)) * 3600
+MAX_DOWNLOAD_BYTES = int(os.environ.get('INVENTORY_EXPORT_MAX_DOWNLOAD_MB', 100)) * 1024 * 1024
+
+
+def parquet_available():
+    """True if pyarrow is installed, i.e. Parquet exports are possible."""
+    return importlib.util.find_spec('pyarrow') is not None
+
+def export_ids(search_term='', category=None):
+    """Returns the ids of the items to export: all of them, or those matching the filter."""
+    if not search_term and category is None:
+        return get_item_ids()
+    return get_search_index().search(search_term, category)
+
+def iter_export_chunks(item_ids, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields lists of export rows (dicts with EXPORT_FIELDS), chunk_size items at a time."""
+    for start in range(0, len(item_ids), chunk_size):
+        yield [{field: item.get(field) for field in EXPORT_FIELDS} for item in get_items(item_ids[start:start + chunk_size])]
+
+def _write_csv(out, chunks):
+    writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    count = 0
+    for rows in chunks:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+def _write_jsonl(out, chunks):
+    count = 0
+    for rows in chunks:
+        out.write(''.join(json.dumps(row) + '\n' for row in rows))
+        count += len(rows)
+    return count
+
+def _write_parquet(out, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ('id', pa.string()), ('name', pa.string()), ('category', pa.string()),
+        ('quantity', pa.int64()), ('price', pa.float64()),
+        ('image_filename', pa.string()), ('pdf_filename', pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for rows in chunks:
+            columns = {field: [row[field] for row in rows] for field in EXPORT_FIELDS}
+            writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+            count += len(rows)
+    return count
+
+def write_export(out, file_format, item_ids, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Writes the given items to an open binary file in 'csv', 'jsonl' or 'parquet' format and
+    returns the number of items written. Raises RuntimeError if Parquet is asked for without pyarrow.
+    """
+    chunks = iter_export_chunks(item_ids, chunk_size)
+    if file_format == 'parquet':
+        if not parquet_available():
+            raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow).")
+        return _write_parquet(out, chunks)
+    if file_format not in ('csv', 'jsonl'):
+        raise ValueError(f"Unknown export format '{file_format}'.")
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    try:
+        count = _write_csv(text, chunks) if file_format == 'csv' else _write_jsonl(text, chunks)
+        text.flush()
+    finally:
+        text.detach() # Leave the caller's file open
+    return count
+
+def export_to_path(path, file_format, item_ids):
+    """Writes an export file atomically (readers never see a half-written file). Returns the item count."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            count = write_export(f, file_format, item_ids)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+# --- Exports Prepared for Download ---
+def remove_old_exports(max_age_seconds=EXPORT_RETENTION_SECONDS):
+    """Deletes prepared exports older than max_age_seconds. Returns the number deleted."""
+    removed = 0
+    now = time.time()
+    try:
+        listing = os.scandir(EXPORT_DIR)
+    except FileNotFoundError:
+        return 0
+    with listing:
+        for entry in listing:
+            try:
+                if entry.is_file() and now - entry.stat().st_mtime > max_age_seconds:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Warning: could not delete old export '{entry.name}': {e}")
+    return removed
+
+def new_export_path(file_format):
+    """Returns a new file path under EXPORT_DIR for an export, after clearing out old exports."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    remove_old_exports()
+    return os.path.join(EXPORT_DIR, f"{uuid.uuid4().hex}.{file_format}")
+
+def read_export(path):
+    """Returns the bytes of a prepared export. Raises ValueError if it exceeds MAX_DOWNLOAD_BYTES."""
+    with open(path, 'rb') as f:
+        data = f.read(MAX_DOWNLOAD_BYTES + 1)
+    if len(data) > MAX_DOWNLOAD_BYTES:
+        raise ValueError(f"The export is larger than the {MAX_DOWNLOAD_BYTES // (1024 * 1024)} MB download limit.")
+    return data
+
+
+if __name__ == '__main__':
+    # Usage: python inventory_export.py csv|jsonl|parquet OUTPUT [--search TEXT] [--category NAME]
+    # OUTPUT may be '-' for standard output (csv and jsonl only).
+    args = sys.argv[1:]
+    options = {}
+    for option in ('--search', '--category'):
+        if option in args:
+            position = args.index(option)
+            if position + 1 >= len(args):
+                args = []
+                break
+            options[option] = args[position + 1]
+            del args[position:position + 2]
+    if len(args) != 2 or args[0] not in EXPORT_FORMATS:
+        print("Usage: python inventory_export.py csv|jsonl|parquet OUTPUT [--search TEXT] [--category NAME]", file=sys.stderr)
+        sys.exit(2)
+    file_format, output = args
+    ids = export_ids(options.get('--search', ''), options.get('--category'))
+    try:
+        if output == '-':
+            if file_format == 'parquet':
+                print("Error: Parquet exports must be written to a file.", file=sys.stderr)
+                sys.exit(2)
+            written = write_export(sys.stdout.buffer, file_format, ids)
+            sys.stdout.flush()
+        else:
+            written = export_to_path(output, file_format, ids)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Exported {written} items.", file=sys.stderr)
@@ -1,99 +1,80 @@
 import streamlit as st
+import functools
 import os
+import time
 import uuid
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from db_operations import load_inventory, save_inventory
-from utils import ALLOWED_EXTENSIONS, allowed_file, BASE_DIR, get_pdf_dir, get_image_dir, get_placeholder_image_path
-
-# Predefined list of categories for consistency
-ITEM_CATEGORIES = ["Electronics", "Books", "Clothing", "Home Goods", "Food", "Office Supplies", "Other"]
-
-def generate_item_pdf(item_data, item_image_filename=None):
-    """
-    Generates a PDF for a given item, optionally including an image,
-    and saves it to the static/pdfs directory.
-    Returns the filename of the generated PDF.
-    """
-    pdf_dir = get_pdf_dir()
-    if not os.path.exists(pdf_dir):
-        os.makedirs(pdf_dir)
-
-    # Use item name and part of ID for a unique filename
-    pdf_filename = f"{item_data['name'].replace(' ', '_').replace('/', '-')}_{item_data['id'][:8]}.pdf"
-    pdf_path = os.path.join(pdf_dir, pdf_filename)
-
-    doc = SimpleDocTemplate(pdf_path, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Title
-    story.append(Paragraph(f"Inventory Item: {item_data['name']}", styles['h1']))
-    story.append(Spacer(1, 0.2 * inch))
-
-    # Image (if provided and exists)
-    if item_image_filename:
-        images_dir = get_image_dir()
-        image_full_path = os.path.join(images_dir, item_image_filename)
-        if os.path.exists(image_full_path):
-            try:
-                img = Image(image_full_path)
-                max_width = 4 * inch
-                aspect_ratio = img.drawHeight / img.drawWidth
-                if img.drawWidth > max_width:
-                    img.drawWidth = max_width
-                    img.drawHeight = max_width * aspect_ratio
-                
-                story.append(img)
-                story.append(Spacer(1, 0.1 * inch))
-            except Exception as e:
-                print(f"Warning: Could not embed image '{item_image_filename}' into PDF: {e}")
-                story.append(Paragraph(f"<i>(Image could not be embedded: {item_image_filename})</i>", styles['Normal']))
-                story.append(Spacer(1, 0.1 * inch))
-        else:
-            story.append(Paragraph(f"<i>(Image file not found: {item_image_filename})</i>", styles['Normal']))
-            story.append(Spacer(1, 0.1 * inch))
-    else:
-        story.append(Paragraph("<i>(No image provided for this item)</i>", styles['Normal']))
-        story.append(Spacer(1, 0.1 * inch))
-
-    # Details
-    story.append(Paragraph(f"<b>Item ID:</b> {item_data['id']}", styles['Normal']))
-    story.append(Paragraph(f"<b>Category:</b> {item_data.get('category', 'N/A')}", styles['Normal'])) # NEW: Category in PDF
-    story.append(Paragraph(f"<b>Quantity:</b> {item_data['quantity']}", styles['Normal']))
-    story.append(Paragraph(f"<b>Price:</b> ${item_data['price']:.2f}", styles['Normal']))
-    story.append(Spacer(1, 0.4 * inch))
-
-    story.append(Paragraph("This document provides details for the inventory item, including an embedded image if available.", styles['Normal']))
-
-    doc.build(story)
-    return pdf_filename
-
+from asset_store import image_filename_for, release_image, store_image
+from db_operations import data_version, get_item, get_items, insert_item, update_item, delete_item, VersionConflictError, RecordNotFoundError
+from pdf_generator import generate_item_pdf, pdf_filename_for, pdf_fingerprint, pdf_is_current
+from perf import record, span, timed
+from pdf_jobs import catalog_status, discard_catalog, enqueue_pdf, needs_pdf, pdf_status, pending_changes, retry_pdf, start_catalog
+from search_index import get_search_index
+from static_assets import asset_url, static_serving_enabled
+from thumbnails import GRID_WIDTH, PREVIEW_WIDTH, create_thumbnails, thumbnail_path
+from file_manifest import image_content_hash, pdf_files
+from utils import CATALOG_LAYOUTS, ITEM_CATEGORIES, ALLOWED_EXTENSIONS, allowed_file, BASE_DIR, get_pdf_dir, get_image_dir, get_placeholder_image_path
+
+# Inventory grid pagination
+PAGE_SIZE_OPTIONS = [12, 24, 48, 96]
+# Sort label -> (field, descending) for SearchIndex.query; None keeps the search's own order
+SORT_OPTIONS = {
+    "Best match": (None, False),
+    "Name (A-Z)": ('name', False),
+    "Name (Z-A)": ('name', True),
+    "Price (low to high)": ('price', False),
+    "Price (high to low)": ('price', True),
+    "Quantity (low to high)": ('quantity', False),
+    "Quantity (high to low)": ('quantity', True),
+}
 
 def show_inventory_page():
     """Renders the main inventory display page with search, image display, and PDF download buttons."""
     st.subheader("Current Inventory")
-    inventory = load_inventory()
-    
-    pdf_dir = get_pdf_dir()
-    images_dir = get_image_dir()
 
     # Filters and Search
     col1, col2 = st.columns([3,1])
     with col1:
-        search_term = st.text_input("Search by name:", key="inventory_search").lower()
+        search_term = st.text_input("Search by name or ID:", key="inventory_search").lower()
+        typo_tolerant = st.checkbox("Include close matches (typo tolerant)", key="inventory_search_fuzzy")
     with col2:
         # Add category filter
         selected_category = st.selectbox("Filter by category:", ["All"] + ITEM_CATEGORIES, key="category_filter")
 
-    filtered_inventory = [item for item in inventory if search_term in item['name'].lower()]
-    if selected_category != "All":
-        filtered_inventory = [item for item in filtered_inventory if item.get('category') == selected_category]
-
+    col1, col2 = st.columns([3,1])
+    with col1:
+        sort_order = st.selectbox("Sort by:", list(SORT_OPTIONS), key="inventory_sort")
+    with col2:
+        page_size = st.selectbox("Items per page:", PAGE_SIZE_OPTIONS, index=1, key="inventory_page_size")
+
+    # Range filters; an empty box leaves that end of the range open
+    with st.expander("Price and quantity filters"):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            min_price = st.number_input("Min price ($):", min_value=0.0, value=None, step=1.0, format="%.2f", key="inventory_min_price")
+        with col2:
+            max_price = st.number_input("Max price ($):", min_value=0.0, value=None, step=1.0, format="%.2f", key="inventory_max_price")
+        with col3:
+            min_quantity = st.number_input("Min quantity:", min_value=0, value=None, step=1, key="inventory_min_quantity")
+        with col4:
+            max_quantity = st.number_input("Max quantity:", min_value=0, value=None, step=1, key="inventory_max_quantity")
+    ranges = {'price': (min_price, max_price), 'quantity': (min_quantity, max_quantity)}
+
+    matching_ids = _inventory_result_ids(search_term, None if selected_category == "All" else selected_category, typo_tolerant, sort_order, ranges)
+
+    # Only the current page is fetched and rendered; the page number lives in session state.
+    page_count = max(1, -(-len(matching_ids) // page_size))
+    page = min(max(1, st.session_state.get('inventory_page', 1)), page_count)
+    st.session_state.inventory_page = page
+    start = (page - 1) * page_size
+    filtered_inventory = get_items(matching_ids[start:start + page_size])
+
+    _catalog_controls(matching_ids, selected_category)
 
     if filtered_inventory:
+        render_started = time.perf_counter()
+        placeholder_url = asset_url(get_placeholder_image_path())
+        pdf_dir = get_pdf_dir()
+        st.caption(f"Showing {start + 1}-{start + len(filtered_inventory)} of {len(matching_ids)} items")
         num_columns = 3 
         cols = st.columns(num_columns)
         
@@ -102,16 +83,16 @@ def show_inventory_page():
             with cols[col_idx]:
                 st.markdown(f"**{item['name']}**")
                 
-                # Display item image or placeholder
+                # Display item image (a resized thumbnail, not the full upload) or placeholder
                 item_image_filename = item.get('image_filename')
                 if item_image_filename:
-                    image_path = os.path.join(images_dir, item_image_filename)
-                    if os.path.exists(image_path):
-                        st.image(image_path, caption=item['name'], use_column_width=True)
+                    image_source = _image_source(item_image_filename, GRID_WIDTH)
+                    if image_source:
+                        st.image(image_source, caption=item['name'], use_column_width=True)
                     else:
-                        st.image(get_placeholder_image_path(), caption="Image not found", use_column_width=True)
+                        st.image(placeholder_url, caption="Image not found", use_column_width=True)
                 else:
-                    st.image(get_placeholder_image_path(), caption="No image", use_column_width=True)
+                    st.image(placeholder_url, caption="No image", use_column_width=True)
 
 
                 st.write(f"ID: `{item['id'][:8]}...`")
@@ -119,28 +100,36 @@ def show_inventory_page():
                 st.write(f"Quantity: {item['quantity']}")
                 st.write(f"Price: **${item['price']:.2f}**")
                 
-                # PDF Download button
-                pdf_filename = item.get('pdf_filename')
-                if pdf_filename:
-                    pdf_path = os.path.join(pdf_dir, pdf_filename)
-                    if os.path.exists(pdf_path):
-                        with open(pdf_path, "rb") as pdf_file:
-                            st.download_button(
-                                label="Download PDF",
-                                data=pdf_file,
-                                file_name=pdf_filename,
-                                mime="application/pdf",
-                                key=f"download_pdf_{item['id']}"
-                            )
-                    else:
-                        st.info("PDF not found (might need to edit & re-save item).")
+                # PDFs are rendered in the background after a save; show the job state until done
+                item_pdf_status = pdf_status(item)
+                if item_pdf_status == 'pending':
+                    st.info("PDF is being generated. Refresh the page to update.")
+                elif item_pdf_status == 'failed':
+                    st.warning(f"PDF generation failed: {item.get('pdf_error') or 'the job did not finish'}")
+                    if st.session_state.role == 'admin':
+                        if st.button("Retry PDF", key=f"retry_pdf_{item['id']}"):
+                            retry_pdf(item['id'])
+                            st.rerun()
+                elif static_serving_enabled() and pdf_is_current(item):
+                    # Up-to-date PDFs are plain links, fetched and cached by the browser
+                    pdf_url = asset_url(os.path.join(pdf_dir, item['pdf_filename']), item['pdf_fingerprint'][:12], link=True)
+                    st.link_button("Download PDF", pdf_url)
                 else:
-                    st.info("No PDF available for this item.")
+                    # PDF Download button: the file is only read (or built) when the button is clicked
+                    st.download_button(
+                        label="Download PDF",
+                        data=functools.partial(item_pdf_bytes, item['id']),
+                        file_name=pdf_filename_for(item),
+                        mime="application/pdf",
+                        key=f"download_pdf_{item['id']}",
+                        on_click="ignore"
+                    )
                 
                 if st.session_state.role == 'admin':
                     if st.button(f"Edit {item['name']}", key=f"edit_btn_{item['id']}"):
                         st.session_state.current_page = 'edit_item' 
                         st.session_state.edit_item_id = item['id'] 
+                        st.session_state.edit_item_version = item.get('version', 0) # Detects edits made by others meanwhile
                         st.rerun() 
                     
                     if st.button(f"Delete {item['name']}", key=f"del_btn_{item['id']}"):
@@ -159,6 +148,9 @@ def show_inventory_page():
                                 st.rerun()
 
             col_idx = (col_idx + 1) % num_columns 
+
+        record('inventory.render_cards', time.perf_counter() - render_started)
+        _pagination_controls(page, page_count)
     else:
         st.info("No items in inventory matching your search or filters.")
         if st.session_state.role == 'admin':
@@ -166,13 +158,141 @@ def show_inventory_page():
                 st.session_state.current_page = 'add_item'
                 st.rerun()
 
+def _catalog_controls(matching_ids, selected_category):
+    """Builds one PDF of all items matching the current filters in the background and offers it for download."""
+    with st.expander("Catalog PDF"):
+        layout = st.radio("Layout:", list(CATALOG_LAYOUTS), format_func=CATALOG_LAYOUTS.get, horizontal=True, key="catalog_layout")
+        if st.button(f"Build catalog of {len(matching_ids)} items", disabled=not matching_ids, key="build_catalog"):
+            if st.session_state.get('catalog_job'):
+                discard_catalog(st.session_state.catalog_job) # Only the latest catalog of a session is kept
+            title = "Inventory Catalog" if selected_category == "All" else f"{selected_category} Catalog"
+            st.session_state.catalog_job = start_catalog(matching_ids, layout, title)
+
+        job_id = st.session_state.get('catalog_job')
+        if not job_id:
+            return
+        state = catalog_status(job_id)
+        if state is None: # The server restarted since the job was started
+            del st.session_state.catalog_job
+            return
+        status, detail = state
+        if status == 'pending':
+            st.info("The catalog is being generated. Refresh to update.")
+            st.button("Refresh", key="refresh_catalog")
+        elif status == 'failed':
+            st.warning(f"Catalog generation failed: {detail}")
+        elif static_serving_enabled():
+            st.link_button("Download Catalog", asset_url(detail, link=True))
+        else:
+            st.download_button(
+                label="Download Catalog",
+                data=functools.partial(_read_file, detail),
+                file_name="catalog.pdf",
+                mime="application/pdf",
+                key="download_catalog",
+                on_click="ignore"
+            )
+
+def _read_file(path):
+    with open(path, "rb") as f, span('pdf.read') as timer:
+        data = f.read()
+        timer.add_bytes(len(data))
+    return data
+
+@timed('inventory.image_source')
+def _image_source(image_filename, width):
+    """
+    Returns what st.image should load for an item image at the given width: a static URL when
+    static serving is on, otherwise the thumbnail's path. Returns None if the image is missing.
+    """
+    image_path = thumbnail_path(image_filename, width)
+    content_hash = image_content_hash(image_filename)
+    if image_path is None or content_hash is None:
+        return None
+    return asset_url(image_path, content_hash[:12])
+
+def item_pdf_bytes(item_id):
+    """
+    Returns the PDF for an item as bytes. Called by the download button only when the user clicks
+    it, so rendering the grid never reads PDFs. A missing or outdated PDF is regenerated first.
+    """
+    item = get_item(item_id)
+    if item is None:
+        return b""
+    pdf_dir = get_pdf_dir()
+    old_pdf_filename = item.get('pdf_filename')
+    if pdf_is_current(item):
+        pdf_path = os.path.join(pdf_dir, old_pdf_filename)
+    else:
+        fingerprint = pdf_fingerprint(item)
+        with span('pdf.generate_on_download'):
+            pdf_filename = generate_item_pdf(item, item.get('image_filename'))
+        pdf_files().added(pdf_filename)
+        pdf_path = os.path.join(pdf_dir, pdf_filename)
+        try:
+            update_item(item_id, {'pdf_filename': pdf_filename, 'pdf_fingerprint': fingerprint}, bump_version=False)
+        except RecordNotFoundError:
+            pass # Deleted meanwhile; the download still gets the file just built
+        if pdf_filename != old_pdf_filename:
+            if old_pdf_filename and os.path.exists(os.path.join(pdf_dir, old_pdf_filename)):
+                try:
+                    os.remove(os.path.join(pdf_dir, old_pdf_filename))
+                    pdf_files().removed(old_pdf_filename)
+                except OSError as e:
+                    print(f"Warning: could not delete outdated PDF '{old_pdf_filename}': {e}")
+    with open(pdf_path, "rb") as pdf_file, span('pdf.read') as timer:
+        data = pdf_file.read()
+        timer.add_bytes(len(data))
+    return data
+
+def _inventory_result_ids(search_term, category, fuzzy, sort_order, ranges):
+    """
+    Returns the ordered ids matching the current search, filters, price/quantity ranges and sort order.
+    The list is kept in session state and only recomputed when the query or the inventory
+    changes, so paging through results does not repeat the search.
+    """
+    query = (search_term, category, fuzzy, sort_order, tuple(sorted(ranges.items())))
+    version = data_version('inventory')
+    cached = st.session_state.get('inventory_results')
+    if cached and cached[0] == query and cached[1] == version:
+        return cached[2]
+
+    with span('inventory.search'):
+        sort_field, descending = SORT_OPTIONS[sort_order]
+        matching_ids = get_search_index().query(search_term, category, fuzzy=fuzzy, ranges=ranges, sort=sort_field, descending=descending)
+
+    if not cached or cached[0] != query:
+        st.session_state.inventory_page = 1 # A new query starts from the first page
+    st.session_state.inventory_results = (query, version, matching_ids)
+    return matching_ids
+
+def _change_inventory_page(page):
+    st.session_state.inventory_page = page
+
+def _jump_to_inventory_page(widget_key):
+    st.session_state.inventory_page = st.session_state[widget_key]
+
+def _pagination_controls(page, page_count):
+    """Renders previous/next buttons and a page selector below the inventory grid."""
+    if page_count <= 1:
+        return
+    col1, col2, col3 = st.columns([1,2,1])
+    with col1:
+        st.button("Previous", key="inventory_prev_page", disabled=page <= 1, on_click=_change_inventory_page, args=(page - 1,))
+    with col2:
+        # Keyed by the current page so the box shows the new page after Previous/Next
+        page_input_key = f"inventory_page_input_{page}"
+        st.number_input(f"Page (of {page_count}):", min_value=1, max_value=page_count, value=page, step=1,
+                        key=page_input_key, on_change=_jump_to_inventory_page, args=(page_input_key,))
+    with col3:
+        st.button("Next", key="inventory_next_page", disabled=page >= page_count, on_click=_change_inventory_page, args=(page + 1,))
+
 def delete_item_from_db(item_id):
     """Deletes an item from the inventory and its associated PDF/image files."""
-    inventory = load_inventory()
     pdf_dir = get_pdf_dir()
-    images_dir = get_image_dir()
     
-    item_to_delete = next((item for item in inventory if item['id'] == item_id), None)
+    # The record is removed first, so no stored item can point at files deleted below.
+    item_to_delete = delete_item(item_id)
     
     if item_to_delete:
         # Delete associated PDF file
@@ -181,22 +301,17 @@ def delete_item_from_db(item_id):
             if os.path.exists(pdf_path):
                 try:
                     os.remove(pdf_path)
+                    pdf_files().removed(item_to_delete['pdf_filename'])
                     print(f"Deleted PDF: {pdf_path}")
                 except OSError as e:
                     st.error(f"Error deleting PDF file: {e}")
         
-        # Delete associated image file
+        # Delete associated image file, unless other items share the same picture
         if item_to_delete.get('image_filename'):
-            image_path = os.path.join(images_dir, item_to_delete['image_filename'])
-            if os.path.exists(image_path):
-                try:
-                    os.remove(image_path)
-                    print(f"Deleted image: {image_path}")
-                except OSError as e:
-                    st.error(f"Error deleting image file: {e}")
-
-        inventory = [item for item in inventory if item['id'] != item_id]
-        save_inventory(inventory) 
+            try:
+                release_image(item_to_delete['image_filename'])
+            except OSError as e:
+                st.error(f"Error deleting image file: {e}")
     else:
         st.error("Item not found.")
 
@@ -224,14 +339,9 @@ def add_item_page():
                 item_image_filename = None
                 if uploaded_image_file:
                     if allowed_file(uploaded_image_file.name):
-                        images_dir = get_image_dir()
-                        image_uuid = str(uuid.uuid4().hex)
-                        file_extension = os.path.splitext(uploaded_image_file.name)[1]
-                        item_image_filename = f"{image_uuid}{file_extension}"
-                        
-                        image_path_full = os.path.join(images_dir, item_image_filename)
-                        with open(image_path_full, "wb") as f:
-                            f.write(uploaded_image_file.getbuffer())
+                        # Stored under its content hash, so a photo shared by several items is kept once
+                        item_image_filename = store_image(uploaded_image_file.getvalue(), uploaded_image_file.name)
+                        create_thumbnails(item_image_filename)
                         st.success(f"Image uploaded: {item_image_filename}")
                     else:
                         st.warning('Invalid image file type. Allowed: png, jpg, jpeg, gif. Item added without image.')
@@ -246,18 +356,12 @@ def add_item_page():
                     'pdf_filename': None,
                     'image_filename': item_image_filename
                 }
-                
-                try:
-                    pdf_filename = generate_item_pdf(new_item, item_image_filename)
-                    new_item['pdf_filename'] = pdf_filename
-                    st.success(f"PDF generated: {pdf_filename}")
-                except Exception as e:
-                    st.error(f"Error generating PDF: {e}. Item added without PDF.")
-
-                inventory = load_inventory() 
-                inventory.append(new_item) 
-                save_inventory(inventory) 
-                st.success('Item added successfully!')
+                new_item.update(pending_changes())
+
+                # The item is saved right away; its PDF is rendered by the background workers.
+                new_item = insert_item(new_item)
+                enqueue_pdf(new_item)
+                st.success('Item added successfully! Its PDF is being generated.')
                 st.session_state.current_page = 'inventory' 
                 st.rerun() 
 
@@ -275,8 +379,8 @@ def edit_item_page():
             st.rerun()
         return
 
-    inventory = load_inventory() 
-    item_to_edit = next((item for item in inventory if item['id'] == item_id), None)
+    item_to_edit = get_item(item_id)
+    expected_version = st.session_state.get('edit_item_version')
 
     if not item_to_edit:
         st.error("Item not found.")
@@ -303,19 +407,18 @@ def edit_item_page():
         st.write("---")
         st.markdown("##### Current Image:")
         current_image_filename = item_to_edit.get('image_filename')
-        images_dir = get_image_dir()
 
         if current_image_filename:
-            image_path = os.path.join(images_dir, current_image_filename)
-            if os.path.exists(image_path):
-                st.image(image_path, caption="Current Image", width=150)
+            image_source = _image_source(current_image_filename, PREVIEW_WIDTH)
+            if image_source:
+                st.image(image_source, caption="Current Image", width=150)
                 st.write(f"Filename: `{current_image_filename}`")
             else:
                 st.info("Current image file not found.")
-                st.image(get_placeholder_image_path(), caption="Image Missing", width=100)
+                st.image(asset_url(get_placeholder_image_path()), caption="Image Missing", width=100)
         else:
             st.info("No current image.")
-            st.image(get_placeholder_image_path(), caption="No Image", width=100)
+            st.image(asset_url(get_placeholder_image_path()), caption="No Image", width=100)
 
 
         uploaded_image_file = st.file_uploader("Upload New Item Image (Optional)", type=['png', 'jpg', 'jpeg', 'gif'], key="edit_image_uploader")
@@ -325,8 +428,10 @@ def edit_item_page():
         if submitted:
             if not name:
                 st.error('Item Name is required.')
+            elif expected_version is not None and item_to_edit.get('version', 0) != expected_version:
+                st.error("This item was changed by someone else while you were editing it. The form now shows the latest values; review them and submit again.")
+                st.session_state.edit_item_version = item_to_edit.get('version', 0)
             else:
-                old_pdf_filename = item_to_edit.get('pdf_filename')
                 old_image_filename = item_to_edit.get('image_filename')
 
                 # Update core item details
@@ -335,50 +440,51 @@ def edit_item_page():
                 item_to_edit['quantity'] = quantity
                 item_to_edit['price'] = price
 
-                # Handle new image upload
+                # Handle new image upload. The file has to be stored before the record refers to
+                # it; thumbnails wait until the update went through.
                 new_image_filename = old_image_filename 
+                upload_is_new = False # True if this request wrote the file, so a failed save may discard it
                 if uploaded_image_file:
                     if allowed_file(uploaded_image_file.name):
-                        if old_image_filename:
-                            old_image_path = os.path.join(images_dir, old_image_filename)
-                            if os.path.exists(old_image_path):
-                                try:
-                                    os.remove(old_image_path)
-                                    st.info(f"Old image '{old_image_filename}' deleted.")
-                                except OSError as e:
-                                    st.error(f"Error deleting old image file '{old_image_filename}': {e}")
-                        
-                        image_uuid = str(uuid.uuid4().hex)
-                        file_extension = os.path.splitext(uploaded_image_file.name)[1]
-                        new_image_filename = f"{image_uuid}{file_extension}"
-                        
-                        new_image_path_full = os.path.join(images_dir, new_image_filename)
-                        with open(new_image_path_full, "wb") as f:
-                            f.write(uploaded_image_file.getbuffer())
-                        st.success(f"New image uploaded: {new_image_filename}")
+                        image_bytes = uploaded_image_file.getvalue()
+                        upload_is_new = not os.path.exists(os.path.join(get_image_dir(), image_filename_for(image_bytes, uploaded_image_file.name)))
+                        new_image_filename = store_image(image_bytes, uploaded_image_file.name)
                     else:
                         st.warning('Invalid image file type for new upload. Allowed: png, jpg, jpeg, gif. Keeping old image (if any).')
                 item_to_edit['image_filename'] = new_image_filename
 
+                # The PDF is only re-rendered if something it shows changed; the old file stays in
+                # place until the background job has rendered its replacement.
+                changes = {field: item_to_edit[field] for field in ('name', 'category', 'quantity', 'price', 'image_filename')}
+                regenerate_pdf = needs_pdf(item_to_edit)
+                if regenerate_pdf:
+                    changes.update(pending_changes())
                 try:
-                    pdf_filename = generate_item_pdf(item_to_edit, item_to_edit['image_filename'])
-                    item_to_edit['pdf_filename'] = pdf_filename
-                    st.success(f"PDF regenerated: {pdf_filename}")
-
-                    if old_pdf_filename and old_pdf_filename != pdf_filename:
-                        old_pdf_path = os.path.join(get_pdf_dir(), old_pdf_filename)
-                        if os.path.exists(old_pdf_path):
-                            try:
-                                os.remove(old_pdf_path)
-                                st.info(f"Old PDF '{old_pdf_filename}' deleted.")
-                            except OSError as e:
-                                st.error(f"Error deleting old PDF file '{old_pdf_filename}': {e}")
-
-                except Exception as e:
-                    st.error(f"Error regenerating PDF: {e}. Item updated, but PDF might be outdated.")
-                    item_to_edit['pdf_filename'] = old_pdf_filename 
-
-                save_inventory(inventory) 
-                st.success('Item updated successfully!')
+                    updated_item = update_item(item_id, changes, expected_version=expected_version)
+                except (VersionConflictError, RecordNotFoundError) as e:
+                    if upload_is_new and new_image_filename != old_image_filename:
+                        release_image(new_image_filename, grace_seconds=0)
+                    if isinstance(e, RecordNotFoundError):
+                        st.error("This item was deleted while you were editing it.")
+                    else:
+                        st.error("This item was changed by someone else while you were saving it. Please review the latest values and submit again.")
+                        st.session_state.edit_item_version = e.current_version
+                    st.stop()
+                st.session_state.edit_item_version = None
+                if new_image_filename != old_image_filename:
+                    create_thumbnails(new_image_filename)
+                    st.success(f"New image uploaded: {new_image_filename}")
+                if old_image_filename and old_image_filename != new_image_filename:
+                    # Only now that the item no longer refers to it; other items may still use it
+                    try:
+                        if release_image(old_image_filename):
+                            st.info(f"Old image '{old_image_filename}' deleted.")
+                    except OSError as e:
+                        st.error(f"Error deleting old image file '{old_image_filename}': {e}")
+                if regenerate_pdf:
+                    enqueue_pdf(updated_item)
+                    st.success('Item updated successfully! Its PDF is being regenerated.')
+                else:
+                    st.success('Item updated successfully!')
                 st.session_state.current_page = 'inventory'
                 st.rerun()
@@ -0,0 +1,303 @@
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from types import MappingProxyType
+try:
+    import fcntl
+except ImportError: # Windows: no advisory locks, so only one process may write the data files
+    fcntl = None
+
+# --- Append-Only Journal Storage ---
+# A JournalStore keeps one list of records (inventory items or users, keyed by 'id') as a
+# snapshot file plus a JSONL journal of the changes made since that snapshot was written.
+# The snapshot is the regular JSON array file (db.json / users.json), so switching journal
+# mode off again only needs a compaction. Journal lines look like:
+#   {"op": "put", "record": {...}}    insert or replace the record with record['id']
+#   {"op": "del", "id": "..."}        remove the record with that id
+# Replaying a line twice has no further effect, which is what makes compaction crash-safe:
+# the new snapshot is swapped in first and the journal is removed afterwards.
+# Several processes may share the files (the server and the command-line tools), so every
+# read and write holds an flock on a lock file next to the journal: shared for reading,
+# exclusive for appending and compacting. Appends therefore never interleave, a writer always
+# knows where its own lines end, and no line can be appended between a compaction's final
+# replay and its removal of the journal. Compaction removes the journal rather than truncating
+# it, so the next append starts a new file (a new inode) that readers recognise as such.
+
+DEFAULT_COMPACT_THRESHOLD = 1000 # Journal lines written before a background compaction starts
+
+def journal_path_for(snapshot_path):
+    """Returns the journal file path used alongside a snapshot file (db.json -> db.journal.jsonl)."""
+    return f"{os.path.splitext(snapshot_path)[0]}.journal.jsonl"
+
+def lock_path_for(snapshot_path):
+    """Returns the lock file path shared by every process using a snapshot and its journal."""
+    return f"{journal_path_for(snapshot_path)}.lock"
+
+def _signature(path):
+    """Returns the (mtime_ns, size, inode) triple of a file, or None if it does not exist."""
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+
+class JournalStore:
+    """Snapshot + journal persistence for one list of records keyed by their 'id' field."""
+
+    def __init__(self, snapshot_path, compact_threshold=DEFAULT_COMPACT_THRESHOLD):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path_for(snapshot_path)
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._records = {} # id -> record, in display order
+        self._snapshot_signature = None
+        self._journal_inode = None
+        self._journal_offset = 0 # Bytes of the journal already applied to self._records
+        self._journal_lines = 0
+        self._view = None
+        self._compacting = False
+        self._lock_file = None # Opened on first use; flocks belong to the open file
+        self._lock_pid = None # A forked child must open its own, or it would share its parent's lock
+        self._lock_depth = 0
+        self._lock_exclusive = False
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        """
+        Holds the cross-process lock (shared or exclusive) for the duration of the block.
+        Must be entered with self._lock held; nested blocks reuse the lock already taken.
+        """
+        if fcntl is None:
+            yield
+            return
+        if self._lock_depth:
+            if exclusive and not self._lock_exclusive:
+                raise RuntimeError("cannot upgrade a shared journal lock to an exclusive one")
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        if self._lock_file is None or self._lock_pid != os.getpid():
+            self._lock_file = open(lock_path_for(self.snapshot_path), 'a')
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        self._lock_depth, self._lock_exclusive = 1, exclusive
+        try:
+            yield
+        finally:
+            self._lock_depth = 0
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    # --- Reading ---
+    def _read_snapshot(self):
+        """Parses the snapshot file into self._records (creating an empty one if missing)."""
+        if not os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'w') as f:
+                json.dump([], f)
+        with open(self.snapshot_path, 'r') as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                print(f"Warning: {self.snapshot_path} is empty or contains invalid JSON. Starting from an empty snapshot.")
+                data = []
+        if not isinstance(data, list):
+            print(f"Warning: {self.snapshot_path} contains non-list data. Starting from an empty snapshot.")
+            data = []
+        self._records = {record['id']: record for record in data if isinstance(record, dict) and 'id' in record}
+        self._snapshot_signature = _signature(self.snapshot_path)
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._journal_lines = 0
+
+    def _apply_entry(self, entry):
+        """Applies one decoded journal entry to the in-memory state."""
+        if entry.get('op') == 'put':
+            record = entry['record']
+            self._records[record['id']] = record
+        elif entry.get('op') == 'del':
+            self._records.pop(entry['id'], None)
+
+    def _replay_journal(self):
+        """Applies journal lines written since the last replay (by this or another process)."""
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            if inode != self._journal_inode:
+                self._journal_inode = inode
+                self._journal_offset = 0
+                self._journal_lines = 0
+            f.seek(self._journal_offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break # A writer is mid-append (or crashed mid-line); pick it up next time
+                self._journal_offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    self._apply_entry(json.loads(line))
+                except (json.JSONDecodeError, KeyError, TypeError) as e:
+                    print(f"Warning: skipping unreadable journal line in {self.journal_path}: {e}")
+                self._journal_lines += 1
+                self._view = None
+
+    def _refresh(self):
+        """Brings the in-memory state up to date with the snapshot and journal on disk."""
+        snapshot_signature = _signature(self.snapshot_path)
+        journal_signature = _signature(self.journal_path)
+        if snapshot_signature is None or snapshot_signature != self._snapshot_signature:
+            self._read_snapshot()
+            self._view = None
+        elif journal_signature is not None and self._journal_inode is not None and \
+                (journal_signature[2] != self._journal_inode or journal_signature[1] < self._journal_offset):
+            # The journal was replaced by a compaction elsewhere; rebuild from scratch.
+            # (A journal appearing after none was applied simply belongs to the current snapshot.)
+            self._read_snapshot()
+            self._view = None
+        self._replay_journal()
+
+    def version(self):
+        """Returns a token that changes whenever the records change (here or in another process)."""
+        with self._lock, self._file_lock(exclusive=False):
+            self._refresh()
+            return (self._snapshot_signature, self._journal_inode, self._journal_offset)
+
+    def view(self):
+        """Returns the current records as a read-only tuple of mappings, shared between callers."""
+        with self._lock, self._file_lock(exclusive=False):
+            self._refresh()
+            if self._view is None:
+                self._view = tuple(MappingProxyType(dict(record)) for record in self._records.values())
+            return self._view
+
+    def get(self, record_id):
+        """Returns the stored record with the given id (not a copy; do not modify it), or None."""
+        with self._lock, self._file_lock(exclusive=False):
+            self._refresh()
+            return self._records.get(record_id)
+
+    # --- Writing ---
+    def _append(self, entries):
+        """
+        Appends journal entries in a single write and applies them to the in-memory state.
+        Must be called with the exclusive file lock held, right after _refresh().
+        """
+        if not entries:
+            return
+        payload = ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries).encode('utf-8')
+        with open(self.journal_path, 'ab') as f:
+            inode = os.fstat(f.fileno()).st_ino
+            if inode != self._journal_inode:
+                self._journal_inode, self._journal_offset = inode, 0 # A new journal, started by this append
+            if f.seek(0, os.SEEK_END) > self._journal_offset:
+                payload = b'\n' + payload # Terminate the partial line a crashed writer left behind
+            f.write(payload)
+            f.flush()
+            self._journal_offset = f.tell()
+        for entry in entries:
+            self._apply_entry(entry)
+        self._journal_lines += len(entries)
+        self._view = None
+        if self._journal_lines >= self.compact_threshold:
+            self.compact_in_background()
+
+    def _conflicts(self, expected):
+        """
+        Returns the ids in expected (id -> 'revision' the caller read the record at, None if it
+        was not stored) whose stored record is no longer at that revision. Call with the lock held.
+        """
+        conflicts = []
+        for record_id, revision in expected.items():
+            record = self._records.get(record_id)
+            if (record.get('revision', 0) if record is not None else None) != revision:
+                conflicts.append(record_id)
+        return conflicts
+
+    def apply(self, puts, deletes, expected=None):
+        """
+        Journals the given records and deletions without looking at any other record. With
+        expected (see _conflicts()), nothing is written if a record moved on since the caller
+        read it, and the conflicting ids are returned.
+        """
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            if expected:
+                conflicts = self._conflicts(expected)
+                if conflicts:
+                    return conflicts
+            entries = [{'op': 'put', 'record': dict(record)} for record in puts]
+            entries.extend({'op': 'del', 'id': record_id} for record_id in deletes)
+            self._append(entries)
+            return []
+
+    def save(self, records):
+        """
+        Persists a full list of records by journaling only the differences from the current state,
+        so existing load/modify/save callers pay for the records they changed, not the whole list.
+        """
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            entries = []
+            seen_ids = set()
+            for record in records:
+                record_id = record['id']
+                seen_ids.add(record_id)
+                if self._records.get(record_id) != record:
+                    entries.append({'op': 'put', 'record': dict(record)})
+            for record_id in list(self._records):
+                if record_id not in seen_ids:
+                    entries.append({'op': 'del', 'id': record_id})
+            self._append(entries)
+
+    # --- Compaction ---
+    def compact(self):
+        """
+        Folds the journal into a fresh snapshot file and removes the journal. The exclusive lock
+        keeps other processes from appending between the final replay and the removal.
+        """
+        with self._lock, self._file_lock(exclusive=True):
+            self._refresh()
+            tmp_path = f"{self.snapshot_path}.{uuid.uuid4().hex}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(list(self._records.values()), f, indent=4)
+                os.replace(tmp_path, self.snapshot_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            # Rotate rather than truncate: readers holding the old journal open keep a consistent
+            # file, and the next append creates a new one with its own inode
+            retired_path = f"{self.journal_path}.{uuid.uuid4().hex}.old"
+            try:
+                os.replace(self.journal_path, retired_path)
+                os.remove(retired_path)
+            except FileNotFoundError:
+                pass
+            self._snapshot_signature = _signature(self.snapshot_path)
+            self._journal_inode = None
+            self._journal_offset = 0
+            self._journal_lines = 0
+
+    def compact_in_background(self):
+        """Starts a compaction on a daemon thread unless one is already running."""
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+
+        def _run():
+            try:
+                self.compact()
+            except OSError as e:
+                print(f"Warning: journal compaction of {self.snapshot_path} failed: {e}")
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=_run, name=f"journal-compact-{os.path.basename(self.snapshot_path)}", daemon=True).start()
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import uuid
+
+# --- Offset Index for Single-Record Reads ---
+# save_data writes the JSON array files with one record per line:
+#   [
+#   {"id": "...", ...},
+#   {"id": "...", ...}
+#   ]
+# which is still plain JSON, but lets a reader that wants a single record parse just its line.
+# Alongside the data file sits a sidecar (<file>.idx) mapping each record id to the byte offset
+# and length of its line. It is a sorted array of fixed-size entries, so a lookup is a binary
+# search through an mmap of the index followed by an mmap slice of the data file: only the
+# touched pages are read, and memory use does not grow with the number of records.
+# The sidecar is written by the same save that writes the data file, from the offsets it just
+# wrote, and records the data file's (mtime, size, inode) signature. When the data file changed
+# some other way (hand edits, a journal compaction), the sidecar is rebuilt by streaming the
+# file one line at a time; a file that is not in the one-record-per-line layout (e.g. an older
+# pretty-printed one) cannot be indexed, and readers fall back to loading it whole until the
+# next save rewrites it.
+#
+# Entry layout: 8-byte blake2b digest of the id, 8-byte offset, 4-byte length. Digests are only
+# used to find candidates; the parsed record's id is always compared with the requested one.
+
+_MAGIC = b'INVIDX01'
+_HEADER = struct.Struct('<8sqqqq') # magic, data file mtime_ns, size, inode, entry count
+_ENTRY = struct.Struct('<8sqI')
+
+
+class StaleIndexError(Exception):
+    """Raised when a file's offset index cannot be used (missing, outdated or not indexable)."""
+
+
+def index_path_for(data_path):
+    return f"{data_path}.idx"
+
+def _id_digest(record_id):
+    return hashlib.blake2b(str(record_id).encode('utf-8'), digest_size=8).digest()
+
+def _signature(stat_result):
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+
+# --- Writing ---
+def write_records(f, records):
+    """
+    Writes records to a binary file object as a one-record-per-line JSON array.
+    Returns the index entries (id digest, offset, length) of the written lines.
+    """
+    entries = []
+    offset = 0
+    f.write(b'[\n')
+    offset += 2
+    last = len(records) - 1
+    for position, record in enumerate(records):
+        line = json.dumps(record).encode('utf-8') # ASCII-only, as json.dumps escapes everything else
+        f.write(line + (b',\n' if position < last else b'\n'))
+        if isinstance(record, dict) and 'id' in record:
+            entries.append((_id_digest(record['id']), offset, len(line)))
+        offset += len(line) + (2 if position < last else 1)
+    f.write(b']\n')
+    return entries
+
+def write_index(data_path, signature, entries):
+    """Writes the sidecar index of a data file whose lines are described by entries."""
+    entries.sort()
+    index_path = index_path_for(data_path)
+    tmp_path = f"{index_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, *signature, len(entries)))
+            f.write(b''.join(_ENTRY.pack(*entry) for entry in entries))
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        print(f"Warning: could not write the offset index '{index_path}': {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def rebuild_index(data_path):
+    """
+    Indexes a data file by streaming it line by line. Returns True on success, False if the
+    file is not in the one-record-per-line layout.
+    """
+    with open(data_path, 'rb') as f:
+        signature = _signature(os.fstat(f.fileno()))
+        entries = []
+        offset = 0
+        for line in f:
+            content = line.rstrip(b'\r\n')
+            if content.endswith(b','):
+                content = content[:-1]
+            if content.startswith(b'{'):
+                try:
+                    record = json.loads(content)
+                except ValueError:
+                    return False
+                if isinstance(record, dict) and 'id' in record:
+                    entries.append((_id_digest(record['id']), offset, len(content)))
+            elif content.strip() not in (b'[', b']', b'[]', b''): # '[]': an empty table written compactly
+                return False
+            offset += len(line)
+    write_index(data_path, signature, entries)
+    return True
+
+
+# --- Reading ---
+def _find(index_map, count, digest):
+    """Returns the position of the first entry with the digest (binary search), or count."""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if index_map[_HEADER.size + middle * _ENTRY.size:_HEADER.size + middle * _ENTRY.size + 8] < digest:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def read_record(data_path, record_id):
+    """
+    Returns the record with the given id, parsed from its line alone, or None if there is none.
+    Raises StaleIndexError if the index does not match the current file (see rebuild_index).
+    """
+    try:
+        data_file = open(data_path, 'rb')
+    except FileNotFoundError:
+        return None
+    with data_file:
+        signature = _signature(os.fstat(data_file.fileno()))
+        try:
+            index_file = open(index_path_for(data_path), 'rb')
+        except FileNotFoundError:
+            raise StaleIndexError(data_path)
+        with index_file:
+            header = index_file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise StaleIndexError(data_path)
+            magic, mtime_ns, size, inode, count = _HEADER.unpack(header)
+            if magic != _MAGIC or (mtime_ns, size, inode) != signature:
+                raise StaleIndexError(data_path)
+            if count == 0:
+                return None
+            digest = _id_digest(record_id)
+            with mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as index_map, \
+                 mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as data_map:
+                position = _find(index_map, count, digest)
+                while position < count:
+                    entry_digest, offset, length = _ENTRY.unpack_from(index_map, _HEADER.size + position * _ENTRY.size)
+                    if entry_digest != digest:
+                        break
+                    record = json.loads(data_map[offset:offset + length])
+                    if record.get('id') == record_id:
+                        return record
+                    position += 1
+    return None
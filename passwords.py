@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+from perf import record, span, timed
+
+# --- Password Hashing ---
+# scrypt is deliberately slow (~0.1-0.2 s of CPU and 32 MB of memory per hash at the default
+# cost), so hashes are computed on a small shared thread pool instead of on whichever script
+# thread happens to handle a login: at most HASH_WORKERS hashes run at once however many
+# sessions log in together, and requests beyond HASH_QUEUE_LIMIT waiting ones are turned away
+# with HashingBusyError instead of piling up. A hash still unfinished after HASH_WAIT_SECONDS
+# is reported as HashingBusyError too; it keeps its slot until it actually completes, so
+# abandoned hashes still count against the limit. hashlib's scrypt releases the GIL, so the pool
+# uses several cores and the rest of the app stays responsive meanwhile.
+# The cost is chosen with INVENTORY_PASSWORD_HASH_PROFILE. A stored hash made with other
+# parameters (an older profile, or werkzeug's old pbkdf2 default) still verifies, and
+# needs_rehash() tells the login to store a fresh hash while it has the plain password.
+
+HASH_PROFILES = {
+    'fast': 'scrypt:16384:8:1',
+    'standard': 'scrypt:32768:8:1', # werkzeug's default
+    'strong': 'scrypt:65536:8:1',
+}
+HASH_PROFILE = os.environ.get('INVENTORY_PASSWORD_HASH_PROFILE', 'standard').strip().lower()
+HASH_WORKERS = int(os.environ.get('INVENTORY_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.environ.get('INVENTORY_HASH_QUEUE_LIMIT', 64))
+HASH_WAIT_SECONDS = 30
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_LIMIT)
+
+
+class HashingBusyError(RuntimeError):
+    """Raised when too many password hashes are already queued."""
+
+
+def hash_method():
+    """Returns the werkzeug method string of the configured cost profile."""
+    try:
+        return HASH_PROFILES[HASH_PROFILE]
+    except KeyError:
+        raise ValueError(f"Unknown INVENTORY_PASSWORD_HASH_PROFILE '{HASH_PROFILE}'. Expected one of: {', '.join(HASH_PROFILES)}.")
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+        return _executor
+
+def _run(function, *args):
+    """Runs function(*args) on the hashing pool and waits for the result."""
+    if not _slots.acquire(blocking=False):
+        record('auth.hash_rejected_busy', 0.0)
+        raise HashingBusyError("Too many logins are being processed. Please try again in a moment.")
+    try:
+        future = _get_executor().submit(_timed_call, function, args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda f: _slots.release()) # Only once the hash is really done
+    try:
+        return future.result(timeout=HASH_WAIT_SECONDS)
+    except FutureTimeoutError:
+        record('auth.hash_timed_out', float(HASH_WAIT_SECONDS))
+        raise HashingBusyError("Logins are taking longer than usual. Please try again in a moment.")
+
+def _timed_call(function, args):
+    with span(f'auth.{function.__name__}'): # Time on the worker, without the wait in the queue
+        return function(*args)
+
+@timed('auth.hash_password')
+def hash_password(password):
+    """Returns a salted hash of the password, made with the configured cost profile."""
+    return _run(generate_password_hash, password, hash_method())
+
+@timed('auth.verify_password')
+def verify_password(password_hash, password):
+    """True if the password matches a hash made by hash_password (with any parameters)."""
+    return _run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    """True if a stored hash was made with other parameters than the configured profile."""
+    return password_hash.split('$', 1)[0] != hash_method()
+
+
+# --- Failed Login Limiting ---
+# Every failed login is recorded per username and per client address. Once a key has
+# MAX_FAILED_ATTEMPTS (per username) or MAX_FAILED_ATTEMPTS_PER_CLIENT (per address) failures
+# within FAILED_ATTEMPT_WINDOW seconds, further attempts are refused before any hashing is done
+# until the oldest failure leaves the window, so guessing passwords cannot keep the hashing
+# pool busy. A successful login clears the username's failures.
+
+MAX_FAILED_ATTEMPTS = int(os.environ.get('INVENTORY_MAX_FAILED_LOGINS', 5))
+MAX_FAILED_ATTEMPTS_PER_CLIENT = int(os.environ.get('INVENTORY_MAX_FAILED_LOGINS_PER_CLIENT', 20))
+FAILED_ATTEMPT_WINDOW = 300
+
+_failures = {} # key -> deque of failure timestamps within the window
+_failures_lock = threading.Lock()
+_last_prune = 0.0
+
+
+def _keys(username, client):
+    keys = [(f"user:{username.strip().lower()}", MAX_FAILED_ATTEMPTS)]
+    if client:
+        keys.append((f"client:{client}", MAX_FAILED_ATTEMPTS_PER_CLIENT))
+    return keys
+
+def _prune(now):
+    """Drops failures that left the window (at most once a minute, so the table stays small)."""
+    global _last_prune
+    if now - _last_prune < 60:
+        return
+    _last_prune = now
+    for key in list(_failures):
+        attempts = _failures[key]
+        while attempts and now - attempts[0] >= FAILED_ATTEMPT_WINDOW:
+            attempts.popleft()
+        if not attempts:
+            del _failures[key]
+
+def login_retry_after(username, client=None):
+    """Returns the seconds until a login for username (from client) may be tried again, or 0."""
+    now = time.monotonic()
+    with _failures_lock:
+        _prune(now)
+        wait = 0
+        for key, limit in _keys(username, client):
+            attempts = _failures.get(key)
+            if attempts and len(attempts) >= limit:
+                wait = max(wait, FAILED_ATTEMPT_WINDOW - (now - attempts[-limit]))
+        return max(0, wait)
+
+def record_failed_login(username, client=None):
+    now = time.monotonic()
+    with _failures_lock:
+        for key, limit in _keys(username, client):
+            attempts = _failures.setdefault(key, deque(maxlen=max(MAX_FAILED_ATTEMPTS, MAX_FAILED_ATTEMPTS_PER_CLIENT)))
+            attempts.append(now)
+
+def clear_failed_logins(username):
+    with _failures_lock:
+        _failures.pop(_keys(username, None)[0][0], None)
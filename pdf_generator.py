@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from file_manifest import image_content_hash, pdf_files
+from utils import get_pdf_dir, get_image_dir
+
+# --- Item PDF Rendering ---
+# Kept free of Streamlit imports so PDF jobs can run in worker processes (see pdf_jobs.py).
+# ReportLab is only imported by generate_item_pdf: the pages use the filename and fingerprint
+# helpers on every render, but only the workers (or a download of a stale PDF) draw anything.
+
+# Bump when the layout below changes, so every stored fingerprint becomes stale.
+PDF_LAYOUT_VERSION = 1
+
+def pdf_filename_for(item_data):
+    """Returns the PDF filename used for an item: its name plus part of its ID, for uniqueness."""
+    return f"{item_data['name'].replace(' ', '_').replace('/', '-')}_{item_data['id'][:8]}.pdf"
+
+def pdf_fingerprint(item_data):
+    """
+    Returns a fingerprint of everything an item's PDF shows: the rendered fields plus the content
+    hash of its image. Two items with the same fingerprint produce the same PDF.
+    """
+    image_filename = item_data.get('image_filename')
+    image = None
+    if image_filename:
+        # A missing image is rendered as a note naming the file, so the name is what counts then.
+        image = image_content_hash(image_filename) or f"missing:{image_filename}"
+    rendered = [PDF_LAYOUT_VERSION, item_data['name'], item_data['id'], item_data.get('category', 'N/A'),
+                item_data['quantity'], f"{item_data['price']:.2f}", image]
+    return hashlib.sha256(json.dumps(rendered).encode('utf-8')).hexdigest()
+
+def pdf_is_current(item_data):
+    """True if the item's stored PDF exists and was rendered from the item's current fields and image."""
+    pdf_filename = item_data.get('pdf_filename')
+    if not pdf_filename or pdf_filename != pdf_filename_for(item_data):
+        return False
+    if item_data.get('pdf_fingerprint') != pdf_fingerprint(item_data):
+        return False
+    return pdf_files().exists(pdf_filename)
+
+def generate_item_pdf(item_data, item_image_filename=None):
+    """
+    Generates a PDF for a given item, optionally including an image,
+    and saves it to the static/pdfs directory.
+    Returns the filename of the generated PDF.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+
+    pdf_dir = get_pdf_dir()
+    if not os.path.exists(pdf_dir):
+        os.makedirs(pdf_dir)
+
+    pdf_filename = pdf_filename_for(item_data)
+    pdf_path = os.path.join(pdf_dir, pdf_filename)
+
+    doc = SimpleDocTemplate(pdf_path, pagesize=letter)
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Title
+    story.append(Paragraph(f"Inventory Item: {item_data['name']}", styles['h1']))
+    story.append(Spacer(1, 0.2 * inch))
+
+    # Image (if provided and exists)
+    if item_image_filename:
+        images_dir = get_image_dir()
+        image_full_path = os.path.join(images_dir, item_image_filename)
+        if os.path.exists(image_full_path):
+            try:
+                img = Image(image_full_path)
+                max_width = 4 * inch
+                aspect_ratio = img.drawHeight / img.drawWidth
+                if img.drawWidth > max_width:
+                    img.drawWidth = max_width
+                    img.drawHeight = max_width * aspect_ratio
+                
+                story.append(img)
+                story.append(Spacer(1, 0.1 * inch))
+            except Exception as e:
+                print(f"Warning: Could not embed image '{item_image_filename}' into PDF: {e}")
+                story.append(Paragraph(f"<i>(Image could not be embedded: {item_image_filename})</i>", styles['Normal']))
+                story.append(Spacer(1, 0.1 * inch))
+        else:
+            story.append(Paragraph(f"<i>(Image file not found: {item_image_filename})</i>", styles['Normal']))
+            story.append(Spacer(1, 0.1 * inch))
+    else:
+        story.append(Paragraph("<i>(No image provided for this item)</i>", styles['Normal']))
+        story.append(Spacer(1, 0.1 * inch))
+
+    # Details
+    story.append(Paragraph(f"<b>Item ID:</b> {item_data['id']}", styles['Normal']))
+    story.append(Paragraph(f"<b>Category:</b> {item_data.get('category', 'N/A')}", styles['Normal'])) # NEW: Category in PDF
+    story.append(Paragraph(f"<b>Quantity:</b> {item_data['quantity']}", styles['Normal']))
+    story.append(Paragraph(f"<b>Price:</b> ${item_data['price']:.2f}", styles['Normal']))
+    story.append(Spacer(1, 0.4 * inch))
+
+    story.append(Paragraph("This document provides details for the inventory item, including an embedded image if available.", styles['Normal']))
+
+    doc.build(story)
+    return pdf_filename
@@ -0,0 +1,315 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from db_operations import WRITE_ATTEMPTS, get_items, update_item, apply_item_batch, load_inventory_view, RecordNotFoundError, VersionConflictError
+from file_manifest import pdf_files
+from inventory_aggregates import get_inventory_aggregates
+from perf import record, span
+from pdf_generator import generate_item_pdf, pdf_filename_for, pdf_fingerprint, pdf_is_current
+from utils import CATALOG_RETENTION_SECONDS, get_catalog_dir, get_pdf_dir
+
+# --- Background PDF Generation ---
+# Item PDFs are rendered in a pool of worker processes so saving an item never waits on
+# ReportLab. The job state lives on the item record itself, so every session sees it:
+#   'pdf_status'  -- 'pending', 'ready' or 'failed'
+#   'pdf_job_id'  -- the job whose result the item is waiting for; results of older jobs
+#                    (e.g. superseded by a second edit) are ignored
+#   'pdf_error'   -- the error message of a failed job
+#   'pdf_fingerprint' -- fingerprint of the fields and image the stored PDF was rendered from
+#                        (see pdf_generator.pdf_fingerprint); unchanged items are not re-rendered
+# The pool uses the 'spawn' start method so workers do not inherit the server's threads.
+# Finished jobs are stored in batches (one write per RESULT_FLUSH_SECONDS), so thousands of
+# queued renders, e.g. after a bulk import, do not turn into thousands of separate saves.
+# These bookkeeping writes do not bump the item's 'version' (see db_operations), so an edit
+# form opened while a job runs does not report a conflict; a result is stored only if the
+# item still waits for that job ('expected_fields' on pdf_job_id).
+# Catalog PDFs (catalog_pdf.py) run in the same pool. They are not stored on any record: the
+# job is tracked in this process only and its file is written to static/catalogs. A session
+# that goes away never discards its catalog, so finished jobs are forgotten (and their files
+# deleted) once they are CATALOG_RETENTION_SECONDS old or their file is gone.
+
+PDF_WORKERS = int(os.environ.get('INVENTORY_PDF_WORKERS', min(4, os.cpu_count() or 1)))
+RESULT_FLUSH_SECONDS = 0.5
+
+_executor = None
+_executor_lock = threading.Lock()
+_running = {} # item id -> job id of the job currently in the pool (until its result is stored)
+_results = [] # finished jobs waiting to be stored: (item id, job id, fingerprint, old PDF filename, future)
+_results_lock = threading.Lock()
+_flush_timer = None
+_catalogs = {} # catalog job id -> (future, catalog filename, submission time)
+
+
+def _get_executor():
+    """Returns the process pool, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+def _discard_executor(executor):
+    """Drops a pool whose worker died, so the next job starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+
+def is_running(item_id):
+    """True while a PDF job for the item is queued or rendering in this process."""
+    return item_id in _running
+
+def pdf_status(item):
+    """
+    Returns 'pending', 'ready', 'failed' or None (no PDF) for an item record.
+    A 'pending' item with no job in this process (e.g. after a restart) is reported as 'failed'.
+    """
+    status = item.get('pdf_status')
+    if status == 'pending' and not is_running(item['id']):
+        return 'failed'
+    if status is None:
+        return 'ready' if item.get('pdf_filename') else None
+    return status
+
+def needs_pdf(item):
+    """True unless the item has a finished PDF rendered from its current fields and image."""
+    return pdf_status(item) != 'ready' or not pdf_is_current(item)
+
+def pending_changes():
+    """Returns the fields to store with an item whose PDF is about to be (re)generated."""
+    return {'pdf_status': 'pending', 'pdf_job_id': uuid.uuid4().hex, 'pdf_error': None}
+
+def enqueue_pdf(item):
+    """
+    Submits a render job for an item that was saved with pending_changes() and returns the job id.
+    The item record is updated with the result when the job finishes.
+    """
+    item_id = item['id']
+    job_id = item['pdf_job_id']
+    old_pdf_filename = item.get('pdf_filename')
+    snapshot = {key: value for key, value in item.items() if not key.startswith('pdf_')}
+    fingerprint = pdf_fingerprint(snapshot)
+    _running[item_id] = job_id
+    # generate_item_pdf lives in a Streamlit-free module, which keeps worker start-up light
+    executor = _get_executor()
+    submitted = time.perf_counter()
+    future = executor.submit(generate_item_pdf, snapshot, snapshot.get('image_filename'))
+    future.add_done_callback(lambda f: _finish(item_id, job_id, fingerprint, old_pdf_filename, f, executor, submitted))
+    return job_id
+
+def retry_pdf(item_id):
+    """Marks an item's PDF as pending again and resubmits it. Returns False if the item is gone."""
+    try:
+        item = update_item(item_id, pending_changes(), bump_version=False)
+    except RecordNotFoundError:
+        return False
+    enqueue_pdf(item)
+    return True
+
+def rebuild_stale_pdfs(skip_pending=False):
+    """
+    Queues a render for every item whose PDF is missing, failed or no longer matches the item.
+    Items whose fingerprint still matches are left alone, and so are items deleted meanwhile.
+    skip_pending also leaves 'pending' items alone: a separate process (the command line) cannot
+    see the server's running jobs, and would otherwise render each of them a second time.
+    Returns the number of jobs queued.
+    """
+    stale_ids = [item['id'] for item in load_inventory_view()
+                 if not is_running(item['id']) and needs_pdf(item) and not (skip_pending and item.get('pdf_status') == 'pending')]
+    updated = []
+    while stale_ids:
+        try:
+            updated = apply_item_batch([{'op': 'update', 'id': item_id, 'changes': pending_changes(), 'bump_version': False} for item_id in stale_ids])
+        except RecordNotFoundError as e:
+            stale_ids.remove(e.args[0]) # Deleted since the inventory was read; queue the others
+            continue
+        break
+    for item in updated:
+        enqueue_pdf(item)
+    return len(updated)
+
+def wait_for_jobs():
+    """Blocks until every queued job has finished and its result is stored (for command-line use)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+    flush_results()
+
+def start_catalog(item_ids, layout='table', title="Inventory Catalog"):
+    """
+    Submits a catalog PDF of the given items (in any order; the catalog groups and sorts them)
+    and returns the job id to pass to catalog_status().
+    """
+    from catalog_pdf import generate_catalog_pdf # Loads ReportLab; only needed once a catalog is asked for
+    _expire_catalogs()
+    job_id = uuid.uuid4().hex
+    catalog_filename = f"catalog_{job_id}.pdf"
+    executor = _get_executor()
+    submitted = time.perf_counter()
+    # The worker reads the items itself, in chunks (see catalog_pdf.py)
+    future = executor.submit(generate_catalog_pdf, list(item_ids), catalog_filename, layout, title)
+    future.add_done_callback(lambda f: _finish_catalog(f, executor, submitted))
+    _catalogs[job_id] = (future, catalog_filename, time.time())
+    return job_id
+
+def _expire_catalogs():
+    """Forgets finished catalog jobs whose file is gone or older than CATALOG_RETENTION_SECONDS, deleting the file."""
+    now = time.time()
+    for job_id, (future, catalog_filename, created) in list(_catalogs.items()):
+        if not future.done():
+            continue
+        expired = now - created > CATALOG_RETENTION_SECONDS
+        written = not future.cancelled() and future.exception() is None
+        if expired or (written and not os.path.exists(os.path.join(get_catalog_dir(), catalog_filename))):
+            if _catalogs.pop(job_id, None) is not None and expired:
+                _remove_file(get_catalog_dir(), catalog_filename)
+
+def catalog_status(job_id):
+    """
+    Returns ('pending', None), ('ready', path of the PDF) or ('failed', error message) for a
+    catalog job, or None if this process does not know the job (e.g. after a restart).
+    """
+    entry = _catalogs.get(job_id)
+    if entry is None:
+        return None
+    future, catalog_filename, _ = entry
+    if not future.done():
+        return 'pending', None
+    if future.cancelled():
+        return 'failed', "the job was cancelled"
+    error = future.exception()
+    if error is not None:
+        return 'failed', str(error) or type(error).__name__
+    catalog_path = os.path.join(get_catalog_dir(), catalog_filename)
+    if not os.path.exists(catalog_path):
+        return 'failed', "the catalog file no longer exists"
+    return 'ready', catalog_path
+
+def discard_catalog(job_id):
+    """Cancels a catalog job that has not started yet, or deletes its file once it is written."""
+    entry = _catalogs.pop(job_id, None)
+    if entry is None:
+        return
+    future, catalog_filename, _ = entry
+    if not future.cancel():
+        future.add_done_callback(lambda f: _remove_file(get_catalog_dir(), catalog_filename))
+
+def _finish_catalog(future, executor, submitted):
+    if future.cancelled():
+        return
+    record('pdf.catalog_job', time.perf_counter() - submitted) # Includes the time spent queued
+    error = future.exception()
+    if isinstance(error, BrokenProcessPool):
+        _discard_executor(executor)
+    if error is not None:
+        print(f"Warning: catalog generation failed: {error}")
+
+def _finish(item_id, job_id, fingerprint, old_pdf_filename, future, executor, submitted):
+    """Queues a finished job's outcome; flush_results() stores it shortly after."""
+    global _flush_timer
+    record('pdf.job', time.perf_counter() - submitted) # Includes the time spent queued
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        _discard_executor(executor)
+    with _results_lock:
+        _results.append((item_id, job_id, fingerprint, old_pdf_filename, future))
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(RESULT_FLUSH_SECONDS, flush_results)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+def flush_results():
+    """
+    Stores the outcomes of finished jobs on their items with a single write. Results of jobs that
+    were superseded by a newer one (or whose item was deleted) are dropped with their files.
+    """
+    global _results, _flush_timer
+    with _results_lock:
+        finished, _results = _results, []
+        _flush_timer = None
+    if not finished:
+        return
+    with span('pdf.flush_results'):
+        _store_results(finished)
+
+def _store_results(finished):
+    for _ in range(WRITE_ATTEMPTS):
+        current = {item['id']: item for item in get_items([result[0] for result in finished])}
+        operations, written, superseded, replaced = [], [], [], []
+        for item_id, job_id, fingerprint, old_pdf_filename, future in finished:
+            item = current.get(item_id)
+            if item is None or item.get('pdf_job_id') != job_id:
+                superseded.append((item, future))
+                continue
+            try:
+                pdf_filename = future.result()
+            except Exception as e:
+                print(f"Warning: PDF generation for item {item_id} failed: {e}")
+                changes = {'pdf_status': 'failed', 'pdf_error': str(e) or type(e).__name__}
+            else:
+                changes = {'pdf_status': 'ready', 'pdf_filename': pdf_filename, 'pdf_fingerprint': fingerprint, 'pdf_error': None}
+                pdf_files().added(pdf_filename) # Written by a worker process
+                if old_pdf_filename and old_pdf_filename != pdf_filename:
+                    replaced.append(old_pdf_filename)
+            operations.append({'op': 'update', 'id': item_id, 'changes': changes, 'expected_fields': {'pdf_job_id': job_id}, 'bump_version': False})
+            written.append((item, future))
+        try:
+            if operations:
+                apply_item_batch(operations)
+        except (RecordNotFoundError, VersionConflictError):
+            continue # An item got a newer job or was deleted since it was read; check the batch again
+        break
+    else:
+        # The items kept changing under the batch. Drop its results: with no job running, the
+        # items report their PDF as failed, and the PDFs written for them are removed.
+        print(f"Warning: Could not store {len(operations)} PDF results after {WRITE_ATTEMPTS} attempts; the items can be retried.")
+        superseded.extend(written)
+        replaced = []
+    for item_id, job_id, _, _, _ in finished:
+        if _running.get(item_id) == job_id:
+            del _running[item_id]
+    for item, future in superseded:
+        _discard_stale_output(item, future)
+    for pdf_filename in replaced:
+        _remove_pdf(pdf_filename)
+
+def _discard_stale_output(item, future):
+    """Removes the PDF of a superseded job unless the item (or its newer job) uses that file."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    pdf_filename = future.result()
+    if item is not None and pdf_filename in (item.get('pdf_filename'), pdf_filename_for(item)):
+        return
+    _remove_pdf(pdf_filename)
+
+def _remove_pdf(pdf_filename):
+    _remove_file(get_pdf_dir(), pdf_filename)
+    pdf_files().removed(pdf_filename)
+
+def _remove_file(directory, filename):
+    file_path = os.path.join(directory, filename)
+    if os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            print(f"Warning: could not delete '{filename}': {e}")
+
+
+if __name__ == '__main__':
+    # Usage: python pdf_jobs.py rebuild-stale
+    if len(sys.argv) < 2 or sys.argv[1] != 'rebuild-stale':
+        print("Usage: python pdf_jobs.py rebuild-stale")
+        sys.exit(2)
+    get_inventory_aggregates() # Keeps the saved dashboard totals current through the updates
+    # Jobs the server has queued are invisible from here; leave their items to the server
+    queued = rebuild_stale_pdfs(skip_pending=True)
+    if queued:
+        print(f"Regenerating {queued} item PDFs...")
+        wait_for_jobs()
+    print(f"Done. {queued} PDFs regenerated.")
@@ -0,0 +1,128 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# --- Performance Instrumentation ---
+# A minimal span timer for the hot paths (storage reads and writes, searches, page rendering,
+# PDF jobs, password hashing). Each span adds its duration, and optionally a byte count, to
+# in-process statistics per span name; the admin Performance page shows them as counts,
+# totals and p50/p95/max. Recording a span costs two perf_counter() calls and a short locked
+# update (about a microsecond), so it stays on in production; INVENTORY_PERF=0 turns it off.
+# Percentiles are computed from the last SAMPLE_SIZE durations of each name, and the last
+# RAW_SPAN_LIMIT spans are kept as raw records for a JSONL export.
+#
+#     with span('db.json_load') as s:
+#         data = f.read()
+#         s.add_bytes(len(data))
+
+PERF_ENABLED = os.environ.get('INVENTORY_PERF', '1').strip() != '0'
+SAMPLE_SIZE = 1024 # Recent durations kept per span name for the percentiles
+RAW_SPAN_LIMIT = 10000 # Recent spans kept for the JSONL export
+
+_lock = threading.Lock()
+_stats = {} # span name -> _Stats
+_raw_spans = deque(maxlen=RAW_SPAN_LIMIT) # (wall clock time, name, seconds, bytes, thread name)
+_started = time.time()
+
+
+class _Stats:
+    __slots__ = ('count', 'total', 'max', 'bytes', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+
+def record(name, seconds, nbytes=0):
+    """Adds one measurement of the named span (e.g. the duration of a finished background job)."""
+    if not PERF_ENABLED:
+        return
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = _Stats()
+        stats.count += 1
+        stats.total += seconds
+        stats.bytes += nbytes
+        if seconds > stats.max:
+            stats.max = seconds
+        stats.samples.append(seconds)
+        _raw_spans.append((time.time(), name, seconds, nbytes, threading.current_thread().name))
+
+
+class span:
+    """Context manager timing a block under a name; add_bytes() attributes I/O to it."""
+    __slots__ = ('name', 'nbytes', '_start')
+
+    def __init__(self, name, nbytes=0):
+        self.name = name
+        self.nbytes = nbytes
+
+    def add_bytes(self, nbytes):
+        self.nbytes += nbytes
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self._start, self.nbytes)
+        return False
+
+
+def timed(name):
+    """Decorator timing every call of a function as a span."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _percentile(sorted_samples, fraction):
+    return sorted_samples[min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))]
+
+def snapshot():
+    """
+    Returns one dict per span name with count, total/p50/p95/max in milliseconds and bytes,
+    sorted by total time, most expensive first.
+    """
+    with _lock:
+        entries = [(name, stats.count, stats.total, stats.max, stats.bytes, sorted(stats.samples)) for name, stats in _stats.items()]
+    rows = []
+    for name, count, total, maximum, nbytes, samples in entries:
+        rows.append({
+            'span': name, 'count': count, 'total_ms': total * 1000,
+            'p50_ms': _percentile(samples, 0.5) * 1000, 'p95_ms': _percentile(samples, 0.95) * 1000,
+            'max_ms': maximum * 1000, 'bytes': nbytes,
+        })
+    rows.sort(key=lambda row: row['total_ms'], reverse=True)
+    return rows
+
+def collecting_since():
+    """Returns the wall clock time the statistics were last reset (or the process started)."""
+    return _started
+
+def reset():
+    """Clears all statistics and raw spans."""
+    global _started
+    with _lock:
+        _stats.clear()
+        _raw_spans.clear()
+        _started = time.time()
+
+def export_spans(out):
+    """Writes the recent raw spans to a text file object as JSONL. Returns the number written."""
+    with _lock:
+        spans = list(_raw_spans)
+    for timestamp, name, seconds, nbytes, thread_name in spans:
+        out.write(json.dumps({'time': timestamp, 'span': name, 'ms': seconds * 1000, 'bytes': nbytes, 'thread': thread_name}) + '\n')
+    return len(spans)
@@ -0,0 +1,347 @@
+import bisect
+import heapq
+import threading
+from collections import Counter
+from db_operations import DerivedIndex
+
+# --- Inventory Search Index ---
+# An inverted index over item names so the inventory search does not have to lower-case and
+# scan every item name on every keystroke. Names are split into trigrams (three-character
+# windows of the lower-cased name, padded with spaces at the edges); a substring query is
+# answered by intersecting the posting sets of the query's trigrams and confirming the few
+# candidates left. Category postings replace the second filtering pass, a sorted id list
+# answers id-prefix lookups, and trigram overlap gives optional typo-tolerant matching.
+# Sorting and range filters use a sorted value list per field (name, price, quantity) with a
+# parallel id list (ties broken by id), kept in order with bisect on every write: a range is a
+# slice found by two bisections, and a sorted result is read off the field's ids (or the range
+# slice of them) filtered by the other constraints, instead of being sorted on every rerun.
+# Like the dashboard columns, the index is shared by every session and kept current by
+# record-level writes.
+
+FUZZY_THRESHOLD = 0.4 # Minimum share of the query's trigrams a typo-tolerant match must contain
+MIN_ID_PREFIX = 4 # Shorter queries are not treated as id prefixes
+SORT_FIELDS = ('name', 'price', 'quantity')
+SORT_DIRECTLY_RATIO = 16 # Result sets this many times smaller than the range they lie in are sorted instead
+
+
+def _sort_keys(item):
+    """Returns the field -> sort value mapping of an item."""
+    return {
+        'name': (item.get('name') or '').lower(),
+        'price': float(item.get('price') or 0.0),
+        'quantity': int(item.get('quantity') or 0),
+    }
+
+
+def _trigrams(text):
+    """Returns the set of trigrams of an already lower-cased string, padded at the edges."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _query_trigrams(query):
+    """Returns the unpadded trigrams of a query; each must occur in any name containing it."""
+    return {query[i:i + 3] for i in range(len(query) - 2)}
+
+
+class SearchIndex(DerivedIndex):
+    """Trigram, category and id-prefix index over the inventory, with ranked lookups."""
+
+    def __init__(self):
+        super().__init__()
+        self._clear()
+
+    def _clear(self):
+        self._names = {} # id -> lower-cased name
+        self._categories = {} # id -> category
+        self._order = {} # id -> storage position, for unranked (empty query) results
+        self._next_order = 0
+        self._trigram_postings = {} # trigram -> set of ids
+        self._category_postings = {} # category -> set of ids
+        self._sorted_ids = [] # for id-prefix lookups
+        self._ordered_ids = None # cached storage-ordered list of ids
+        self._ordered_by_category = {} # category -> cached storage-ordered list of ids
+        self._values = {field: {} for field in SORT_FIELDS} # field -> id -> sort value
+        self._sorted_values = {field: [] for field in SORT_FIELDS} # field -> sorted list of values
+        self._sorted_value_ids = {field: [] for field in SORT_FIELDS} # field -> ids in the order of _sorted_values
+
+    # --- Maintenance ---
+    def _add(self, item):
+        item_id = item['id']
+        name = (item.get('name') or '').lower()
+        category = item.get('category')
+        self._names[item_id] = name
+        self._categories[item_id] = category
+        if item_id not in self._order:
+            self._order[item_id] = self._next_order
+            self._next_order += 1
+            bisect.insort(self._sorted_ids, item_id)
+        for trigram in _trigrams(name):
+            self._trigram_postings.setdefault(trigram, set()).add(item_id)
+        self._category_postings.setdefault(category, set()).add(item_id)
+        for field, value in _sort_keys(item).items():
+            self._values[field][item_id] = value
+            values, ids = self._sorted_values[field], self._sorted_value_ids[field]
+            position = bisect.bisect_left(ids, item_id, bisect.bisect_left(values, value), bisect.bisect_right(values, value))
+            values.insert(position, value)
+            ids.insert(position, item_id)
+        self._ordered_ids = None
+        self._ordered_by_category.clear()
+
+    def _remove(self, item_id, keep_position=False):
+        name = self._names.pop(item_id, None)
+        if name is None:
+            return
+        for trigram in _trigrams(name):
+            postings = self._trigram_postings.get(trigram)
+            if postings is not None:
+                postings.discard(item_id)
+                if not postings:
+                    del self._trigram_postings[trigram]
+        category = self._categories.pop(item_id)
+        postings = self._category_postings.get(category)
+        if postings is not None:
+            postings.discard(item_id)
+            if not postings:
+                del self._category_postings[category]
+        for field in SORT_FIELDS:
+            value = self._values[field].pop(item_id)
+            values, ids = self._sorted_values[field], self._sorted_value_ids[field]
+            position = bisect.bisect_left(ids, item_id, bisect.bisect_left(values, value), bisect.bisect_right(values, value))
+            if position < len(ids) and ids[position] == item_id:
+                del values[position]
+                del ids[position]
+        if not keep_position:
+            del self._order[item_id]
+            position = bisect.bisect_left(self._sorted_ids, item_id)
+            if position < len(self._sorted_ids) and self._sorted_ids[position] == item_id:
+                del self._sorted_ids[position]
+        self._ordered_ids = None
+        self._ordered_by_category.clear()
+
+    def rebuild(self, records):
+        self._clear()
+        for item in records:
+            item_id = item['id']
+            self._order[item_id] = self._next_order
+            self._next_order += 1
+            name = (item.get('name') or '').lower()
+            category = item.get('category')
+            self._names[item_id] = name
+            self._categories[item_id] = category
+            for trigram in _trigrams(name):
+                self._trigram_postings.setdefault(trigram, set()).add(item_id)
+            self._category_postings.setdefault(category, set()).add(item_id)
+            for field, value in _sort_keys(item).items():
+                self._values[field][item_id] = value
+        self._sorted_ids = sorted(self._names)
+        for field in SORT_FIELDS:
+            entries = sorted((value, item_id) for item_id, value in self._values[field].items())
+            self._sorted_values[field] = [value for value, _ in entries]
+            self._sorted_value_ids[field] = [item_id for _, item_id in entries]
+
+    def apply_change(self, before, after):
+        if after is None:
+            self._remove(before['id'])
+        else:
+            self._remove(after['id'], keep_position=True) # Edits keep the item's place in the list
+            self._add(after)
+
+    # --- Queries ---
+    def _storage_ordered_ids(self, category=None):
+        """Returns all ids (or those of one category) in storage order, cached until the next change."""
+        if self._ordered_ids is None:
+            self._ordered_ids = sorted(self._names, key=self._order.__getitem__)
+        if category is None:
+            return self._ordered_ids
+        ordered = self._ordered_by_category.get(category)
+        if ordered is None:
+            members = self._category_postings.get(category, set())
+            ordered = [item_id for item_id in self._ordered_ids if item_id in members]
+            self._ordered_by_category[category] = ordered
+        return ordered
+
+    def _substring_matches(self, query, candidates):
+        """Returns ids whose name contains query, restricted to candidates (None = all items)."""
+        names = self._names
+        trigrams = _query_trigrams(query)
+        if not trigrams:
+            # One or two characters: the trigram index cannot narrow these down, so scan.
+            pool = candidates if candidates is not None else names.keys()
+            return {item_id for item_id in pool if query in names[item_id]}
+        postings = []
+        for trigram in trigrams:
+            posting = self._trigram_postings.get(trigram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        if candidates is not None:
+            postings.append(candidates)
+        postings.sort(key=len)
+        matches = postings[0].intersection(*postings[1:])
+        if len(trigrams) == 1:
+            return matches # A three-character query is its own only trigram; nothing to confirm
+        return {item_id for item_id in matches if query in names[item_id]}
+
+    def _id_prefix_matches(self, query, candidates):
+        start = bisect.bisect_left(self._sorted_ids, query)
+        end = bisect.bisect_left(self._sorted_ids, query + '\uffff')
+        return [item_id for item_id in self._sorted_ids[start:end] if candidates is None or item_id in candidates]
+
+    def _fuzzy_matches(self, query, candidates, exclude):
+        """Returns (similarity, id) pairs for names containing enough of the query's trigrams."""
+        query_trigrams = _trigrams(query)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigram_postings.get(trigram, ()))
+        scored = []
+        for item_id, common in shared.items():
+            if item_id in exclude or (candidates is not None and item_id not in candidates):
+                continue
+            similarity = common / len(query_trigrams) # Share of the query's trigrams found in the name
+            if similarity >= FUZZY_THRESHOLD:
+                scored.append((similarity, item_id))
+        return scored
+
+    def _ranked(self, query, matches, limit):
+        """
+        Orders substring matches: exact name, then name prefix, then word prefix, then the rest,
+        alphabetically within each tier. Tiers are split with plain string tests and sorted with
+        a C-level key, and tiers past the limit are never sorted.
+        """
+        names = self._names
+        postings = self._trigram_postings
+        # Padded trigrams mark the start of the name ("  l") and the start of any word (" la"),
+        # so set intersections narrow each tier down before any per-item string test.
+        starts = postings.get(f"  {query[0]}", set())
+        word_starts = postings.get(f" {query[:2]}", set()) if len(query) > 1 else starts
+        prefix_candidates = matches.intersection(starts, word_starts) if len(query) > 1 else matches.intersection(starts)
+        exact, prefix = [], []
+        for item_id in prefix_candidates:
+            name = names[item_id]
+            if name.startswith(query):
+                (exact if name == query else prefix).append(item_id)
+        in_prefix_tiers = set(exact).union(prefix)
+        word_prefix = f" {query}"
+        word = [item_id for item_id in matches.intersection(word_starts) - in_prefix_tiers if word_prefix in names[item_id]]
+        rest = matches - in_prefix_tiers - set(word)
+        results = []
+        for tier in (exact, prefix, word, rest):
+            if limit is not None:
+                remaining = limit - len(results)
+                if remaining <= 0:
+                    break
+                results.extend(heapq.nsmallest(remaining, tier, key=names.__getitem__))
+            else:
+                results.extend(sorted(tier, key=names.__getitem__))
+        return results
+
+    def _range_bounds(self, field, low, high):
+        """Returns the (start, end) positions of the values low <= value <= high (None = open end) in a field's sorted list."""
+        values = self._sorted_values[field]
+        start = bisect.bisect_left(values, low) if low is not None else 0
+        end = bisect.bisect_right(values, high) if high is not None else len(values)
+        return start, max(start, end)
+
+    def _in_field_order(self, field, item_ids, bounds=None):
+        """
+        Returns the ids of a set that lie within bounds (all of the field's sorted list by
+        default), in ascending field order. Small sets are sorted directly; larger ones are
+        read off the field's sorted ids, which needs no sort.
+        """
+        start, end = bounds or (0, len(self._sorted_values[field]))
+        if start == end:
+            return []
+        if len(item_ids) * SORT_DIRECTLY_RATIO < end - start:
+            values = self._values[field]
+            low, high = self._sorted_values[field][start], self._sorted_values[field][end - 1]
+            return sorted((item_id for item_id in item_ids if low <= values[item_id] <= high), key=lambda item_id: (values[item_id], item_id))
+        return list(filter(item_ids.__contains__, self._sorted_value_ids[field][start:end]))
+
+    def sort_by_name(self, item_ids, reverse=False):
+        """Returns the given ids ordered by item name."""
+        self.ensure_current()
+        with self._lock:
+            ordered = self._in_field_order('name', {item_id for item_id in item_ids if item_id in self._names})
+        return ordered[::-1] if reverse else ordered
+
+    def query(self, query='', category=None, fuzzy=False, ranges=None, sort=None, descending=False):
+        """
+        Returns the ids of the items matching a search (see search()) and range filters, ordered
+        by a field. ranges maps 'price' or 'quantity' to an inclusive (low, high) pair, either
+        end None for open. sort is one of SORT_FIELDS, or None for the search's own order (best
+        match first, or storage order without a query).
+        """
+        self.ensure_current()
+        query = (query or '').strip()
+        with self._lock:
+            bounds = {field: self._range_bounds(field, low, high) for field, (low, high) in (ranges or {}).items()
+                      if low is not None or high is not None}
+            if sort is None and not bounds:
+                return self.search(query, category, fuzzy=fuzzy)
+
+            # Every constraint becomes a set, except a range on the sort field, which is walked instead
+            constraints = [set(self._sorted_value_ids[field][start:end]) for field, (start, end) in bounds.items() if field != sort]
+            matches = None
+            if query:
+                matches = self.search(query, category, fuzzy=fuzzy)
+                constraints.append(set(matches))
+            elif category is not None:
+                constraints.append(self._category_postings.get(category, set()))
+            constraints.sort(key=len) # Intersect smallest first
+            allowed = constraints[0].intersection(*constraints[1:]) if constraints else None
+
+            if sort is None:
+                candidates = matches if matches is not None else self._storage_ordered_ids(category)
+                return [item_id for item_id in candidates if item_id in allowed]
+            sort_bounds = bounds.get(sort)
+            if allowed is None:
+                start, end = sort_bounds or (0, len(self._sorted_values[sort]))
+                ordered = self._sorted_value_ids[sort][start:end]
+            else:
+                ordered = self._in_field_order(sort, allowed, sort_bounds)
+        return ordered[::-1] if descending else ordered
+
+    def search(self, query='', category=None, fuzzy=False, limit=None):
+        """
+        Returns the ids of matching items, best match first.
+        With an empty query all items (optionally of one category) are returned in storage order.
+        Otherwise names containing the query are ranked first, then ids starting with it and,
+        when fuzzy is True, names that are close to it (typo tolerance).
+        """
+        self.ensure_current()
+        query = (query or '').strip().lower()
+        with self._lock:
+            candidates = None
+            if category is not None:
+                candidates = self._category_postings.get(category, set())
+
+            if not query:
+                ordered = self._storage_ordered_ids(category)
+                return ordered[:limit] if limit is not None else list(ordered)
+
+            matches = self._substring_matches(query, candidates)
+            results = self._ranked(query, matches, limit)
+
+            found = set(matches)
+            if len(query) >= MIN_ID_PREFIX:
+                for item_id in self._id_prefix_matches(query, candidates):
+                    if item_id not in found:
+                        results.append(item_id)
+                        found.add(item_id)
+            if fuzzy:
+                scored = self._fuzzy_matches(query, candidates, found)
+                scored.sort(key=lambda pair: (-pair[0], self._names[pair[1]]))
+                results.extend(item_id for _, item_id in scored)
+            return results[:limit] if limit is not None else results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_search_index():
+    """Returns the process-wide inventory search index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        return _index
@@ -0,0 +1,300 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from types import MappingProxyType
+
+# --- SQLite Storage Backend ---
+# Stores inventory items and users in a single SQLite database (WAL mode) instead of JSON files.
+# Every row keeps the full record as JSON in its 'data' column, plus copies of the fields we
+# filter on (name, category, username, role) so lookups hit an index instead of scanning a list.
+# A per-table generation counter in the 'meta' table is bumped by every write, which lets the
+# process cache full-table views and throw them away as soon as anything changes.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    category TEXT,
+    quantity INTEGER,
+    price REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_position ON items(position);
+CREATE INDEX IF NOT EXISTS idx_items_name ON items(name);
+CREATE INDEX IF NOT EXISTS idx_items_category ON items(category);
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    username TEXT NOT NULL DEFAULT '',
+    role TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_position ON users(position);
+CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users(lower(username));
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('inventory_generation', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('users_generation', 0);
+"""
+
+# Logical table name -> (SQL table, indexed columns copied out of each record)
+_TABLES = {
+    'inventory': ('items', ('name', 'category', 'quantity', 'price')),
+    'users': ('users', ('username', 'role')),
+}
+
+
+def _row_values(record, columns):
+    """Returns the indexed column values for a record, with empty strings for missing text keys."""
+    values = []
+    for column in columns:
+        value = record.get(column)
+        if value is None and column in ('name', 'username'):
+            value = ''
+        values.append(value)
+    return values
+
+
+class SQLiteStore:
+    """Inventory and user persistence in one SQLite database, with one connection per thread."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.RLock() # Serialises writers inside this process
+        self._views = {} # table -> (generation, tuple of read-only records)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        """Returns this thread's connection, opening it (in WAL mode) on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def generation(self, table):
+        """Returns the write counter of a table; it changes whenever the table's contents do."""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (f"{table}_generation",)).fetchone()
+        return row[0] if row else 0
+
+    def _bump_generation(self, conn, table):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = ?", (f"{table}_generation",))
+
+    # --- Reading ---
+    def load_view(self, table):
+        """Returns every record of a table, in insertion order, as a shared read-only tuple."""
+        sql_table = _TABLES[table][0]
+        generation = self.generation(table)
+        cached = self._views.get(table)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        rows = self._connection().execute(f"SELECT data FROM {sql_table} ORDER BY position")
+        view = tuple(MappingProxyType(json.loads(data)) for (data,) in rows)
+        self._views[table] = (generation, view)
+        return view
+
+    def ids(self, table):
+        """Returns the ids of a table's records in insertion order, without decoding the records."""
+        sql_table = _TABLES[table][0]
+        return [row_id for (row_id,) in self._connection().execute(f"SELECT id FROM {sql_table} ORDER BY position")]
+
+    def get(self, table, record_id):
+        """Returns one record by id (as a new dict), or None."""
+        sql_table = _TABLES[table][0]
+        row = self._connection().execute(f"SELECT data FROM {sql_table} WHERE id = ?", (record_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, table, record_ids):
+        """Returns the records with the given ids (as new dicts) in the order requested, skipping unknown ids."""
+        sql_table = _TABLES[table][0]
+        record_ids = list(record_ids)
+        found = {}
+        for start in range(0, len(record_ids), 500): # Stay well below SQLite's bound-parameter limit
+            chunk = record_ids[start:start + 500]
+            rows = self._connection().execute(
+                f"SELECT id, data FROM {sql_table} WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+            )
+            found.update((row_id, data) for row_id, data in rows)
+        return [json.loads(found[record_id]) for record_id in record_ids if record_id in found]
+
+    def get_user_by_username(self, username):
+        """Returns the user whose username matches case-insensitively, or None."""
+        row = self._connection().execute(
+            "SELECT data FROM users WHERE lower(username) = lower(?) ORDER BY position LIMIT 1", (username,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query_items(self, search_term='', category=None):
+        """Returns items whose name contains search_term (case-insensitive) and, optionally, in one category."""
+        clauses, params = [], []
+        if search_term:
+            clauses.append("instr(lower(name), ?) > 0")
+            params.append(search_term.lower())
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(f"SELECT data FROM items {where} ORDER BY position", params)
+        return [json.loads(data) for (data,) in rows]
+
+    def query_users(self, role=None):
+        """Returns users, optionally restricted to one role."""
+        if role is None:
+            rows = self._connection().execute("SELECT data FROM users ORDER BY position")
+        else:
+            rows = self._connection().execute("SELECT data FROM users WHERE role = ? ORDER BY position", (role,))
+        return [json.loads(data) for (data,) in rows]
+
+    # --- Writing ---
+    def _write_rows(self, conn, table, puts, deletes):
+        """Upserts the given records and deletes the given ids; existing rows keep their position."""
+        sql_table, columns = _TABLES[table]
+        next_position = None
+        for record in puts:
+            data = json.dumps(record, separators=(',', ':'))
+            cursor = conn.execute(
+                f"UPDATE {sql_table} SET {', '.join(f'{c} = ?' for c in columns)}, data = ? WHERE id = ?",
+                [*_row_values(record, columns), data, record['id']],
+            )
+            if cursor.rowcount == 0:
+                if next_position is None:
+                    next_position = conn.execute(f"SELECT COALESCE(MAX(position), -1) + 1 FROM {sql_table}").fetchone()[0]
+                conn.execute(
+                    f"INSERT INTO {sql_table} (id, position, {', '.join(columns)}, data) VALUES (?, ?, {', '.join('?' for _ in columns)}, ?)",
+                    [record['id'], next_position, *_row_values(record, columns), data],
+                )
+                next_position += 1
+        conn.executemany(f"DELETE FROM {sql_table} WHERE id = ?", [(record_id,) for record_id in deletes])
+        self._bump_generation(conn, table)
+
+    def _write_checked_rows(self, conn, table, puts, deletes, expected):
+        """
+        Like _write_rows, but each statement only matches the row at the revision in expected
+        (None: the row must not exist yet). Returns the ids that did not match.
+        """
+        sql_table, columns = _TABLES[table]
+        revision_matches = "id = ? AND COALESCE(json_extract(data, '$.revision'), 0) = ?"
+        conflicts = []
+        next_position = None
+        for record in puts:
+            data = json.dumps(record, separators=(',', ':'))
+            if expected.get(record['id']) is not None:
+                cursor = conn.execute(
+                    f"UPDATE {sql_table} SET {', '.join(f'{c} = ?' for c in columns)}, data = ? WHERE {revision_matches}",
+                    [*_row_values(record, columns), data, record['id'], expected[record['id']]],
+                )
+                if cursor.rowcount == 0:
+                    conflicts.append(record['id'])
+                continue
+            if next_position is None:
+                next_position = conn.execute(f"SELECT COALESCE(MAX(position), -1) + 1 FROM {sql_table}").fetchone()[0]
+            try:
+                conn.execute(
+                    f"INSERT INTO {sql_table} (id, position, {', '.join(columns)}, data) VALUES (?, ?, {', '.join('?' for _ in columns)}, ?)",
+                    [record['id'], next_position, *_row_values(record, columns), data],
+                )
+            except sqlite3.IntegrityError:
+                conflicts.append(record['id'])
+            next_position += 1
+        for record_id in deletes:
+            if expected.get(record_id) is None:
+                continue # Inserted and deleted again within the batch
+            if conn.execute(f"DELETE FROM {sql_table} WHERE {revision_matches}", (record_id, expected[record_id])).rowcount == 0:
+                conflicts.append(record_id)
+        return conflicts
+
+    def apply(self, table, puts, deletes, expected=None):
+        """
+        Writes the given records and deletes the given ids in one transaction, touching no other rows.
+        expected maps the ids to the 'revision' the caller read them at (None: not stored). The
+        revisions are compared by the writing statements themselves, inside the transaction, so
+        a write from another process in between cannot be overwritten: if any record moved on,
+        nothing is written and the conflicting ids are returned.
+        """
+        with self._lock:
+            conn = self._connection()
+            if expected is None:
+                with conn:
+                    self._write_rows(conn, table, puts, deletes)
+                return []
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conflicts = self._write_checked_rows(conn, table, puts, deletes, expected)
+                if conflicts:
+                    conn.rollback()
+                    return conflicts
+                self._bump_generation(conn, table)
+            return []
+
+    def save(self, table, records):
+        """
+        Makes the table hold exactly the given records. Only rows that differ are written;
+        existing rows keep their position and new ones are appended after them.
+        """
+        sql_table = _TABLES[table][0]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                current = {row_id: data for row_id, data in conn.execute(f"SELECT id, data FROM {sql_table}")}
+                puts = [record for record in records if current.get(record['id']) != json.dumps(record, separators=(',', ':'))]
+                seen_ids = {record['id'] for record in records}
+                deletes = [row_id for row_id in current if row_id not in seen_ids]
+                self._write_rows(conn, table, puts, deletes)
+
+    def is_empty(self):
+        """Returns True when neither table holds any rows."""
+        conn = self._connection()
+        return not conn.execute("SELECT 1 FROM items LIMIT 1").fetchone() and not conn.execute("SELECT 1 FROM users LIMIT 1").fetchone()
+
+
+# --- One-Shot Migration from the JSON Files ---
+def migrate_json_to_sqlite(db_path, inventory_file, users_file, force=False):
+    """
+    Copies db.json and users.json into the SQLite database at db_path.
+    Refuses to run against a database that already has data unless force is True.
+    Returns a (item_count, user_count) tuple.
+    """
+    store = SQLiteStore(db_path)
+    if not store.is_empty() and not force:
+        raise RuntimeError(f"{db_path} already contains data; pass force=True (--force) to overwrite it.")
+
+    counts = []
+    for table, json_path in (('inventory', inventory_file), ('users', users_file)):
+        records = []
+        if os.path.exists(json_path):
+            with open(json_path, 'r') as f:
+                records = json.load(f)
+        store.save(table, records)
+        counts.append(len(records))
+    return tuple(counts)
+
+
+if __name__ == '__main__':
+    # Usage: python sqlite_store.py migrate [--force]
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print("Usage: python sqlite_store.py migrate [--force]")
+        sys.exit(2)
+    base_dir = os.environ.get('INVENTORY_DATA_DIR') or os.path.dirname(os.path.abspath(__file__))
+    target = os.environ.get('INVENTORY_SQLITE_FILE', os.path.join(base_dir, 'inventory.sqlite3'))
+    try:
+        item_count, user_count = migrate_json_to_sqlite(
+            target,
+            os.path.join(base_dir, 'db.json'),
+            os.path.join(base_dir, 'users.json'),
+            force='--force' in sys.argv[2:],
+        )
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Migrated {item_count} items and {user_count} users into {target}.")
@@ -0,0 +1,57 @@
+import os
+from urllib.parse import quote
+import streamlit as st
+
+# --- Static Asset URLs ---
+# With server.enableStaticServing (opt-in, see .streamlit/config.toml), Streamlit serves the
+# app's ./static directory at <server.baseUrlPath>/app/static/. Handing st.image a URL instead of a
+# file path lets the browser fetch the file over plain HTTP and reuse it across reruns and
+# sessions, instead of the server reading it and pushing the bytes through the session on
+# every render. The ?v= parameter changes whenever the content does, so a cached copy is
+# never shown after an image or PDF is replaced.
+# Streamlit serves these files without checking the session: anyone who can reach the server
+# can download every image and item PDF by URL. That is why static serving is off by default.
+# Caching depends on the Streamlit server: the Starlette-based releases (1.66 and later) only
+# send ETag and Last-Modified, so the browser revalidates each file (a 304 without a body)
+# rather than keeping it for a long time; older Tornado-based releases also send a far-future
+# Cache-Control header for URLs with a ?v= parameter.
+# Only the static directory next to app.py is served; files kept under another
+# INVENTORY_DATA_DIR are passed on as paths.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+
+def static_serving_enabled():
+    """True if Streamlit is serving the ./static directory over HTTP."""
+    try:
+        return bool(st.get_option('server.enableStaticServing'))
+    except Exception:
+        return False
+
+def static_url_prefix(link=False):
+    """
+    Returns the URL path of the static directory. st.image takes '/app/static/...' and resolves
+    it against the server's base path itself; a plain link (link=True) has to carry
+    server.baseUrlPath in front.
+    """
+    if not link:
+        return "/app/static/"
+    try:
+        base_url_path = (st.get_option('server.baseUrlPath') or '').strip('/')
+    except Exception:
+        base_url_path = ''
+    return f"/{base_url_path}/app/static/" if base_url_path else "/app/static/"
+
+def asset_url(file_path, version=None, link=False):
+    """
+    Returns the static URL of a file inside the static directory (for st.image, or with
+    link=True for st.link_button), or the file path itself when static serving is off or the
+    file lives elsewhere (st.image then sends the bytes).
+    """
+    if not file_path or not static_serving_enabled():
+        return file_path
+    relative_path = os.path.relpath(os.path.abspath(file_path), STATIC_DIR)
+    if relative_path.startswith(os.pardir):
+        return file_path
+    url = static_url_prefix(link) + quote(relative_path.replace(os.sep, '/'))
+    return f"{url}?v={version}" if version else url
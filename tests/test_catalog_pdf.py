@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+import catalog_pdf
+
+ITEMS = [
+    {'id': 'a1b2c3d4e5', 'name': "I0 & <b>x", 'category': "Nuts & <Bolts>", 'quantity': 3, 'price': 1.5, 'image_filename': None},
+    {'id': 'f6a7b8c9d0', 'name': "Plain widget", 'category': None, 'quantity': 0, 'price': 0.0, 'image_filename': None},
+    {'id': '0a1b2c3d4e', 'name': "<i>unclosed", 'category': "Nuts & <Bolts>", 'quantity': 1, 'price': 10.0, 'image_filename': None},
+]
+
+
+@pytest.fixture
+def catalog_dir(tmp_path, monkeypatch):
+    # Render the given items into a temporary directory instead of reading the database
+    monkeypatch.setattr(catalog_pdf, 'get_catalog_dir', lambda: str(tmp_path))
+    monkeypatch.setattr(catalog_pdf, '_fetch_items', lambda item_ids: [dict(item) for item in ITEMS if item['id'] in item_ids])
+    return tmp_path
+
+
+@pytest.mark.parametrize('layout', ['table', 'page'])
+def test_markup_characters_in_user_text(catalog_dir, layout):
+    item_ids = [item['id'] for item in ITEMS]
+    assert catalog_pdf.generate_catalog_pdf(item_ids, 'catalog.pdf', layout, title="Q&A <draft>") == 'catalog.pdf'
+    with open(os.path.join(catalog_dir, 'catalog.pdf'), 'rb') as f:
+        assert f.read(5) == b'%PDF-'
+    assert os.listdir(catalog_dir) == ['catalog.pdf'] # No temporary file left behind
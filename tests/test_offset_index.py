@@ -0,0 +1,114 @@
+import json
+import os
+
+import pytest
+
+from offset_index import StaleIndexError, index_path_for, read_record, rebuild_index, write_index, write_records
+
+RECORDS = [
+    {'id': 'a1', 'name': "Widget", 'price': 2.5},
+    {'id': 'b2', 'name': "Gadget, large", 'tags': ["x", "y"]},
+    {'id': 'c3', 'name': "Café \"quoted\" {braces}"},
+]
+
+
+def _save(path, records):
+    """Writes records the way db_operations.save_data does: data file first, then its index."""
+    with open(path, 'wb') as f:
+        entries = write_records(f, records)
+    stat_result = os.stat(path)
+    write_index(str(path), (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino), entries)
+
+
+def test_saved_file_is_plain_json(tmp_path):
+    path = tmp_path / 'db.json'
+    _save(path, RECORDS)
+    assert json.loads(path.read_text()) == RECORDS
+
+def test_read_record_from_saved_file(tmp_path):
+    path = tmp_path / 'db.json'
+    _save(path, RECORDS)
+    for record in RECORDS:
+        assert read_record(str(path), record['id']) == record
+    assert read_record(str(path), 'missing') is None
+
+def test_rebuild_index_of_one_record_per_line_file(tmp_path):
+    path = tmp_path / 'db.json'
+    _save(path, RECORDS)
+    os.remove(index_path_for(str(path)))
+    assert rebuild_index(str(path))
+    for record in RECORDS:
+        assert read_record(str(path), record['id']) == record
+
+def test_pretty_printed_file_is_not_indexable(tmp_path):
+    path = tmp_path / 'db.json'
+    path.write_text(json.dumps(RECORDS, indent=4))
+    assert not rebuild_index(str(path))
+    with pytest.raises(StaleIndexError):
+        read_record(str(path), 'a1')
+
+def test_compact_single_line_file_is_not_indexable(tmp_path):
+    path = tmp_path / 'db.json'
+    path.write_text(json.dumps(RECORDS))
+    assert not rebuild_index(str(path))
+    with pytest.raises(StaleIndexError):
+        read_record(str(path), 'a1')
+
+@pytest.mark.parametrize('content', [None, "[]", "[]\n", "[\n]\n"])
+def test_empty_list(tmp_path, content):
+    path = tmp_path / 'db.json'
+    if content is None:
+        _save(path, [])
+    else:
+        path.write_text(content)
+        assert rebuild_index(str(path))
+    assert json.loads(path.read_text()) == []
+    assert read_record(str(path), 'a1') is None
+
+def test_missing_data_file_reads_as_no_record(tmp_path):
+    assert read_record(str(tmp_path / 'db.json'), 'a1') is None
+
+def test_missing_index_is_stale(tmp_path):
+    path = tmp_path / 'db.json'
+    with open(path, 'wb') as f:
+        write_records(f, RECORDS)
+    with pytest.raises(StaleIndexError):
+        read_record(str(path), 'a1')
+
+def test_changed_file_makes_index_stale(tmp_path):
+    path = tmp_path / 'db.json'
+    _save(path, RECORDS)
+    changed = [dict(RECORDS[0], name="Renamed")] + RECORDS[1:]
+    with open(path, 'wb') as f:
+        write_records(f, changed) # Rewritten without updating the index
+    with pytest.raises(StaleIndexError):
+        read_record(str(path), 'a1')
+    assert rebuild_index(str(path))
+    assert read_record(str(path), 'a1')['name'] == "Renamed"
+
+def test_touched_file_makes_index_stale(tmp_path):
+    path = tmp_path / 'db.json'
+    _save(path, RECORDS)
+    stat_result = os.stat(path)
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+    with pytest.raises(StaleIndexError):
+        read_record(str(path), 'a1')
+
+def test_replaced_file_makes_index_stale(tmp_path):
+    path = tmp_path / 'db.json'
+    _save(path, RECORDS)
+    stat_result = os.stat(path)
+    replacement = tmp_path / 'db.json.new'
+    replacement.write_bytes(path.read_bytes())
+    os.utime(replacement, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns)) # Same mtime and size, new inode
+    os.replace(replacement, path)
+    with pytest.raises(StaleIndexError):
+        read_record(str(path), 'a1')
+
+def test_corrupt_index_is_stale(tmp_path):
+    path = tmp_path / 'db.json'
+    _save(path, RECORDS)
+    with open(index_path_for(str(path)), 'wb') as f:
+        f.write(b'garbage')
+    with pytest.raises(StaleIndexError):
+        read_record(str(path), 'a1')
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from search_index import MIN_ID_PREFIX, SORT_FIELDS, SearchIndex, _sort_keys
+
+NAMES = ["Widget", "widget stand", "Gadget", "Gear", "gear box", "Bolt", "bolt cutter", "Nut", "Washer", "Hex key", ""]
+CATEGORIES = ["Tools", "Parts", "Other"]
+QUERIES = ["", "", "g", "ge", "gea", "get", "bolt", "key", "zzz"]
+
+
+def _random_item(rng, item_id):
+    return {
+        'id': item_id,
+        'name': rng.choice(NAMES),
+        'category': rng.choice(CATEGORIES),
+        'price': rng.choice([0.0, 1.5, 2.0, 9.99, 10.0]),
+        'quantity': rng.randint(0, 5),
+    }
+
+def _random_range(rng, field):
+    values = [0.0, 1.5, 2.0, 9.99, 10.0] if field == 'price' else list(range(6))
+    low, high = rng.choice(values + [None]), rng.choice(values + [None])
+    return low, high
+
+def _detached_index(items):
+    """A SearchIndex built from items and updated only through apply_change (not from storage)."""
+    index = SearchIndex()
+    index.ensure_current = lambda: None
+    index.rebuild(list(items))
+    return index
+
+def _brute_force(items, query, category, ranges, sort, descending):
+    """
+    The ids SearchIndex.query returns for sorted or range-filtered queries, by filtering every
+    item. Unsorted results are in storage order; query() ranks them when there is a query.
+    """
+    query = query.strip().lower()
+    matches = []
+    for item in items.values(): # Insertion order is storage order
+        name = (item.get('name') or '').lower()
+        if query and query not in name and not (len(query) >= MIN_ID_PREFIX and item['id'].startswith(query)):
+            continue
+        if category is not None and item.get('category') != category:
+            continue
+        keys = _sort_keys(item)
+        if any((low is not None and keys[field] < low) or (high is not None and keys[field] > high)
+               for field, (low, high) in ranges.items()):
+            continue
+        matches.append(item)
+    if sort is None:
+        return [item['id'] for item in matches]
+    ordered = [item['id'] for item in sorted(matches, key=lambda item: (_sort_keys(item)[sort], item['id']))]
+    return ordered[::-1] if descending else ordered
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_query_matches_brute_force_after_random_edits(seed):
+    rng = random.Random(seed)
+    items = {}
+    for number in range(60):
+        item_id = f"{number:04x}{rng.getrandbits(32):08x}"
+        items[item_id] = _random_item(rng, item_id)
+    index = _detached_index(items.values())
+    next_id = len(items)
+
+    for step in range(400):
+        action = rng.random()
+        if action < 0.25 and items:
+            item_id = rng.choice(list(items))
+            index.apply_change(items.pop(item_id), None)
+        elif action < 0.45:
+            item_id = f"{next_id:04x}{rng.getrandbits(32):08x}"
+            next_id += 1
+            items[item_id] = _random_item(rng, item_id)
+            index.apply_change(None, items[item_id])
+        elif items:
+            item_id = rng.choice(list(items))
+            before = items[item_id]
+            after = dict(before, **{key: value for key, value in _random_item(rng, item_id).items() if rng.random() < 0.5})
+            items[item_id] = after # Edits keep the item's place in storage order
+            index.apply_change(before, after)
+
+        query = rng.choice(QUERIES)
+        category = rng.choice(CATEGORIES + [None])
+        ranges = {field: _random_range(rng, field) for field in ('price', 'quantity') if rng.random() < 0.5}
+        sort = rng.choice(SORT_FIELDS + (None,))
+        descending = rng.random() < 0.5
+        expected = _brute_force(items, query, category, ranges, sort, descending)
+        if sort is None and query.strip():
+            # Same matches, in the search's best-match-first order
+            matching = set(expected)
+            expected = [item_id for item_id in index.search(query, category) if item_id in matching]
+        assert index.query(query, category, ranges=ranges, sort=sort, descending=descending) == expected, f"step {step}"
+
+    # The incrementally maintained index must equal one built from scratch
+    rebuilt = _detached_index(items.values())
+    for sort in SORT_FIELDS:
+        assert index.query(sort=sort) == rebuilt.query(sort=sort)
+    assert sorted(index.search()) == sorted(rebuilt.search())
+
+def test_sort_by_name_ignores_unknown_ids():
+    index = _detached_index([{'id': 'b', 'name': "Bolt"}, {'id': 'a', 'name': "anvil"}])
+    assert index.sort_by_name(['b', 'a', 'gone']) == ['a', 'b']
+    assert index.sort_by_name(['a', 'b'], reverse=True) == ['b', 'a']
@@ -0,0 +1,94 @@
+import os
+import uuid
+from file_manifest import image_content_hash, thumbnail_files
+from utils import get_image_dir, get_thumbnail_dir
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError: # Pillow is optional; without it the original images are shown
+    Image = None
+
+# --- Image Thumbnails ---
+# Uploads are often multi-megabyte camera photos, but the inventory grid shows them a few
+# hundred pixels wide. Resized, re-encoded copies are kept in static/thumbs, named after the
+# source image's content hash and the target width, so a variant is built once (at upload time,
+# or lazily on first view for older images) and shared by every item using the same picture.
+# Replacing an image changes its hash, so stale thumbnails are never served.
+
+GRID_WIDTH = 480 # Grid cards are about a third of the page wide; this leaves room for high-DPI screens
+PREVIEW_WIDTH = 300 # The edit page shows a 150px preview, rendered at 2x
+THUMBNAIL_WIDTHS = (GRID_WIDTH, PREVIEW_WIDTH)
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+_use_webp = None
+
+
+def _thumbnail_format():
+    """Returns (Pillow format, file extension) for thumbnails: WebP when available, JPEG otherwise."""
+    global _use_webp
+    if _use_webp is None:
+        _use_webp = bool(features.check('webp'))
+    return ('WEBP', 'webp') if _use_webp else ('JPEG', 'jpg')
+
+def _thumbnail_filename(content_hash, width):
+    return f"{content_hash[:32]}_{width}.{_thumbnail_format()[1]}"
+
+def _render_thumbnail(source_path, target_path, width):
+    """Writes a copy of the source image scaled down to at most width pixels wide."""
+    image_format, _ = _thumbnail_format()
+    with Image.open(source_path) as img:
+        # Let the JPEG decoder downscale while decoding instead of inflating the full photo first.
+        img.draft('RGB', (width * 2, width * 2))
+        img = ImageOps.exif_transpose(img) # Phone photos are often stored sideways with an EXIF hint
+        if img.width > width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+        if image_format == 'JPEG' and img.mode in ('RGBA', 'LA', 'P'):
+            # JPEG has no transparency; flatten onto white like the page background.
+            rgba = img.convert('RGBA')
+            img = Image.new('RGB', rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel('A'))
+        elif image_format == 'JPEG' and img.mode != 'RGB':
+            img = img.convert('RGB')
+        elif img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if img.mode in ('LA', 'P') else 'RGB')
+        tmp_path = f"{target_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            if image_format == 'WEBP':
+                img.save(tmp_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+            else:
+                img.save(tmp_path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            os.replace(tmp_path, target_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+def thumbnail_path(image_filename, width=GRID_WIDTH):
+    """
+    Returns the path of a variant of an uploaded image at most width pixels wide, creating it
+    if needed. Falls back to the original image when Pillow is not installed or the image cannot
+    be decoded. Returns None if the image does not exist.
+    """
+    source_path = os.path.join(get_image_dir(), image_filename)
+    content_hash = image_content_hash(image_filename)
+    if content_hash is None:
+        return None
+    if Image is None:
+        return source_path
+    target_filename = _thumbnail_filename(content_hash, width)
+    target_path = os.path.join(get_thumbnail_dir(), target_filename)
+    if thumbnail_files().exists(target_filename):
+        return target_path
+    try:
+        os.makedirs(get_thumbnail_dir(), exist_ok=True)
+        _render_thumbnail(source_path, target_path, width)
+    except Exception as e:
+        print(f"Warning: could not create a {width}px thumbnail of '{image_filename}': {e}")
+        return source_path
+    thumbnail_files().added(target_filename)
+    return target_path
+
+def create_thumbnails(image_filename):
+    """Builds every thumbnail variant of a freshly uploaded image, so the first page view is fast."""
+    for width in THUMBNAIL_WIDTHS:
+        thumbnail_path(image_filename, width)
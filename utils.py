@@ -1,4 +1,5 @@
 import os
+import re
 # Removed: import streamlit as st here to avoid any potential Streamlit context issues during initial module load.
 
 # --- Base Directory Retrieval ---
@@ -23,7 +24,7 @@ def _get_base_dir_robust():
         print(f"Error determining script path: {e}. Falling back to os.getcwd().")
         return os.getcwd()
 
-BASE_DIR = _get_base_dir_robust()
+BASE_DIR = os.environ.get('INVENTORY_DATA_DIR') or _get_base_dir_robust() # Where data and static files live (see db_operations.py)
 
 # --- Image Directory Retrieval Function ---
 def get_image_dir():
@@ -63,12 +64,38 @@ def get_pdf_dir():
         os.makedirs(fallback_path, exist_ok=True) # Ensure fallback directory exists
         return fallback_path
 
+# --- Thumbnail Directory Retrieval Function ---
+def get_thumbnail_dir():
+    """Returns the absolute path to the 'static/thumbs' directory holding resized copies of item images."""
+    return os.path.join(BASE_DIR, 'static', 'thumbs')
+
+# --- Catalog Directory Retrieval Function ---
+def get_catalog_dir():
+    """Returns the absolute path to the 'static/catalogs' directory holding generated catalog PDFs."""
+    return os.path.join(BASE_DIR, 'static', 'catalogs')
+
+# --- Content-Addressed Image Names ---
+_CONTENT_ADDRESSED_NAME = re.compile(r'^[0-9a-f]{64}\.[A-Za-z0-9]+$')
+
+def is_content_addressed(image_filename):
+    """True if an image filename is the sha256 of its content (see asset_store.store_image)."""
+    return bool(image_filename and _CONTENT_ADDRESSED_NAME.match(image_filename))
+
 # --- Image Placeholder Path (still needed for display) ---
 def get_placeholder_image_path():
     """Returns the path to the placeholder image."""
     # Uses get_image_dir to ensure the base path is robustly obtained
     return os.path.join(get_image_dir(), 'placeholder.png')
 
+# --- Item Categories ---
+# Predefined list of categories for consistency (used by the item forms and the bulk import)
+ITEM_CATEGORIES = ["Electronics", "Books", "Clothing", "Home Goods", "Food", "Office Supplies", "Other"]
+
+# --- Catalog Layouts ---
+# Layouts catalog_pdf.py can render; kept here so the pages can offer them without loading ReportLab
+CATALOG_LAYOUTS = {'table': "Compact table", 'page': "One page per item"}
+CATALOG_RETENTION_SECONDS = 24 * 3600 # Catalog PDFs are not referenced by any record; they expire instead
+
 # --- File Type Configuration (for uploads - if any) ---
 # Now allows common image formats in addition to PDF
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif'} 
@@ -91,6 +118,9 @@ def ensure_dirs():
     images_static_path = get_image_dir() # Use get_image_dir for consistency
     os.makedirs(images_static_path, exist_ok=True)
 
+    # Ensure the thumbnail cache directory exists
+    os.makedirs(get_thumbnail_dir(), exist_ok=True)
+
     # Check for the existence of a placeholder image
     placeholder_path = get_placeholder_image_path()
     if not os.path.exists(placeholder_path):